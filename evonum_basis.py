@@ -0,0 +1,130 @@
+from __future__ import print_function
+import os
+import tempfile
+import zlib
+from evonum_modules import MODULE_SUBTYPES, moduleBasis
+try:
+    import numpy
+except ImportError:  # Basis matrices are optional
+    numpy = None
+
+# A basis matrix holds the response of every module subtype (coeff 1) to
+# every position 1..N of a position force: row = position - 1, column =
+# MODULE_SUBTYPES index. Undefined responses are NaN. A solver's responses to
+# every position are then its coefficients times the columns of its modules.
+# Matrices only depend on N and the subtype list, so they are built once and
+# cached on disk as .npy files that are memory-mapped on load.
+
+BASIS_CACHE_DIR = tempfile.gettempdir()
+SUBTYPE_INDEX = dict([(subtype, pos) for pos, subtype in enumerate(MODULE_SUBTYPES)])
+
+# Max number of response values calculated at once when scoring many solvers
+CHUNK_VALUES = 1 << 16
+
+
+def basisFilename(total, cache_dir=None):
+    """Returns cache filename of basis matrix for positions 1..total."""
+    key = zlib.crc32(",".join(MODULE_SUBTYPES).encode("utf-8")) & 0xffffffff
+    if cache_dir is None:
+        cache_dir = BASIS_CACHE_DIR
+    return os.path.join(cache_dir, "evonum_basis_%d_%08x.npy" % (total, key))
+
+
+def buildBasisMatrix(total):
+    """Returns basis matrix (total x subtypes) for positions 1..total."""
+    matrix = numpy.empty((total, len(MODULE_SUBTYPES)))
+    for row in range(0, total):
+        for column, subtype in enumerate(MODULE_SUBTYPES):
+            try:
+                matrix[row, column] = moduleBasis(subtype, float(row + 1))
+            except (ValueError, ZeroDivisionError, OverflowError):
+                matrix[row, column] = numpy.nan
+    return matrix
+
+
+def loadBasisMatrix(total, cache_dir=None):
+    """Returns read-only memory-mapped basis matrix for positions 1..total.
+
+    Matrix is built and saved to the cache the first time it is needed (or if
+    the cached file is damaged). Returns None if numpy is not available."""
+    if numpy is None:
+        print("Error: numpy is required for basis matrices.")
+        return None
+    filename = basisFilename(total, cache_dir)
+    shape = (total, len(MODULE_SUBTYPES))
+    try:
+        matrix = numpy.load(filename, mmap_mode="r")
+        if matrix.shape == shape:
+            return matrix
+    except (IOError, ValueError):
+        pass
+    # Written under a temporary name so a partly written file is never loaded
+    temporary = "%s.%d.tmp" % (filename, os.getpid())
+    outfile = open(temporary, "wb")
+    try:
+        numpy.save(outfile, buildBasisMatrix(total))
+    finally:
+        outfile.close()
+    if os.name == "nt" and os.path.exists(filename):
+        os.remove(filename)
+    os.rename(temporary, filename)
+    return numpy.load(filename, mmap_mode="r")
+
+
+class BasisBatch(object):
+    """Basis matrix rows and expected values for a fixed set of positions.
+
+    Scores linear sums of modules on every position at once. Responses are
+    added module by module and errors position by position in the same order
+    as LinearFitness batch scoring, so fitness is exactly the same as scoring
+    each module's response to each position.
+    Solvers using a subtype that is undefined at any position fail (None/NaN).
+    """
+
+    def __init__(self, matrix, positions, expected):
+        rows = [item - 1 for item in positions]
+        matrix = numpy.asarray(matrix)[rows]
+        self._undefined = numpy.isnan(matrix).any(axis=0)
+        # One contiguous row of responses per subtype
+        self._responses = numpy.ascontiguousarray(numpy.where(numpy.isnan(matrix), 0.0, matrix).T)
+        self._expected = numpy.array([expected[item] for item in rows], dtype=numpy.float64)
+
+    def __len__(self):
+        return len(self._expected)
+
+    @property
+    def undefined(self):
+        """Boolean array marking subtypes undefined at one or more positions"""
+        return self._undefined
+
+    def moduleFitness(self, modules):
+        """Returns mean fitness of a solver summing responses of modules, None if any module fails."""
+        running_totals = numpy.zeros(len(self))
+        for item in modules:
+            column = SUBTYPE_INDEX[item.subtype]
+            if self._undefined[column]:
+                return None
+            running_totals += item.coeff * self._responses[column]
+        total = sum((-numpy.abs(self._expected - running_totals)).tolist())
+        return total / float(len(self))
+
+    def fitness(self, subtypes, coeffs):
+        """Returns array of mean fitness for solvers x modules arrays of subtype indexes and coefficients.
+
+        Padding modules need a coefficient of 0. Undefined subtypes are not checked, see undefined."""
+        fitness = numpy.empty(len(coeffs))
+        by_position = numpy.ascontiguousarray(self._responses.T)
+        step = max(CHUNK_VALUES // max(len(self), 1), 1)
+        for start in range(0, len(coeffs), step):
+            chunk_subtypes = subtypes[start:start + step]
+            chunk_coeffs = coeffs[start:start + step]
+            # positions x solvers, small enough chunks to stay in cache
+            running_totals = numpy.zeros((len(self), len(chunk_coeffs)))
+            for x in range(0, chunk_coeffs.shape[1]):
+                if not chunk_coeffs[:, x].any():
+                    continue  # Only padding, adds nothing
+                running_totals += by_position[:, chunk_subtypes[:, x]] * chunk_coeffs[:, x]
+            errors = -numpy.abs(self._expected[:, None] - running_totals)
+            # Summing over the outer axis adds positions one at a time, in order
+            fitness[start:start + step] = errors.sum(axis=0) / float(len(self))
+        return fitness
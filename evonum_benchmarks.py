@@ -0,0 +1,338 @@
+from __future__ import print_function
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from copy import deepcopy
+from evonum_solvers import *
+from evonum_fitness import createFitnessForce
+
+# Seeded benchmarks for evonum hot paths. Every benchmark seeds the random
+# module itself, so the same work is timed on every run.
+# Run as: python evonum_benchmarks.py [benchmark names] [--save results.json]
+# Compare: python evonum_benchmarks.py compare baseline.json results.json [tolerance]
+
+DAY_SIZES = [100, 1000, 10000, 100000]
+# Results that are settings rather than measurements and results where higher is better
+SETTING_KEYS = ["solvers", "calls", "days"]
+HIGHER_IS_BETTER = ["speedup"]
+
+
+def benchmarkPopulation(total, conditions=None):
+    """Returns list of total seeded solvers that have been through one day (all modules added)."""
+    random.seed(1)
+    population = []
+    for x in range(0, total):
+        solver = createSolver("Small", "Solver" + str(x + 1) + "_0.1", conditions)
+        solver.beginDay()
+        population.append(solver)
+    return population
+
+
+def benchmarkClone(total=1000, repeats=5):
+    """Time cloning a population with SmallSolver.clone against copy.deepcopy.
+
+    Returns dictionary of best seconds per population copy for each method and speedup."""
+    population = benchmarkPopulation(total, {"fitness_calculator": "Teired"})
+    deep = min(timeit.repeat(lambda: [deepcopy(solver) for solver in population],
+                             number=1, repeat=repeats))
+    fast = min(timeit.repeat(lambda: [solver.clone() for solver in population],
+                             number=1, repeat=repeats))
+    return {"solvers": total, "deepcopy": deep, "clone": fast, "speedup": deep / fast}
+
+
+def deepSizeof(obj, seen):
+    """Returns bytes used by obj and everything it references not already in seen.
+
+    Follows containers, instance dictionaries and __slots__. Classes are not counted."""
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deepSizeof(key, seen) + deepSizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            size += deepSizeof(value, seen)
+    if hasattr(obj, "__dict__"):
+        size += deepSizeof(obj.__dict__, seen)
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if hasattr(obj, name):
+                size += deepSizeof(getattr(obj, name), seen)
+    return size
+
+
+def benchmarkMemory(total=1000):
+    """Measure memory footprint of a population of solvers with 15 modules each.
+
+    Shared objects (interned strings, class constants) are only counted once.
+    Returns dictionary of total bytes and bytes per solver."""
+    population = benchmarkPopulation(total, {"total_modules": 15})
+    seen = set()
+    total_bytes = sum([deepSizeof(solver, seen) for solver in population])
+    return {"solvers": total, "bytes": total_bytes, "bytes_per_solver": total_bytes / float(total)}
+
+
+def benchmarkSnapshot(total=100000, filename="benchmark.snapshot"):
+    """Time saving and loading binary snapshots of an Object world and an Array world.
+
+    Returns dictionary of seconds for each save and load."""
+    from evonum_snapshot import ArrayTerrarium, Terrarium, loadSnapshot, saveSnapshot
+    results = {"solvers": total}
+    for kind, world in [("object", Terrarium()), ("array", ArrayTerrarium())]:
+        random.seed(1)
+        world.importSolverSettings({"total_modules": 15})
+        for x in range(0, total):
+            world.addSolver()
+        if kind == "object":
+            for solver in world._solvers:
+                solver.beginDay()
+        else:
+            world.ageSolvers()
+        start = timeit.default_timer()
+        saveSnapshot(world, filename)
+        results[kind + "_save"] = timeit.default_timer() - start
+        start = timeit.default_timer()
+        loadSnapshot(filename)
+        results[kind + "_load"] = timeit.default_timer() - start
+    os.remove(filename)
+    return results
+
+
+def benchmarkForces():
+    """Returns a seeded Position force and Equation force with the day's conditions drawn."""
+    forces = [createFitnessForce("Simple", "Position", "primes_1000.txt"),
+              createFitnessForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")]
+    for item in forces:
+        item.beginDay()
+    return forces
+
+
+def benchmarkModules(calls=10000, repeats=3):
+    """Time getResponse of a module of every subtype on seeded variables.
+
+    The basis cache is cleared before each repeat, as at the start of a day.
+    Returns dictionary of best seconds per call for each subtype."""
+    random.seed(1)
+    variables = [random.randint(1, 1000) for x in range(0, 1000)]
+    results = {"calls": calls}
+    for subtype in MODULE_SUBTYPES:
+        module = createModule("Fitness", subtype)
+        variables_used = (variables * (calls // len(variables) + 1))[:calls]
+
+        def respond():
+            clearBasisCache()
+            for variable in variables_used:
+                module.getResponse(variable)
+        results[subtype] = min(timeit.repeat(respond, number=1, repeat=repeats)) / calls
+    return results
+
+
+def benchmarkCalculators(total=1000, repeats=3):
+    """Time calculateFitness of Linear, Dynamic and Teired solvers on two forces.
+
+    Returns dictionary of best seconds to score the population with each calculator."""
+    results = {"solvers": total}
+    for calculator in ["Linear", "Dynamic", "Teired"]:
+        population = benchmarkPopulation(total, {"fitness_calculator": calculator})
+        forces = benchmarkForces()
+
+        def evaluate():
+            clearBasisCache()
+            for solver in population:
+                solver.calculateFitness(forces)
+        results[calculator] = min(timeit.repeat(evaluate, number=1, repeat=repeats))
+    return results
+
+
+def benchmarkReproduce(total=1000, repeats=3):
+    """Time SmallSolver.reproduce and SmallSolver.mutate over a population.
+
+    Returns dictionary of best seconds for each pass over the population."""
+    population = benchmarkPopulation(total)
+    children = [solver.clone() for solver in population]
+
+    def reproduce():
+        random.seed(1)
+        for solver in population:
+            solver.reproduce()
+
+    def mutate():
+        random.seed(1)
+        for solver in children:
+            solver.mutate()
+    return {"solvers": total,
+            "reproduce": min(timeit.repeat(reproduce, number=1, repeat=repeats)),
+            "mutate": min(timeit.repeat(mutate, number=1, repeat=repeats))}
+
+
+def benchmarkJSON(total=1000, repeats=3):
+    """Time exporting a world's solvers to a JSON Lines file and importing them back.
+
+    Returns dictionary of best seconds for export and import."""
+    from evonum_terrarium import Terrarium
+    world = Terrarium()
+    world._solvers = benchmarkPopulation(total)  # Survived a day, so all are exported
+    handle, filename = tempfile.mkstemp(suffix=".jsonl")
+    os.close(handle)
+    stdout = sys.stdout
+    try:
+        results = {"solvers": total}
+        results["export"] = min(timeit.repeat(lambda: world.exportSolversTo(filename),
+                                              number=1, repeat=repeats))
+        sys.stdout = open(os.devnull, "w")  # importSolvers prints a count
+        results["import"] = min(timeit.repeat(lambda: Terrarium().importSolversFrom(filename),
+                                              number=1, repeat=repeats))
+    finally:
+        if sys.stdout is not stdout:
+            sys.stdout.close()
+            sys.stdout = stdout
+        os.remove(filename)
+    return results
+
+
+def benchmarkDay(sizes=None, days=1):
+    """Time whole Terrarium.beginDay for populations of each size (default DAY_SIZES).
+
+    Each world runs one day first so timed days include reproduction and pruning
+    of a full population. Returns dictionary of seconds per day for each size."""
+    from evonum_terrarium import Terrarium
+    if sizes is None:
+        sizes = DAY_SIZES
+    results = {"days": days}
+    stdout = sys.stdout
+    for total in sizes:
+        random.seed(1)
+        world = Terrarium()
+        world.addForce("Simple", "Position", "primes_1000.txt")
+        world.addForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")
+        world._max_solvers = total
+        world.setDumpFile(os.devnull)
+        for x in range(0, total):
+            world.addSolver()
+        sys.stdout = open(os.devnull, "w")  # Daily lines
+        try:
+            world.runDays(1)
+            start = timeit.default_timer()
+            world.runDays(days)
+            results[str(total)] = (timeit.default_timer() - start) / days
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return results
+
+
+BENCHMARKS = {"clone": benchmarkClone,
+              "memory": benchmarkMemory,
+              "snapshot": benchmarkSnapshot,
+              "modules": benchmarkModules,
+              "calculators": benchmarkCalculators,
+              "reproduce": benchmarkReproduce,
+              "json": benchmarkJSON,
+              "day": benchmarkDay}
+
+
+def runBenchmarks(names=None, verbose=False):
+    """Returns dictionary of results of named benchmarks (default all) and the python used.
+
+    With verbose, each benchmark's results are printed as it finishes."""
+    if names is None:
+        names = sorted(BENCHMARKS)
+    results = {"python": platform.python_version(), "benchmarks": {}}
+    for name in names:
+        results["benchmarks"][name] = BENCHMARKS[name]()
+        if verbose:
+            print("%s: %s" % (name, results["benchmarks"][name]))
+    return results
+
+
+def saveResults(results, filename):
+    outfile = open(filename, "w")
+    try:
+        json.dump(results, outfile, indent=2, sort_keys=True)
+    finally:
+        outfile.close()
+
+
+def loadResults(filename):
+    infile = open(filename)
+    try:
+        return json.load(infile)
+    finally:
+        infile.close()
+
+
+def flattenResults(results):
+    """Returns dictionary of benchmark.measurement: value for every measured number."""
+    flat = {}
+    for name, values in results["benchmarks"].items():
+        for key, value in values.items():
+            if key not in SETTING_KEYS and isinstance(value, (int, float)):
+                flat[name + "." + key] = value
+    return flat
+
+
+def compareResults(baseline, current, tolerance=0.1):
+    """Compare two sets of benchmark results.
+
+    A measurement regressed if it is more than tolerance (fraction) worse than
+    the baseline: higher for times and sizes, lower for speedups.
+    Returns list of (measurement, baseline value, current value, change) for
+    every measurement in both, and list of the measurements that regressed."""
+    before = flattenResults(baseline)
+    after = flattenResults(current)
+    rows = []
+    regressions = []
+    for key in sorted(set(before) & set(after)):
+        if before[key] == 0:
+            continue
+        change = (after[key] - before[key]) / float(before[key])
+        rows.append((key, before[key], after[key], change))
+        worse = -change if key.split(".")[-1] in HIGHER_IS_BETTER else change
+        if worse > tolerance:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main(arguments):
+    """Run benchmarks or compare results from command line arguments. Returns exit code."""
+    if len(arguments) > 0 and arguments[0] == "compare":
+        if len(arguments) < 3:
+            print("Usage: python evonum_benchmarks.py compare baseline.json results.json [tolerance]")
+            return 2
+        tolerance = float(arguments[3]) if len(arguments) > 3 else 0.1
+        rows, regressions = compareResults(loadResults(arguments[1]),
+                                           loadResults(arguments[2]), tolerance)
+        for key, before, after, change in rows:
+            print("%-30s %12.6g %12.6g %+7.1f%%%s" % (key, before, after, 100 * change,
+                                                    "  REGRESSION" if key in regressions else ""))
+        if len(regressions) > 0:
+            print("%d regression(s) over %d%%." % (len(regressions), int(100 * tolerance)))
+            return 1
+        return 0
+    filename = None
+    if "--save" in arguments:
+        position = arguments.index("--save")
+        if position + 1 >= len(arguments):
+            print("Error: --save must be followed by a filename.")
+            return 2
+        filename = arguments[position + 1]
+        arguments = arguments[:position] + arguments[position + 2:]
+    names = arguments if len(arguments) > 0 else sorted(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print("Unknown benchmark %s. Available: %s" % (name, ", ".join(sorted(BENCHMARKS))))
+            return 2
+    results = runBenchmarks(names, verbose=True)
+    if filename is not None:
+        saveResults(results, filename)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
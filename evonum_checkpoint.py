@@ -0,0 +1,161 @@
+from __future__ import print_function
+import json
+import os
+import sys
+import traceback
+from evonum_snapshot import saveSnapshot, loadSnapshot
+
+# A checkpoint is a JSON manifest (prefix.json) pointing to one binary
+# snapshot per world (see evonum_snapshot) plus each world's position in the
+# scripter's schedule. Snapshots are written first and the manifest is
+# replaced last, so the manifest always describes a complete checkpoint.
+# Snapshots of the previous checkpoint are removed after the manifest is replaced.
+
+
+def manifestName(prefix):
+    return prefix + ".json"
+
+
+def replaceFile(source, destination):
+    """Rename source to destination, replacing destination if it exists."""
+    if os.name == "nt" and os.path.exists(destination):
+        os.remove(destination)  # Windows rename does not replace
+    os.rename(source, destination)
+
+
+def readCheckpoint(prefix):
+    """Returns checkpoint manifest dictionary, None if there is no usable checkpoint."""
+    try:
+        infile = open(manifestName(prefix))
+    except IOError:
+        return None
+    try:
+        return json.load(infile)
+    except ValueError:
+        print("Error: checkpoint manifest %s is damaged." % manifestName(prefix))
+        return None
+    finally:
+        infile.close()
+
+
+def writeManifest(prefix, manifest):
+    """Replace checkpoint manifest in one step."""
+    temporary = manifestName(prefix) + ".tmp"
+    outfile = open(temporary, "w")
+    try:
+        json.dump(manifest, outfile, indent=2, sort_keys=True)
+    finally:
+        outfile.close()
+    replaceFile(temporary, manifestName(prefix))
+
+
+def writeCheckpoint(prefix, rounds, schedules, settings=None):
+    """Write snapshot of every schedule's world and the manifest for them.
+
+    rounds is the number of days stepped when the checkpoint was taken,
+    settings is an optional dictionary of scripter settings kept in the manifest.
+    Returns True if checkpoint was written."""
+    worlds = []
+    for pos, schedule in enumerate(schedules):
+        filename = "%s_round%d_world%d.snapshot" % (prefix, rounds, pos + 1)
+        if not saveSnapshot(schedule.world, filename):
+            return False
+        worlds.append({"snapshot": filename, "schedule": schedule.position})
+    previous = readCheckpoint(prefix)
+    writeManifest(prefix, {"round": rounds, "worlds": worlds, "settings": settings})
+    if previous is not None:
+        current = [item["snapshot"] for item in worlds]
+        for item in previous.get("worlds", []):
+            if item["snapshot"] not in current:
+                try:
+                    os.remove(item["snapshot"])
+                except OSError:
+                    pass
+    return True
+
+
+def loadCheckpoint(prefix):
+    """Returns (manifest, worlds) of latest checkpoint, None if there is no checkpoint.
+
+    Loading restores the random state saved with the checkpoint."""
+    manifest = readCheckpoint(prefix)
+    if manifest is None:
+        print("Error: no checkpoint found at %s." % manifestName(prefix))
+        return None
+    worlds = []
+    for item in manifest["worlds"]:
+        try:
+            worlds.append(loadSnapshot(item["snapshot"]))
+        except (IOError, ValueError) as e:
+            print("Error: unable to load checkpoint %s: %s" % (item["snapshot"], e))
+            return None
+        if worlds[-1] is None:
+            return None
+    return manifest, worlds
+
+
+class Checkpointer(object):
+    """Writes a checkpoint of running schedules every N days.
+
+    With background, checkpoints are written by a forked child process that
+    gets a copy-on-write image of the worlds, so the simulation only waits for
+    the fork (and for the previous checkpoint if it is still being written).
+    Background report writer threads are stopped before forking, so the child
+    never inherits a lock held by a thread that does not exist in it.
+    Without fork (ex: Windows) checkpoints are written in place.
+    """
+
+    def __init__(self, prefix, days, settings=None, rounds=0, background=True):
+        self._prefix = prefix
+        self._days = days
+        self._settings = settings
+        self._rounds = rounds  # Days stepped so far, continues after resume
+        self._background = background and hasattr(os, "fork")
+        self._pid = None
+        self._pending = None  # Round being written in background
+
+    @property
+    def rounds(self):
+        return self._rounds
+
+    def tick(self, schedules):
+        """Count one stepped day and write checkpoint if due."""
+        self._rounds += 1
+        if self._rounds % self._days == 0:
+            self.write(schedules)
+
+    def write(self, schedules):
+        self.wait()
+        if not self._background:
+            writeCheckpoint(self._prefix, self._rounds, schedules, self._settings)
+            return
+        for schedule in schedules:
+            schedule.world.stopReportWriter()
+        sys.stdout.flush()  # Child must not repeat buffered output
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                if writeCheckpoint(self._prefix, self._rounds, schedules, self._settings):
+                    code = 0
+            except Exception:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self._pid = pid
+        self._pending = self._rounds
+
+    def wait(self):
+        """Wait for background checkpoint to finish."""
+        if self._pid is None:
+            return
+        status = os.waitpid(self._pid, 0)[1]
+        if status != 0:
+            print("Error: checkpoint of day %d was not written." % self._pending)
+        self._pid = None
+        self._pending = None
+
+    def close(self):
+        self.wait()
@@ -0,0 +1,452 @@
+from __future__ import print_function
+import array
+import inspect
+import multiprocessing
+import random
+from evonum_modules import MODULE_SUBTYPES, basisRow, cachedBasis
+from evonum_basis import SUBTYPE_INDEX
+from evonum_solvers import LinearFitness, createFitnessCalculator
+try:
+    import numpy
+except ImportError:  # Vectorized evaluation is optional
+    numpy = None
+
+
+def error():
+    raise NotImplementedError("%s not implemented" %
+                              inspect.stack()[1][3])  # Used for interface
+
+
+EVALUATOR_TYPES = ["Serial", "Incremental", "Vectorized", "Pool", "Remote"]
+RANDOM_CALCULATORS = ["Dynamic"]  # Fitness calculators that draw random numbers
+
+
+def createEvaluator(evaluator_type="Serial", processes=None):
+    """Returns a new population evaluator of provided type.
+
+    Optional processes sets number of worker processes for Pool evaluator
+    (defaults to number of cpus). For Remote evaluator it is the number of
+    localhost workers or a list of host:port worker addresses.
+    Returns None if evaluator creation failed."""
+    evaluator_type = str(evaluator_type)
+    if evaluator_type == "Serial":
+        return SerialEvaluator()
+    elif evaluator_type == "Incremental":
+        return IncrementalEvaluator()
+    elif evaluator_type == "Vectorized":
+        if numpy is None:
+            print("Error: numpy is required for the Vectorized evaluator.")
+            return None
+        return VectorizedEvaluator()
+    elif evaluator_type == "Pool":
+        try:
+            return PoolEvaluator(processes)
+        except ValueError:
+            print("Error: Pool evaluator processes must be int greater than 0.")
+            return None
+    elif evaluator_type == "Remote":
+        # Imported here, evonum_remote builds on this module
+        from evonum_remote import RemoteEvaluator
+        try:
+            return RemoteEvaluator(processes)
+        except ValueError as e:
+            print(str(e) or "Error: Remote evaluator needs int # of localhost workers greater than 0 or worker host:port addresses.")
+            return None
+    else:
+        print("Error: unknown evaluator type %s." % evaluator_type)
+        return None
+
+
+class GenomeModule(object):
+    """Lightweight fitness module rebuilt from a genome (subtype, coeff) pair.
+
+    Responds exactly like the module it was exported from."""
+
+    def __init__(self, subtype, coeff):
+        self.subtype = subtype
+        self.coeff = coeff
+        self.type_ = "Fitness"
+
+    def getResponse(self, variable):
+        basis = cachedBasis(self.subtype, float(variable))
+        if basis is None:
+            return None
+        return self.coeff * basis
+
+
+class ForceConditions(object):
+    """Picklable copy of a fitness force's conditions for the day."""
+
+    def __init__(self, force):
+        self.type_ = force.type_
+        self.penalty = force.penalty
+        self.conditions = force.conditions
+        self.batch_size = force.batch_size
+        self.batch = force.batch
+        self.basis = force.basis
+
+
+def genomeFitness(genome, fitness_forces, rng=random):
+    """Returns fitness of a genome exported with SmallSolver.exportGenome.
+
+    Random calculators (see RANDOM_CALCULATORS) draw from rng."""
+    calculator_type, module_genes = genome
+    modules = [GenomeModule(subtype, coeff) for subtype, coeff in module_genes]
+    return createFitnessCalculator(calculator_type).calculateFitness(fitness_forces, modules, rng)
+
+
+def genomeSeeds(genomes, rng=random):
+    """Returns seed of each genome drawn from rng, None for genomes that draw nothing.
+
+    One seed is drawn per random calculator genome in population order, so
+    seeds do not depend on how genomes are split into chunks or shards."""
+    return [rng.getrandbits(64) if genome[0] in RANDOM_CALCULATORS else None
+            for genome in genomes]
+
+
+def evaluateGenomes(arguments):
+    """Returns list of fitness for a chunk of genomes. Used by Pool evaluator workers.
+
+    Takes (list of ForceConditions, list of genomes, optional list of seeds).
+    A genome with a seed (see genomeSeeds) draws from a stream with that seed
+    instead of the worker's random module."""
+    fitness_forces, genomes = arguments[:2]
+    seeds = arguments[2] if len(arguments) > 2 else [None] * len(genomes)
+    fitness = []
+    for genome, seed in zip(genomes, seeds):
+        rng = random if seed is None else random.Random(seed)
+        fitness.append(genomeFitness(genome, fitness_forces, rng))
+    return fitness
+
+
+def balanceChunks(genomes, total_chunks):
+    """Split genomes into at most total_chunks consecutive chunks with similar module totals.
+
+    Returns list of (start, end) positions."""
+    weights = [len(genome[1]) + 1 for genome in genomes]
+    target = sum(weights) / float(max(total_chunks, 1))
+    chunks = []
+    start = 0
+    running = 0
+    for pos, weight in enumerate(weights):
+        running += weight
+        if running >= target * (len(chunks) + 1) and len(chunks) < total_chunks - 1:
+            chunks.append((start, pos + 1))
+            start = pos + 1
+    if start < len(genomes):
+        chunks.append((start, len(genomes)))
+    return chunks
+
+
+class EvaluatorInterface(object):
+
+    def evaluate(self, solvers, fitness_forces, rng=random):
+        """Calculate and store fitness for every solver in provided list.
+
+        Fitness calculators that draw random numbers draw them from rng."""
+        error()
+
+    def close(self):
+        """Release any resources held by the evaluator."""
+        pass
+
+    @property
+    def counters(self):
+        """Dictionary of work counted by the evaluator (empty if it counts nothing)"""
+        return {}
+
+    @property
+    def type_(self):
+        return self._type_
+
+
+class SerialEvaluator(EvaluatorInterface):
+    """Evaluates each solver one at a time with its own fitness calculator."""
+
+    def __init__(self):
+        self._type_ = "Serial"
+
+    def evaluate(self, solvers, fitness_forces, rng=random):
+        """Calculate and store fitness for every solver in provided list."""
+        for solver in solvers:
+            solver.calculateFitness(fitness_forces, rng)
+
+
+class IncrementalEvaluator(EvaluatorInterface):
+    """Evaluates each solver one at a time, only calculating modules that changed.
+
+    Linear solvers keep the responses of their modules, followed by their
+    total, for each of the day's conditions (see SmallSolver). Children share their
+    parent's responses, so once the parent is scored, a child is scored by
+    calculating only the modules it mutated, and a solver scored again on
+    the same condition is not calculated at all. Totals are summed again from
+    the cached responses in module order, so fitness matches serial
+    evaluation exactly.
+
+    Counts module responses calculated (module_calls) and reused
+    (module_calls_avoided) for single condition forces. Batch forces and
+    solvers with any other fitness calculator are evaluated serially.
+    """
+
+    def __init__(self):
+        self._type_ = "Incremental"
+        self._calculator = LinearFitness()
+        self._counters = {"module_calls": 0, "module_calls_avoided": 0}
+
+    @property
+    def counters(self):
+        return dict(self._counters)
+
+    def evaluate(self, solvers, fitness_forces, rng=random):
+        """Calculate and store fitness for every solver in provided list."""
+        # (force, condition variable, expected value, basisRow) of each single condition force
+        units = [(item, item.conditions[0], item.conditions[1], basisRow(item.conditions[0]))
+                 if item.batch_size <= 1 and (item.type_ == "Simple" or item.type_ == "Dynamic")
+                 else (item, None, None, None) for item in fitness_forces]
+        conditions = set([variable for item, variable, expected, basis in units if basis is not None])
+        calculated = 0
+        avoided = 0
+        for solver in solvers:
+            if solver.fitness_calculator != "Linear":
+                solver.calculateFitness(fitness_forces, rng)
+                continue
+            modules = solver._modules
+            cache = solver._responses
+            changed = None if solver._dirty is None else set(solver._dirty)
+            if cache is None or changed is not None:
+                # Responses of changed modules go in a new cache, the old one may be shared
+                updated = {}
+            else:
+                updated = cache
+            fitness = 0
+            for item, variable, expected, basis in units:
+                if basis is None:
+                    response = self._calculator.calculateBatchFitness(item, modules) \
+                        if item.batch_size > 1 else item.penalty
+                elif len(modules) == 0:
+                    response = item.penalty
+                else:
+                    # Responses of each module followed by their total
+                    entry = None if cache is None else cache.get(variable)
+                    try:
+                        if entry is None:
+                            entry = array.array("d", [module._coeff * basis[module._subtype]
+                                                      for module in modules])
+                            calculated += len(modules)
+                        elif changed is not None:
+                            entry = array.array("d", entry)
+                            entry.pop()
+                            for pos in changed:
+                                module = modules[pos]
+                                entry[pos] = module._coeff * basis[module._subtype]
+                            calculated += len(changed)
+                            avoided += len(modules) - len(changed)
+                        else:
+                            avoided += len(modules)
+                    except TypeError:  # A module's response is None (math domain failure)
+                        response = None
+                    else:
+                        if entry is not updated.get(variable):
+                            # sum adds responses in module order, same as LinearFitness
+                            entry.append(sum(entry))
+                            updated[variable] = entry
+                        response = -abs(expected - entry[-1])
+                if response is None:
+                    fitness = None
+                    break
+                fitness += response
+            if updated is not cache:
+                solver._responses = updated
+                solver._dirty = None
+            elif len(cache) > len(conditions):
+                # Only the day's conditions are kept
+                for variable in list(cache):
+                    if variable not in conditions:
+                        del cache[variable]
+            solver.assignFitness(fitness)
+        self._counters["module_calls"] += calculated
+        self._counters["module_calls_avoided"] += avoided
+
+
+class VectorizedEvaluator(EvaluatorInterface):
+    """Evaluates all linear-calculator solvers in one batched numpy pass.
+
+    Every module of a given subtype has the same response to the day's
+    condition apart from its coefficient, so the response of each subtype is
+    calculated once per force and every module response is a single multiply.
+    Responses are summed module by module in the same order as LinearFitness,
+    so fitness matches serial evaluation exactly.
+
+    Forces with a basis matrix (Full/Stratified position scoring) instead sum
+    each solver's coefficients by subtype and score every position with one
+    matrix product.
+
+    Math domain failures are carried as NaN and stored as a fitness of None,
+    which sends solvers down the usual withheld/resilience path.
+    Solvers with any other fitness calculator are evaluated serially.
+    """
+
+    def __init__(self):
+        self._type_ = "Vectorized"
+        # Column for each module subtype seen so far. Column 0 is padding
+        # for solvers with fewer modules and always has a response of 0.
+        self._columns = {}
+
+    def _column(self, subtype):
+        """Returns basis column for subtype, adding a new one if needed."""
+        try:
+            return self._columns[subtype]
+        except KeyError:
+            self._columns[subtype] = len(self._columns) + 1
+            return self._columns[subtype]
+
+    def pack(self, solvers):
+        """Pack module subtypes and coefficients of solvers into arrays.
+
+        Returns subtype column array, coefficient array (both solvers x modules)
+        and array with the number of modules of each solver."""
+        width = max([len(solver.modules) for solver in solvers] + [1])
+        columns = []
+        coeffs = []
+        counts = []
+        for solver in solvers:
+            modules = solver.modules
+            padding = width - len(modules)
+            columns.extend([self._column(item.subtype) for item in modules])
+            columns.extend([0] * padding)
+            coeffs.extend([item.coeff for item in modules])
+            coeffs.extend([0.0] * padding)
+            counts.append(len(modules))
+        shape = (len(solvers), width)
+        return (numpy.array(columns, dtype=numpy.intp).reshape(shape),
+                numpy.array(coeffs, dtype=numpy.float64).reshape(shape),
+                numpy.array(counts, dtype=numpy.intp))
+
+    def basis(self, variable):
+        """Returns array of each known subtype's response to variable with coeff 1.
+
+        Undefined responses are NaN."""
+        variable = float(variable)
+        values = numpy.zeros(len(self._columns) + 1)
+        for subtype, column in self._columns.items():
+            basis = cachedBasis(subtype, variable)
+            values[column] = numpy.nan if basis is None else basis
+        return values
+
+    def basisFitness(self, basis, columns, coeffs):
+        """Returns array of every solver's fitness scored with a force's BasisBatch."""
+        # Basis matrix column (MODULE_SUBTYPES index) of each evaluator column
+        subtype_index = numpy.zeros(len(self._columns) + 1, dtype=numpy.intp)
+        for subtype, column in self._columns.items():
+            subtype_index[column] = SUBTYPE_INDEX[subtype]
+        undefined = basis.undefined[subtype_index]
+        undefined[0] = False
+        fitness = basis.fitness(subtype_index[columns], coeffs)
+        fitness[undefined[columns].any(axis=1)] = numpy.nan
+        return fitness
+
+    def unitFitness(self, force, columns, coeffs, counts):
+        """Returns array of every solver's fitness for a single force.
+
+        Forces with a batch of conditions return each solver's mean fitness
+        across the batch."""
+        if force.type_ != "Simple" and force.type_ != "Dynamic":
+            return numpy.full(len(counts), force.penalty, dtype=numpy.float64)
+        if force.basis is not None:
+            unit = self.basisFitness(force.basis, columns, coeffs)
+            unit[counts == 0] = force.penalty
+            return unit
+        if force.batch_size > 1:
+            batch = force.batch
+        else:
+            batch = [force.conditions]
+        unit = numpy.zeros(len(counts))
+        for variable, expected in batch:
+            responses = coeffs * self.basis(variable)[columns]
+            running_total = numpy.zeros(len(counts))
+            for x in range(0, responses.shape[1]):
+                running_total += responses[:, x]
+            unit += -numpy.abs(expected - running_total)
+        if len(batch) > 1:
+            unit /= float(len(batch))
+        # Solvers without modules get the force penalty
+        unit[counts == 0] = force.penalty
+        return unit
+
+    def evaluate(self, solvers, fitness_forces, rng=random):
+        """Calculate and store fitness for every solver in provided list."""
+        linear = []
+        for solver in solvers:
+            if solver.fitness_calculator == "Linear":
+                linear.append(solver)
+            else:
+                solver.calculateFitness(fitness_forces, rng)
+        if len(linear) == 0:
+            return
+        columns, coeffs, counts = self.pack(linear)
+        fitness = numpy.zeros(len(linear))
+        for item in fitness_forces:
+            fitness += self.unitFitness(item, columns, coeffs, counts)
+        for solver, value in zip(linear, fitness.tolist()):
+            # NaN marks a math domain failure
+            solver.assignFitness(None if value != value else value)
+
+
+class PoolEvaluator(EvaluatorInterface):
+    """Evaluates the population in chunks on a pool of worker processes.
+
+    Only the day's force conditions and compact solver genomes are sent to
+    workers. Chunks are balanced by module count, one per worker, and each
+    Dynamic calculator genome draws from its own child stream, so results
+    are the same for any number of processes.
+    The pool is started on first use and kept until close().
+    When already running inside a worker process (ex: parallel worlds),
+    chunks are evaluated in-process instead.
+    """
+
+    def __init__(self, processes=None):
+        self._type_ = "Pool"
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self._processes = int(processes)
+        if self._processes < 1:
+            raise ValueError
+        self._pool = None
+
+    @property
+    def processes(self):
+        return self._processes
+
+    def evaluate(self, solvers, fitness_forces, rng=random):
+        """Calculate and store fitness for every solver in provided list."""
+        if len(solvers) == 0:
+            return
+        conditions = [ForceConditions(item) for item in fitness_forces]
+        genomes = [solver.exportGenome() for solver in solvers]
+        seeds = genomeSeeds(genomes, rng)
+        chunks = [(conditions, genomes[start:end], seeds[start:end])
+                  for start, end in balanceChunks(genomes, self._processes)]
+        if multiprocessing.current_process().daemon:
+            results = [evaluateGenomes(item) for item in chunks]
+        else:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self._processes)
+            results = self._pool.map(evaluateGenomes, chunks)
+        pos = 0
+        for chunk_fitness in results:
+            for fitness in chunk_fitness:
+                solvers[pos].assignFitness(fitness)
+                pos += 1
+
+    def close(self):
+        """Shut down worker pool."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    # Worker pools can not be pickled, a new pool is started after loading.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
@@ -1,7 +1,16 @@
 from __future__ import print_function
 import inspect
-from math import *
 import random
+import types
+from math import *
+from evonum_basis import BasisBatch, loadBasisMatrix
+try:
+    import numpy
+except ImportError:  # Array equations are optional
+    numpy = None
+
+# How position forces pick the positions solvers are scored on each day
+SCORING_TYPES = ["Random", "Full", "Stratified"]
 
 
 def error():
@@ -14,6 +23,71 @@ def badFitnessAttribute(attribute, bad_type, name):
           (attribute, bad_type, name))
 
 
+def compileEquation(equation_string, permitted):
+    """Returns callable that calculates pythonic equation for a single x.
+
+    Takes equation string and dictionary of permitted names.
+    Equation is parsed once; names outside of permitted (other than x) are not
+    allowed to avoid unsecure behavior of eval. Names used inside nested code
+    (ex: lambdas and generator expressions) are checked as well. An equation
+    with unrecognized names returns a callable that raises NameError.
+    Syntax errors are raised immediately.
+    """
+    codes = [compile(equation_string.strip(), "<equation>", "eval")]
+    unrecognized = []
+    while len(codes) > 0:
+        code = codes.pop()
+        unrecognized += [item for item in code.co_names
+                         if item != "x" and item not in permitted]
+        codes += [item for item in code.co_consts if isinstance(item, types.CodeType)]
+    if len(unrecognized) > 0:
+        def unrecognizedEquation(x):
+            raise NameError("Unrecognizable equation %s" % equation_string)
+        return unrecognizedEquation
+    namespace = dict(permitted)
+    namespace["__builtins__"] = None
+    return eval("lambda x: " + equation_string.strip(), namespace)
+
+
+def _arrayLog(x, base=None):
+    if base is None:
+        return numpy.log(x)
+    return numpy.log(x) / numpy.log(base)
+
+
+if numpy is not None:
+    ARRAY_OPERATIONS = {'cos': numpy.cos, 'sin': numpy.sin, 'tan': numpy.tan, 'log': _arrayLog,
+                        'log10': numpy.log10, 'pow': numpy.power, 'pi': pi, 'e': e, 'exp': numpy.exp,
+                        'sqrt': numpy.sqrt, 'fabs': numpy.fabs, 'acos': numpy.arccos,
+                        'asin': numpy.arcsin, 'atan': numpy.arctan}
+else:
+    ARRAY_OPERATIONS = {}
+
+
+def compileArrayEquation(equation_string, permitted):
+    """Returns callable that calculates pythonic equation for an array of x values.
+
+    Same as compileEquation, but each permitted name is replaced with its numpy
+    equivalent. The callable returns a float array with NaN wherever the
+    equation is undefined. Returns None if numpy is not available.
+    """
+    if numpy is None:
+        return None
+    namespace = {item: ARRAY_OPERATIONS.get(item) for item in permitted}
+    equation = compileEquation(equation_string, namespace)
+
+    def arrayEquation(values):
+        values = numpy.asarray(values, dtype=numpy.float64)
+        with numpy.errstate(all="ignore"):
+            try:
+                result = equation(values) + numpy.zeros(values.shape)
+            except (ValueError, ZeroDivisionError):
+                return numpy.full(values.shape, numpy.nan)
+        result[~numpy.isfinite(result)] = numpy.nan
+        return result
+    return arrayEquation
+
+
 def createFitnessForce(force_type, force_subtype, conditions):
     """Returns new fitness force of type, subtype, and conditions.
     Conditions differ depending on what subtype is being created.
@@ -47,7 +121,7 @@ class FitnessInterface(object):
     def __init__(self, name):
         error()
 
-    def beginDay(self):
+    def beginDay(self, rng=random):
         error()
 
     def loadConditions(self, *args):
@@ -56,7 +130,7 @@ class FitnessInterface(object):
     def getDescription(self):
         error()
 
-    def _setConditions(self):
+    def _setConditions(self, rng=random):
         error()
 
     @property
@@ -83,6 +157,46 @@ class FitnessInterface(object):
         """Returns value and expected response"""
         return self._current_condition, self._current_expected
 
+    @property
+    def batch_size(self):
+        """Number of conditions drawn each day. Solvers are scored on the mean across the batch.
+
+        Max = 1000, Min = 1"""
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, value):
+        try:
+            value = int(value)
+        except ValueError:
+            badFitnessAttribute("batch size", type(value), self._name)
+            return
+        if value > 1000:
+            value = 1000
+        elif value < 1:
+            value = 1
+        self._batch_size = value
+
+    @property
+    def batch(self):
+        """Returns list of [value, expected response] for each of the day's conditions"""
+        if len(self._batch) == 0:
+            return [self.conditions]
+        return self._batch
+
+    def _setBatchConditions(self, rng=random):
+        """Set batch_size conditions for the day drawn from rng, current condition is the last one drawn."""
+        batch = []
+        for x in range(0, self._batch_size):
+            self._setConditions(rng)
+            batch.append(self.conditions)
+        self._batch = batch
+
+    @property
+    def basis(self):
+        """BasisBatch that scores linear solvers on the day's conditions at once, None if not used."""
+        return None
+
     @property
     def flexibility(self):
         """Returns number of times a fitness force condition must fail before run termination.
@@ -106,6 +220,11 @@ class SimplePosition(FitnessInterface):
                    expected values
 
     If no conditions are loaded, fitness force will always select 0 and expect 0.
+
+    setScoring switches from random positions to scoring on every position
+    (Full) or a fixed subset of evenly spaced positions (Stratified) each day.
+    Both use a basis matrix so linear solvers are scored with one
+    matrix-vector product instead of one response per module per position.
     """
 
     def __init__(self, name="Unnamed Simple Position Fitness Force"):
@@ -119,20 +238,92 @@ class SimplePosition(FitnessInterface):
         self._type_ = "Simple"
         self._penalty = -99999999999
         self._flexibility = 1
+        self._batch_size = 1
+        self._batch = []
+        self._scoring = "Random"
+        self._strata = None
+        self._basis_batch = None
 
     def getDescription(self):
-        return "%s Fitness. Name: %s Age: %d, Current Condition: %d, Current Desire: %d" % (self._type_, self._name, self._age, self._current_condition, self._current_expected)
+        description = "%s Fitness. Name: %s Age: %d, Current Condition: %d, Current Desire: %d" % (self._type_, self._name, self._age, self._current_condition, self._current_expected)
+        if self._scoring != "Random":
+            description += ", Scoring: %s of %d positions" % (self._scoring, len(self._batch))
+        return description
+
+    @property
+    def scoring(self):
+        return self._scoring
+
+    @property
+    def basis(self):
+        return self._basis_batch
+
+    def setScoring(self, scoring, strata=None):
+        """Set how positions are chosen: Random (default), Full or Stratified.
+
+        Random scores solvers on batch_size random positions each day.
+        Full scores every position and Stratified scores strata evenly spaced
+        positions (the middle of each stratum). Full and Stratified positions
+        are the same every day and require numpy.
+        Returns False if scoring could not be set."""
+        scoring = str(scoring)
+        if scoring == "Random":
+            self._scoring = scoring
+            self._strata = None
+            self._basis_batch = None
+            self._batch = []
+            self._batch_size = 1
+            return True
+        if scoring == "Full":
+            positions = range(1, self._max_ + 1)
+        elif scoring == "Stratified":
+            try:
+                strata = min(int(strata), self._max_)
+            except (TypeError, ValueError):
+                print("Error: Stratified scoring needs int number of strata.")
+                return False
+            if strata < 1:
+                print("Error: Stratified scoring needs at least 1 stratum.")
+                return False
+            positions = [int((x + .5) * self._max_ / strata) + 1 for x in range(0, strata)]
+        else:
+            print("Error: unknown scoring %s, must be one of %s." % (scoring, ", ".join(SCORING_TYPES)))
+            return False
+        matrix = loadBasisMatrix(self._max_)
+        if matrix is None:
+            return False
+        self._scoring = scoring
+        self._strata = strata if scoring == "Stratified" else None
+        self._basis_batch = BasisBatch(matrix, positions, self._expected)
+        self._batch = [(item, self._expected[item - 1]) for item in positions]
+        self._batch_size = len(self._batch)
+        self._current_condition, self._current_expected = self._batch[-1]
+        return True
+
+    # Basis batches hold arrays taken from a memory-mapped file, rebuild after loading.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_basis_batch"] = None
+        return state
+
+    def __setstate__(self, state):
+        self._scoring = "Random"  # Forces saved before scoring existed
+        self._strata = None
+        self.__dict__.update(state)
+        if self._scoring != "Random":
+            self.setScoring(self._scoring, self._strata)
 
     # Randomly select a variable and get the expected value at that position
-    def _setConditions(self):
+    def _setConditions(self, rng=random):
         """Randomly selects position and sets expected as value at that position."""
-        self._current_condition = random.randint(self._min_, self._max_)
+        self._current_condition = rng.randint(self._min_, self._max_)
         self._current_expected = self._expected[self._current_condition - 1]
 
-    def beginDay(self):
-        """Increments age by 1 and sets day's conditions"""
+    def beginDay(self, rng=random):
+        """Increments age by 1 and sets day's conditions drawn from rng"""
         self._age += 1
-        self._setConditions()
+        if self._scoring == "Random":
+            self._setBatchConditions(rng)
 
     # Conditions are loaded for this fitness force as an ordered list of
     # values from a file.
@@ -150,6 +341,8 @@ class SimplePosition(FitnessInterface):
         if self._max_ == 0:
             raise ValueError(
                 "Error: ordered list loaded for Position Force is empty!")
+        if self._scoring != "Random":
+            self.setScoring(self._scoring, self._strata)
 
 
 # Equation fitness force randomly generates variable and calculates expected
@@ -184,7 +377,11 @@ class SimpleEquation(FitnessInterface):
         self._permitted = {item: globals().get(item)
                            for item in self._operations}
         self._equation_string = ''
+        self._equation = compileEquation("0", self._permitted)
+        self._array_equation = None
         self._flexibility = 100
+        self._batch_size = 1
+        self._batch = []
 
     # Property management
     @property
@@ -226,28 +423,45 @@ class SimpleEquation(FitnessInterface):
     def getDescription(self):
         return "%s Fitness. Name: %s, Equation: %s, Current Condition: %.2f, Current Desire: %.2f" % (self._type_, self._name, self._equation_string, self._current_condition, self._current_expected)
 
-    def _setConditions(self):
+    def _setConditions(self, rng=random):
         """Randomly select value and calculated expected value using provided equation."""
         for attempts in range(0, self._flexibility):
-            self._current_condition = random.random() * (self._max_ - self._min_) + self._min_
-            self._permitted['x'] = self._current_condition
+            self._current_condition = rng.random() * (self._max_ - self._min_) + self._min_
             try:
-                self._current_expected = eval(self._equation_string, {
-                                              "__builtins__": None}, self._permitted)
+                self._current_expected = self._equation(self._current_condition)
             except (ValueError, ZeroDivisionError):
                 continue
-            except NameError:
-                raise NameError("Unrecognizable equation %s" %
-                                self._equation_string)
             else:
                 return
         raise ValueError("Equation force solution is undefined 100 times in a row, check value range. Equation: %s, Max: %.2f, Min: %.2f" % (
             self._equation_string, self._max_, self._min_))
 
-    def beginDay(self):
-        """Increment age by 1 and set day's conditions"""
+    def beginDay(self, rng=random):
+        """Increment age by 1 and set day's conditions drawn from rng"""
         self._age += 1
-        self._setConditions()
+        self._setBatchConditions(rng)
+
+    def expectedArray(self, values):
+        """Returns numpy array of expected values for an array of variables.
+
+        Undefined solutions are NaN. Requires numpy."""
+        if self._array_equation is None:
+            raise ImportError("numpy is required for array equations.")
+        return self._array_equation(values)
+
+    # Compiled equations can not be pickled, recompile after loading.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_equation"]
+        del state["_array_equation"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._equation = compileEquation(
+            self._equation_string or "0", self._permitted)
+        self._array_equation = compileArrayEquation(
+            self._equation_string or "0", self._permitted)
 
     def loadConditions(self, conditions):
         """Load conditions from script file.
@@ -273,6 +487,9 @@ class SimpleEquation(FitnessInterface):
         else:
             self.max_ = maximum
             self.min_ = min(float(conditions[-2]), float(conditions[-1]))
+        self._equation = compileEquation(self._equation_string, self._permitted)
+        self._array_equation = compileArrayEquation(
+            self._equation_string, self._permitted)
 
 # TODO: Needs further testing and improvements
 
@@ -304,10 +521,14 @@ class DynamicEquation(FitnessInterface):
         self._permitted = {item: globals().get(item)
                            for item in self._operations}
         self._equation_string = ''
+        self._equation = compileEquation("0", self._permitted)
+        self._array_equation = None
         # Initialize vector of 50 equal probabilities. Values are broken into
         # 50 sets.
         self._condition_probabilities = [100] * 10
         self._flexibility = 100
+        self._batch_size = 1
+        self._batch = []
 
         # Store past solver performance
         self._avg_fitness = [0, 0]
@@ -366,12 +587,12 @@ class DynamicEquation(FitnessInterface):
     def getDescription(self):
         return "%s Fitness. Name: %s Age: %d, Current Condition: %.2f, Current Desire: %.2f" % (self._type_, self._name, self._age, self._current_condition, self._current_expected)
 
-    def _setConditions(self):
+    def _setConditions(self, rng=random):
         """Randomly select value based on probabilities and calculate expected with equation"""
         for attempts in range(0, self._flexibility):
             running_range_prob = 0
             sum_prob = sum(self._condition_probabilities)
-            random_range = random.random() * sum_prob
+            random_range = rng.random() * sum_prob
             range_selection = 9
 
             # Randomly select a section of potential variables based on all
@@ -386,11 +607,9 @@ class DynamicEquation(FitnessInterface):
             # day's variable
             current_min = self._min_ + range_selection * self._step_size
             current_max = current_min + self._step_size
-            self._current_condition = random.random() * (current_max - current_min) + current_min
-            self._permitted['x'] = self._current_condition
+            self._current_condition = rng.random() * (current_max - current_min) + current_min
             try:
-                self._current_expected = eval(self._equation_string, {
-                                              "__builtins__": None}, self._permitted)
+                self._current_expected = self._equation(self._current_condition)
             except ValueError:
                 continue
             else:
@@ -398,10 +617,32 @@ class DynamicEquation(FitnessInterface):
             raise ValueError("Equation has undefined solution 100 times in a row. Check min/max. Equation: %s, Min: %.2f, Max: %.2f" %
                              (self._equation_string, self._min_, self._max_))
 
-    def beginDay(self):
-        """Increment age by 1 and set day's conditions"""
+    def beginDay(self, rng=random):
+        """Increment age by 1 and set day's conditions drawn from rng"""
         self._age += 1
-        self._setConditions()
+        self._setBatchConditions(rng)
+
+    def expectedArray(self, values):
+        """Returns numpy array of expected values for an array of variables.
+
+        Undefined solutions are NaN. Requires numpy."""
+        if self._array_equation is None:
+            raise ImportError("numpy is required for array equations.")
+        return self._array_equation(values)
+
+    # Compiled equations can not be pickled, recompile after loading.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_equation"]
+        del state["_array_equation"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._equation = compileEquation(
+            self._equation_string or "0", self._permitted)
+        self._array_equation = compileArrayEquation(
+            self._equation_string or "0", self._permitted)
 
     def loadConditions(self, conditions):
         """Load conditions from script file.
@@ -426,6 +667,9 @@ class DynamicEquation(FitnessInterface):
         else:
             self.max_ = maximum
             self.min_ = min(float(conditions[-2]), float(conditions[-1]))
+        self._equation = compileEquation(self._equation_string, self._permitted)
+        self._array_equation = compileArrayEquation(
+            self._equation_string, self._permitted)
         self._step_size = float(self._max_ - self._min_) / \
             len(self._condition_probabilities)
 
@@ -0,0 +1,108 @@
+from __future__ import print_function
+import codecs
+import gzip
+import json
+import re
+try:
+    import lzma
+except ImportError:  # lzma is optional (Python 2 needs backports.lzma)
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+# Streaming solver files hold one compact JSON solver per line (JSON Lines).
+# Files ending in .gz are gzip compressed and files ending in .xz are lzma compressed.
+# Legacy files hold a single JSON array of solvers, they are still read
+# incrementally but can only be written uncompressed.
+
+CHUNK_SIZE = 65536
+SEPARATORS = re.compile(r"[\s,\[\]]*")
+
+
+def openSolverFile(filename, mode="r"):
+    """Returns file object for solver file, compressed according to extension.
+
+    mode is "r" or "w". Raises IOError if file can not be opened or lzma is unavailable."""
+    filename = str(filename)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "b")
+    elif filename.endswith(".xz"):
+        if lzma is None:
+            raise IOError("lzma module is required for %s" % filename)
+        return lzma.open(filename, mode + "b")
+    return open(filename, mode + "b")
+
+
+def writeSolvers(filename, solver_dicts):
+    """Write exported solver dictionaries one per line as they are produced.
+
+    Takes filename and iterable of solver dictionaries (ex: Terrarium.iterExportDicts()).
+    Returns number of solvers written."""
+    total = 0
+    outfile = openSolverFile(filename, "w")
+    try:
+        for item in solver_dicts:
+            outfile.write((json.dumps(item, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8"))
+            total += 1
+    finally:
+        outfile.close()
+    return total
+
+
+def writeSolverArray(filename, solver_dicts):
+    """Write exported solver dictionaries as legacy indented JSON array, one solver at a time.
+
+    Nothing is written if there are no solvers. Returns number of solvers written."""
+    total = 0
+    outfile = None
+    try:
+        for item in solver_dicts:
+            if outfile is None:
+                outfile = open(filename, "w")
+                outfile.write("[\n")
+            else:
+                outfile.write(",\n")
+            outfile.write(json.dumps(item, indent=2, sort_keys=True))
+            total += 1
+        if outfile is not None:
+            outfile.write("\n]\n")
+    finally:
+        if outfile is not None:
+            outfile.close()
+    return total
+
+
+def readSolvers(filename):
+    """Generator of solver dictionaries read from JSON Lines or legacy JSON array file.
+
+    Both formats are decoded one solver at a time from buffered chunks, so
+    whole files are never held in memory."""
+    infile = openSolverFile(filename, "r")
+    try:
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder("utf-8")()
+        buffered = ""
+        pos = 0
+        finished = False
+        while True:
+            # Skip separators between solvers (whitespace, array brackets and commas)
+            pos = SEPARATORS.match(buffered, pos).end()
+            if pos < len(buffered):
+                try:
+                    item, pos = decoder.raw_decode(buffered, pos)
+                except ValueError:
+                    if finished:
+                        raise ValueError("Error: incomplete or bad solver in %s" % filename)
+                else:
+                    yield item
+                    continue
+            elif finished:
+                return
+            # Solver continues in (or starts in) next chunk
+            chunk = infile.read(CHUNK_SIZE)
+            finished = len(chunk) == 0
+            buffered = buffered[pos:] + text.decode(chunk, finished)
+            pos = 0
+    finally:
+        infile.close()
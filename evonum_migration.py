@@ -0,0 +1,100 @@
+from __future__ import print_function
+
+# Island model: worlds evolve on their own and every few days each world
+# sends copies of its fittest solvers (exported dictionaries) to its
+# neighbouring worlds, which import them with importSolvers. Neighbours are
+# defined by the topology: Ring sends to the next world (the last world sends
+# to the first), Full sends to every other world.
+
+MIGRATION_TOPOLOGIES = ["Ring", "Full"]
+
+
+def createMigration(days, total, topology="Ring"):
+    """Returns new Migration of total solvers every days days over topology (Ring or Full).
+
+    Returns None if migration creation failed."""
+    try:
+        days = int(days)
+        total = int(total)
+    except (TypeError, ValueError):
+        print("Error: migration days and # of migrants must be int.")
+        return None
+    if days < 1 or total < 1:
+        print("Error: migration days and # of migrants must be at least 1.")
+        return None
+    topology = str(topology)
+    if topology not in MIGRATION_TOPOLOGIES:
+        print("Error: unknown migration topology %s." % topology)
+        return None
+    return Migration(days, total, topology)
+
+
+def migrationRoutes(topology, total_worlds):
+    """Returns list of destination world positions for each world position."""
+    routes = []
+    for pos in range(0, total_worlds):
+        if topology == "Ring":
+            routes.append([(pos + 1) % total_worlds] if total_worlds > 1 else [])
+        else:
+            routes.append([x for x in range(0, total_worlds) if x != pos])
+    return routes
+
+
+class Migration(object):
+    """Every days rounds, each world sends its total fittest solvers to its neighbours.
+
+    Migrants are routed in world order, so each world receives migrants from
+    lower numbered worlds first. Serial and parallel runs migrate the same solvers.
+    """
+
+    def __init__(self, days, total, topology="Ring"):
+        self._days = days
+        self._total = total
+        self._topology = topology
+
+    @property
+    def days(self):
+        return self._days
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def topology(self):
+        return self._topology
+
+    @property
+    def settings(self):
+        """Returns [days, total, topology], the arguments of createMigration"""
+        return [self._days, self._total, self._topology]
+
+    def due(self, rounds):
+        """True if worlds migrate after rounds days stepped."""
+        return rounds % self._days == 0
+
+    def emigrants(self, world):
+        """Returns exported dictionaries of the solvers world sends to each neighbour."""
+        return world.exportTop(self._total)
+
+    def route(self, emigrants):
+        """Takes list of emigrants of each world, returns list of migrants arriving at each world."""
+        incoming = [[] for item in emigrants]
+        for source, destinations in enumerate(migrationRoutes(self._topology, len(emigrants))):
+            for destination in destinations:
+                incoming[destination].extend(emigrants[source])
+        return incoming
+
+    def settle(self, world, migrants):
+        """Import migrants into world."""
+        if len(migrants) > 0:
+            world.importSolvers(migrants)
+
+    def migrate(self, worlds):
+        """Move migrants between worlds held in this process.
+
+        Worlds that have finished their schedule are None, they neither send nor receive migrants."""
+        incoming = self.route([[] if world is None else self.emigrants(world) for world in worlds])
+        for world, migrants in zip(worlds, incoming):
+            if world is not None:
+                self.settle(world, migrants)
@@ -4,6 +4,10 @@ import inspect
 import math
 import random
 from evonum_mutations import *
+try:
+    intern
+except NameError:  # Python 3
+    from sys import intern
 
 
 def error():
@@ -18,10 +22,11 @@ MODULE_SUBTYPES = ["Power_1", "Power_2", "Power_3", "Power_4", "Power_5", "Log",
 #MODULE_SUBTYPES = ["Sine_1", "Sine_2", "Sine_3", "Sine_4", "Sine_5", "Cosine_1", "Cosine_2", "Cosine_3", "Cosine_4", "Cosine_5"]
 
 
-def createModule(module_type="Fitness", module_subtype="Random"):
+def createModule(module_type="Fitness", module_subtype="Random", rng=random):
     """Returns a new module of provided type and subtype.
 
     If provided subtype is "Random" then randomly selects subtype from defined list.
+    Random subtype, power and coefficient are drawn from rng.
     """
 #    max_power = 5
 #    min_power = -5
@@ -30,26 +35,26 @@ def createModule(module_type="Fitness", module_subtype="Random"):
     if module_type == "Fitness":
         if module_subtype == "Random":
             module_subtype = MODULE_SUBTYPES[
-                random.randint(1, len(MODULE_SUBTYPES)) - 1]
+                rng.randint(1, len(MODULE_SUBTYPES)) - 1]
         if module_subtype.startswith("Power"):
             if module_subtype == "Power":
-                new_module = PowerSolution()
+                new_module = PowerSolution(rng=rng)
             else:
-                new_module = PowerSolution(int(module_subtype.split("_")[1]))
+                new_module = PowerSolution(int(module_subtype.split("_")[1]), rng)
         elif module_subtype.startswith("Sine"):
             if module_subtype == "Sine":
-                new_module = SineSolution()
+                new_module = SineSolution(rng=rng)
             else:
-                new_module = SineSolution(int(module_subtype.split("_")[1]))
+                new_module = SineSolution(int(module_subtype.split("_")[1]), rng)
         elif module_subtype == "Log":
-            new_module = LogSolution()
+            new_module = LogSolution(rng)
         elif module_subtype == "Ln":
-            new_module = NaturalLogSolution()
+            new_module = NaturalLogSolution(rng)
         elif module_subtype.startswith("Cosine"):
             if module_subtype == "Cosine":
-                new_module = CosineSolution()
+                new_module = CosineSolution(rng=rng)
             else:
-                new_module = CosineSolution(int(module_subtype.split("_")[1]))
+                new_module = CosineSolution(int(module_subtype.split("_")[1]), rng)
         else:
             print("Error: unrecognized fitness module subtype, unable to create module.")
             new_module = None
@@ -59,7 +64,7 @@ def createModule(module_type="Fitness", module_subtype="Random"):
     return new_module
 
 
-def createUniqueModule(module_type, present_subtypes):
+def createUniqueModule(module_type, present_subtypes, rng=random):
     """Returns a new module of provided type that is not within the provided list of subtypes.
 
     If provided list of subtypes contain all possible subtypes, new module is of random subtype."""
@@ -73,16 +78,16 @@ def createUniqueModule(module_type, present_subtypes):
                 print("Error: present_subtypes must be iterable for createUniqueModule")
                 return None
         try:
-            sel = random.choice(potential_subtypes)
+            sel = rng.choice(potential_subtypes)
         except IndexError:
             sel = "Random"
-        return createModule(module_type, sel)
+        return createModule(module_type, sel, rng)
     else:
         print("Error: unknown module type, unable to create unique module!")
         return None
 
 
-def mergeFitnessModules(module_a, module_b):
+def mergeFitnessModules(module_a, module_b, rng=random):
     """Merge two fitness modules of the same subtype.
 
     Takes two modules.
@@ -92,7 +97,7 @@ def mergeFitnessModules(module_a, module_b):
     if module_a.type_ == "Fitness" and module_b.type_ == "Fitness":
         if module_a.subtype == module_b.subtype:
             merged_module = createModule(
-                module_a.type_, module_a.subtype)
+                module_a.type_, module_a.subtype, rng)
             module_a_vals = module_a.mutatable()
             module_b_vals = module_b.mutatable()
             combined_vals = {}
@@ -101,7 +106,7 @@ def mergeFitnessModules(module_a, module_b):
                     item] + module_b_vals[item]
             merged_module.importAttributes(combined_vals)
             new_module = createUniqueModule(
-                "Fitness", merged_module.subtype)
+                "Fitness", merged_module.subtype, rng)
             return merged_module, new_module
         else:
             print ("Failed to merge modules of different subtypes.")
@@ -111,7 +116,7 @@ def mergeFitnessModules(module_a, module_b):
         return module_a, module_b
 
 
-def importModule(module_dict):
+def importModule(module_dict, rng=random):
     """Create a new module with a predefined property dictionary.
 
     Takes dictionary and returns module."""
@@ -124,7 +129,7 @@ def importModule(module_dict):
         print("Error: module dict must be iteratable for importModule! No module created.")
         return None
     new_module = createModule(
-        module_dict["_type_"], module_dict["_subtype"])
+        module_dict["_type_"], module_dict["_subtype"], rng)
     if new_module:
         new_module.importAttributes(module_dict)
     else:
@@ -134,7 +139,145 @@ def importModule(module_dict):
     return new_module
 
 
+def geneModule(subtype, coeff, spread=10):
+    """Returns fitness module of subtype with provided coeff and spread.
+
+    Unlike createModule, no random numbers are drawn. Used to rebuild modules
+    stored outside of module objects (ex: array populations).
+    Returns None for unknown subtype."""
+    subtype = str(subtype)
+    if subtype.startswith("Power_"):
+        new_module = PowerSolution.__new__(PowerSolution)
+        new_module._power = int(subtype.split("_")[1])
+    elif subtype.startswith("Sine_"):
+        new_module = SineSolution.__new__(SineSolution)
+        new_module._pow = int(subtype.split("_")[1])
+    elif subtype.startswith("Cosine_"):
+        new_module = CosineSolution.__new__(CosineSolution)
+        new_module._pow = int(subtype.split("_")[1])
+    elif subtype == "Log":
+        new_module = LogSolution.__new__(LogSolution)
+    elif subtype == "Ln":
+        new_module = NaturalLogSolution.__new__(NaturalLogSolution)
+    else:
+        print("Error: unrecognized fitness module subtype %s, unable to create module." % subtype)
+        return None
+    if subtype != "Log" and subtype != "Ln":
+        new_module._subtype = intern(subtype)
+    new_module._coeff = coeff
+    new_module._spread = spread
+    return new_module
+
+
+_SLOT_NAMES = {}
+
+
+def slotNames(cls):
+    """Returns tuple of every __slots__ attribute defined by class and its bases."""
+    try:
+        return _SLOT_NAMES[cls]
+    except KeyError:
+        names = []
+        for base in reversed(cls.__mro__):
+            slots = base.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend([item for item in slots if item not in names])
+        _SLOT_NAMES[cls] = tuple(names)
+        return _SLOT_NAMES[cls]
+
+
+def slotState(obj):
+    """Returns dictionary of the set __slots__ attributes of obj. Used for pickling."""
+    state = {}
+    for item in slotNames(obj.__class__):
+        try:
+            state[item] = getattr(obj, item)
+        except AttributeError:
+            continue
+    return state
+
+
+def setSlotState(obj, state):
+    """Restore __slots__ attributes from dictionary made with slotState."""
+    for item in state:
+        setattr(obj, item, state[item])
+
+
+def moduleBasis(subtype, variable):
+    """Returns the response of a fitness module subtype with a coefficient of 1.
+
+    Takes subtype string (ex: Sine_3) and float variable.
+    Raises ValueError/ZeroDivisionError for math domain failures exactly like
+    the module's calculator, so coeff * moduleBasis(subtype, x) equals the
+    module's response.
+    """
+    subtype = str(subtype)
+    if subtype.startswith("Power_"):
+        return pow(variable, int(subtype.split("_")[1]))
+    elif subtype.startswith("Sine_"):
+        return pow(math.sin(variable), int(subtype.split("_")[1]))
+    elif subtype.startswith("Cosine_"):
+        return pow(math.cos(variable), int(subtype.split("_")[1]))
+    elif subtype == "Log":
+        return math.log(variable, 10)
+    elif subtype == "Ln":
+        return math.log(variable)
+    else:
+        raise TypeError("Error: unrecognized fitness module subtype %s." % subtype)
+
+
+# Day-scoped cache of module responses with a coefficient of 1. Every solver
+# sees the same force conditions on a given day, so each subtype's response
+# to a condition is calculated once and every module response is one multiply
+# by its coefficient. The cache holds a BasisRow per variable (force
+# condition) mapping subtype to response. Math domain failures are cached as
+# None so they are only attempted once.
+# Terrarium clears the cache at the start of each day. Cached values never go
+# stale (they only depend on subtype and variable), clearing only bounds memory.
+_BASIS_CACHE = {}
+MAX_BASIS_ROWS = 10000  # Cleared when full if nothing clears it daily
+
+
+class BasisRow(dict):
+    """Responses of each subtype to one variable, calculated on first lookup."""
+
+    def __init__(self, variable):
+        dict.__init__(self)
+        self.variable = float(variable)
+
+    def __missing__(self, subtype):
+        try:
+            value = moduleBasis(subtype, self.variable)
+        except (ValueError, ZeroDivisionError):
+            value = None
+        self[subtype] = value
+        return value
+
+
+def basisRow(variable):
+    """Returns the day's BasisRow for float variable."""
+    try:
+        return _BASIS_CACHE[variable]
+    except KeyError:
+        if len(_BASIS_CACHE) >= MAX_BASIS_ROWS:
+            _BASIS_CACHE.clear()
+        row = _BASIS_CACHE[variable] = BasisRow(variable)
+        return row
+
+
+def cachedBasis(subtype, variable):
+    """Returns moduleBasis(subtype, variable) from the day's cache, None if undefined."""
+    return basisRow(variable)[subtype]
+
+
+def clearBasisCache():
+    """Forget cached module responses (called at the start of each day)."""
+    _BASIS_CACHE.clear()
+
+
 class ModuleInterface(object):
+    __slots__ = ()
 
     def mutate():
         error()
@@ -157,8 +300,15 @@ class ModuleInterface(object):
 
 
 class FitnessModuleInterface(ModuleInterface):
-
-    def mutate(self):
+    # Modules only store their coefficient, spread and (for some subtypes)
+    # power per instance. Settings shared by every module are class constants.
+    __slots__ = ("_coeff", "_spread")
+    _type_ = "Fitness"
+    _min_coeff = -100  # Boundaries of initial coefficient
+    _max_coeff = 100
+    _permitted = ("coeff", "spread")
+
+    def mutate(self, deviation=None, rng=random):
         error()
 
     def getResponse(self, variable):
@@ -166,21 +316,38 @@ class FitnessModuleInterface(ModuleInterface):
 
         If module response is undefined for fitness power variable,
         due to math domain/zero division error, return None.
+        Responses come from the day's basis cache (see cachedBasis), the
+        same value calculator would return.
         """
         try:
             variable = float(variable)
         except ValueError:
             raise TypeError(
                 "Error: variable sent fitness module is of bad type %s, must be convertable to float." % type(variable))
-        try:
-            response = self.calculator(variable)
-        except (ValueError, ZeroDivisionError):
-            response = None
-        return response
+        basis = basisRow(variable)[self._subtype]
+        if basis is None:
+            return None
+        return self._coeff * basis
 
     def calculator(self, variable):
         error()
 
+    def copy(self):
+        """Return an independent copy of module.
+
+        All module properties are immutable values, so a shallow copy is
+        enough."""
+        clone = self.__class__.__new__(self.__class__)
+        for item in slotNames(self.__class__):
+            setattr(clone, item, getattr(self, item))
+        return clone
+
+    def __getstate__(self):
+        return slotState(self)
+
+    def __setstate__(self, state):
+        setSlotState(self, state)
+
     def importAttributes(self, value_dictionary):
         error()
 
@@ -243,28 +410,23 @@ class PowerSolution(FitnessModuleInterface):
 
     Can only be merged with Power subtypes of equal n.
     """
+    __slots__ = ("_power", "_subtype")
 
-    def __init__(self, power=None):
+    def __init__(self, power=None, rng=random):
         if power is None:
-            self._power = random.randint(1, 5)
+            self._power = rng.randint(1, 5)
         else:
             try:
                 power = int(power)
             except ValueError:
                 print(
                     "Error: Bad power type %s sent to Power Module, using random power" % type(power))
-                power = random.randint(1, 5)
+                power = rng.randint(1, 5)
             self._power = int(power)
-        # Set boundaries of what coefficient can be initialized at.
-        self._min_coeff = -100
-        self._max_coeff = 100
-
         # Randomly select starting coefficient
-        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff)
-        self._type_ = "Fitness"
-        self._subtype = "Power_" + str(self._power)
+        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff, rng)
+        self._subtype = intern("Power_" + str(self._power))
         self._spread = 10
-        self._permitted = ["coeff", "spread"]
 
     # Property management
     @property
@@ -294,9 +456,12 @@ class PowerSolution(FitnessModuleInterface):
         """Returns single fitness reponse to single value."""
         return self._coeff * pow(variable, self._power)
 
-    def mutate(self):
-        """mutate a single mutatable property"""
-        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread)
+    def mutate(self, deviation=None, rng=random):
+        """mutate a single mutatable property
+
+        Optional deviation is a pre-drawn standard normal value (see Mutations.GaussianMutation),
+        otherwise one is drawn from rng."""
+        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread, deviation, rng)
 
     # I/O
     def getDescription(self):
@@ -329,26 +494,22 @@ class SineSolution(FitnessModuleInterface):
 
     Can only be merged with Sine subtypes of equal n.
     """
+    __slots__ = ("_pow", "_subtype")
 
-    def __init__(self, power=None):
-        # Set boundaries of what coefficient can be initialized at.
-        self._min_coeff = -100
-        self._max_coeff = 100
-        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff)
-        self._type_ = "Fitness"
+    def __init__(self, power=None, rng=random):
+        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff, rng)
         if power is None:
-            self._pow = random.randint(1, 5)
+            self._pow = rng.randint(1, 5)
         else:
             try:
                 power = int(power)
             except ValueError:
                 print(
                     "Error: Bad power type %s sent to Sine Module, using random power" % type(power))
-                power = random.randint(1, 5)
+                power = rng.randint(1, 5)
             self._pow = power
-        self._subtype = "Sine" + "_" + str(self._pow)
+        self._subtype = intern("Sine" + "_" + str(self._pow))
         self._spread = 10
-        self._permitted = ["coeff", "spread"]
 
     # Property management
     @property
@@ -378,9 +539,9 @@ class SineSolution(FitnessModuleInterface):
         """Returns single fitness reponse to single value."""
         return self._coeff * pow(math.sin(variable), self._pow)
 
-    def mutate(self):
+    def mutate(self, deviation=None, rng=random):
         """Mutate a single mutatable property"""
-        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread)
+        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread, deviation, rng)
 
     def getDescription(self):
         """Returns string of important properties"""
@@ -412,25 +573,22 @@ class CosineSolution(FitnessModuleInterface):
 
     Can only be merged with Cosine subtypes of equal n.
     """
+    __slots__ = ("_pow", "_subtype")
 
-    def __init__(self, power=None):
-        self._min_coeff = -100
-        self._max_coeff = 100
-        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff)
-        self._type_ = "Fitness"
+    def __init__(self, power=None, rng=random):
+        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff, rng)
         if power is None:
-            self._pow = random.randint(1, 5)
+            self._pow = rng.randint(1, 5)
         else:
             try:
                 power = int(power)
             except ValueError:
                 print(
                     "Error: Bad power type %s sent to Cosine Module, using random power" % type(power))
-                power = random.randint(1, 5)
+                power = rng.randint(1, 5)
             self._pow = int(power)
-        self._subtype = "Cosine" + "_" + str(self._pow)
+        self._subtype = intern("Cosine" + "_" + str(self._pow))
         self._spread = 10
-        self._permitted = ["coeff", "spread"]
 
     # Property management
     @property
@@ -458,8 +616,8 @@ class CosineSolution(FitnessModuleInterface):
     def calculator(self, variable):
         return self._coeff * pow(math.cos(variable), self._pow)
 
-    def mutate(self):
-        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread)
+    def mutate(self, deviation=None, rng=random):
+        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread, deviation, rng)
 
     def getDescription(self):
         string = "%s, %s: Response = %.2f * cosine^%d(variable)" % (
@@ -485,16 +643,13 @@ class LogSolution(FitnessModuleInterface):
     Mutatable properties:
     -coefficient
     """
+    __slots__ = ()
+    _subtype = "Log"
+    _base = 10
 
-    def __init__(self):
-        self._min_coeff = -100
-        self._max_coeff = 100
-        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff)
-        self._base = 10
-        self._type_ = "Fitness"
-        self._subtype = "Log"
+    def __init__(self, rng=random):
+        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff, rng)
         self._spread = 10
-        self._permitted = ["coeff", "spread"]
 
     # Property management
     @property
@@ -522,8 +677,8 @@ class LogSolution(FitnessModuleInterface):
     def calculator(self, variable):
         return self._coeff * math.log(variable, self._base)
 
-    def mutate(self):
-        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread)
+    def mutate(self, deviation=None, rng=random):
+        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread, deviation, rng)
 
     def getDescription(self):
         string = "%s, %s: Response = %.2f * log[base %d](variable)" % (
@@ -550,15 +705,12 @@ class NaturalLogSolution(FitnessModuleInterface):
     Mutatable properties:
     -coefficient
     """
+    __slots__ = ()
+    _subtype = "Ln"
 
-    def __init__(self):
-        self._min_coeff = -100
-        self._max_coeff = 100
-        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff)
-        self._type_ = "Fitness"
-        self._subtype = "Ln"
+    def __init__(self, rng=random):
+        self._coeff = Mutations.HardMutation(self._min_coeff, self._max_coeff, rng)
         self._spread = 10
-        self._permitted = ["coeff", "spread"]
 
     # Property management
     @property
@@ -586,8 +738,8 @@ class NaturalLogSolution(FitnessModuleInterface):
     def calculator(self, variable):
         return self._coeff * math.log(variable)
 
-    def mutate(self):
-        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread)
+    def mutate(self, deviation=None, rng=random):
+        self.coeff = Mutations.GaussianMutation(self._coeff, self._spread, deviation, rng)
 
     def getDescription(self):
         string = "%s, %s: Response = %.2f * Ln(variable)" % (
@@ -1,6 +1,34 @@
 from __future__ import print_function
 import math
 import random
+try:
+    import numpy
+except ImportError:  # Cohort mutation is optional
+    numpy = None
+
+MUTATION_ENGINES = ["Scalar", "Cohort"]
+
+# Every random draw (mutations, new modules, force conditions, pruning) is
+# made from the rng passed in by the world (see Terrarium.rng), which is the
+# random module unless the world has its own stream.
+
+
+def createMutationEngine(engine_type="Scalar", rng=random):
+    """Returns a new engine that reproduces and mutates a world's solvers (Scalar or Cohort).
+
+    Cohort engines seed their generator from rng.
+    Returns None if engine creation failed."""
+    engine_type = str(engine_type)
+    if engine_type == "Scalar":
+        return ScalarMutation()
+    elif engine_type == "Cohort":
+        if numpy is None:
+            print("Error: numpy is required for Cohort mutation.")
+            return None
+        return CohortMutation(rng)
+    else:
+        print("Error: unknown mutation engine %s." % engine_type)
+        return None
 
 
 class Mutations(object):
@@ -9,14 +37,82 @@ class Mutations(object):
     May store attribute-based mutations to make solver mutations easier.
     """
     @staticmethod
-    def GaussianMutation(initial, spread):
+    def GaussianMutation(initial, spread, deviation=None, rng=random):
         """Simple gaussian-based mutation.
         
-        Takes center and width and returns new value."""
+        Takes center and width and returns new value.
+        Optional deviation is a standard normal value drawn in advance (ex: for a
+        whole cohort at once), used instead of drawing one."""
 #		print ("Gaussian Mutation with initial=%d and spread=%.2f" % (initial, spread))
-        return random.gauss(initial, spread)
+        if deviation is None:
+            return rng.gauss(initial, spread)
+        # Same as random.gauss given its standard normal draw
+        return initial + deviation * spread
 
     @staticmethod
-    def HardMutation(low, high):
+    def HardMutation(low, high, rng=random):
         """Hard int mutation."""
-        return random.randrange(low, high)
+        return rng.randrange(low, high)
+
+
+class ScalarMutation(object):
+    """Each child draws its own mutations from the world's rng as it is born."""
+
+    def __init__(self):
+        self._type_ = "Scalar"
+
+    @property
+    def type_(self):
+        return self._type_
+
+    def reproduce(self, solvers, rng=random):
+        """Returns list of one mutated child of each solver."""
+        return [solver.reproduce(rng) for solver in solvers]
+
+
+class CohortMutation(object):
+    """Draws the mutations of a whole cohort of children in one vectorized draw.
+
+    Children get the same decisions as SmallSolver.mutate with the same
+    distributions: a 1-100 roll against property_mutation_chance, a roll per
+    module against module_mutation_chance and then swap_module_chance, a roll
+    against merge_module_chance and standard normal deviations for the
+    property and module gaussian mutations. Rolls are drawn for every module
+    whether they are used or not. New modules from swaps and merges and
+    fitness calculator mutations still draw from the world's rng.
+    Draws come from a numpy generator seeded from the world's rng when the
+    engine is created, so seeded runs are reproducible but do not match Scalar.
+    """
+
+    def __init__(self, rng=random):
+        self._type_ = "Cohort"
+        self._rng = numpy.random.RandomState(rng.getrandbits(32))
+
+    @property
+    def type_(self):
+        return self._type_
+
+    def reproduce(self, solvers, rng=random):
+        """Returns list of one mutated child of each solver."""
+        children = [solver.spawn() for solver in solvers]
+        self.mutate(children, rng)
+        return children
+
+    def mutate(self, solvers, rng=random):
+        """Mutate every solver using one block of draws for all of them.
+
+        New modules and fitness calculator mutations draw from rng."""
+        if len(solvers) == 0:
+            return
+        counts = [len(solver.modules) for solver in solvers]
+        rolls = self._rng.randint(1, 101, (3, len(solvers))).tolist()
+        module_rolls = self._rng.randint(1, 101, (2, sum(counts))).tolist()
+        deviations = self._rng.standard_normal(len(solvers)).tolist()
+        module_deviations = self._rng.standard_normal(sum(counts)).tolist()
+        start = 0
+        for pos, solver in enumerate(solvers):
+            end = start + counts[pos]
+            solver.mutateFrom((rolls[0][pos], rolls[1][pos], deviations[pos],
+                               module_rolls[0][start:end], module_rolls[1][start:end],
+                               module_deviations[start:end], rolls[2][pos]), rng)
+            start = end
@@ -0,0 +1,487 @@
+from __future__ import print_function
+import json
+import random
+import types
+from evonum_terrarium import *
+from evonum_evaluators import VectorizedEvaluator
+try:
+    import numpy
+except ImportError:  # Array populations are optional
+    numpy = None
+
+
+TERRARIUM_TYPES = ["Object", "Array", "Array32"]
+
+
+def createTerrarium(terrarium_type="Object"):
+    """Returns a new world with the provided population backend.
+
+    Object keeps a list of solver objects (default).
+    Array keeps solvers in numpy arrays, Array32 does the same with float32 module coefficients.
+    Returns None if world creation failed."""
+    terrarium_type = str(terrarium_type)
+    if terrarium_type == "Object":
+        return Terrarium()
+    elif terrarium_type == "Array" or terrarium_type == "Array32":
+        if numpy is None:
+            print("Error: numpy is required for %s worlds." % terrarium_type)
+            return None
+        return ArrayTerrarium(single_precision=(terrarium_type == "Array32"))
+    else:
+        print("Error: unknown world type %s." % terrarium_type)
+        return None
+
+
+# Per solver arrays of an ArrayTerrarium: name, dtype.
+# Module slots (subtypes, coeffs) are added with a second dimension of SmallSolver._max_modules.
+SOLVER_FIELDS = [("age", "int32"), ("children", "int32"), ("fitness", "float64"),
+                 ("resilience", "int32"), ("lifespan", "int32"), ("living", "bool"),
+                 ("unique", "bool"), ("spread", "float64"), ("total_modules", "int8"),
+                 ("module_mutation_chance", "float64"), ("property_mutation_chance", "float64"),
+                 ("swap_module_chance", "float64"), ("merge_module_chance", "float64"),
+                 ("module_count", "int8"), ("lineage", "int32"), ("generation", "int32")]
+
+# Solver properties that are stored as is and copied to and from SmallSolver views.
+SOLVER_PROPERTIES = ["unique", "spread", "total_modules", "module_mutation_chance",
+                     "property_mutation_chance", "swap_module_chance", "merge_module_chance",
+                     "resilience"]
+
+
+class ArrayTerrarium(Terrarium):
+    """World that stores its population as a struct of numpy arrays.
+
+    Every solver is a row in preallocated arrays of age, fitness, children,
+    resilience, lifespan, living flag, mutatable properties and fixed-width
+    module slots (subtype id and coefficient). Aging, reproduction,
+    mutation, evaluation and pruning are array operations, so populations
+    of millions of solvers fit in memory.
+
+    Solvers follow the same rules as SmallSolver with a Linear fitness
+    calculator, which is the only calculator supported. Module spread always
+    follows solver spread. Random numbers come from a numpy generator seeded
+    from the world's rng when the world is created (or by setSeed),
+    so seeded runs are reproducible but do not match Object worlds.
+
+    SmallSolver views are built only when needed (printSolvers, reports, exportSolvers).
+    Optional single_precision stores module coefficients as float32.
+    """
+
+    def __init__(self, capacity=1024, single_precision=False):
+        Terrarium.__init__(self)
+        self._width = SmallSolver._max_modules
+        self._coeff_dtype = numpy.float32 if single_precision else numpy.float64
+        self._count = 0  # Number of solvers stored in the first rows of each array
+        self._arrays = {}
+        for name, dtype in SOLVER_FIELDS:
+            self._arrays[name] = numpy.zeros(capacity, dtype=dtype)
+        self._arrays["subtypes"] = numpy.zeros((capacity, self._width), dtype=numpy.int8)
+        self._arrays["coeffs"] = numpy.zeros((capacity, self._width), dtype=self._coeff_dtype)
+        # Solver names are lineage base name + "." + generation
+        self._lineages = []
+        self._rng = numpy.random.RandomState(self.rng.getrandbits(32))
+        # Subtype id is position in MODULE_SUBTYPES + 1, 0 marks an empty slot
+        self._evaluator = VectorizedEvaluator()
+        for subtype in MODULE_SUBTYPES:
+            self._evaluator._column(subtype)
+
+    @property
+    def population(self):
+        """Number of solvers currently stored"""
+        return self._count
+
+    @property
+    def single_precision(self):
+        """True if module coefficients are stored as float32"""
+        return self._coeff_dtype == numpy.float32
+
+    def column(self, name):
+        """Returns view of the named array for stored solvers only."""
+        return self._arrays[name][:self._count]
+
+    def _reserve(self, total):
+        """Grow arrays (doubling) so they can hold total solvers."""
+        capacity = len(self._arrays["age"])
+        if total <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < total:
+            capacity *= 2
+        for name in self._arrays:
+            old = self._arrays[name]
+            grown = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._count] = old[:self._count]
+            self._arrays[name] = grown
+
+    def _compact(self, keep):
+        """Keep only rows flagged in boolean array keep, preserving order."""
+        total = int(keep.sum())
+        if total == self._count:
+            return
+        for name in self._arrays:
+            values = self._arrays[name]
+            values[:total] = values[:self._count][keep]
+        self._count = total
+
+    # Solver management
+    def addSolver(self, solver_type="Small"):
+        """Add a new solver to terrarium. Only Small solvers are supported."""
+        if solver_type != "Small":
+            print("Error: unknown solver type %s. No solver added." % solver_type)
+            return
+        name = "Solver" + str(self._count + 1) + \
+            "_" + str(self._current_day) + ".1"
+        self.storeSolver(createSolver("Small", name, self._solver_settings))
+
+    def importSolverSettings(self, conditions):
+        if "fitness_calculator" in conditions and conditions["fitness_calculator"] != "Linear":
+            print("Error: array worlds only support Linear fitness calculator, setting ignored.")
+            conditions = dict(conditions)
+            del conditions["fitness_calculator"]
+        Terrarium.importSolverSettings(self, conditions)
+
+    def storeSolver(self, solver):
+        """Copy a SmallSolver into a new row. Returns False if solver can not be stored."""
+        if solver is None:
+            return False
+        if solver.fitness_calculator != "Linear":
+            print("Error: array worlds only support Linear fitness calculator, solver %s not added." %
+                  solver.name)
+            return False
+        self._reserve(self._count + 1)
+        row = self._count
+        arrays = self._arrays
+        for item in SOLVER_PROPERTIES:
+            arrays[item][row] = getattr(solver, item)
+        arrays["age"][row] = solver.age
+        arrays["children"][row] = solver._children
+        arrays["fitness"][row] = numpy.nan if solver.fitness is None else solver.fitness
+        arrays["lifespan"][row] = solver.lifespan
+        arrays["living"][row] = solver.living
+        modules = solver.modules[:self._width]
+        arrays["module_count"][row] = len(modules)
+        arrays["subtypes"][row] = 0
+        arrays["coeffs"][row] = 0
+        for pos, item in enumerate(modules):
+            arrays["subtypes"][row, pos] = MODULE_SUBTYPES.index(item.subtype) + 1
+            arrays["coeffs"][row, pos] = item.coeff
+        # Same naming rule as SmallSolver.reproduce, base.generation
+        try:
+            base, generation = solver.name.split(".")[0], int(solver.name.split(".")[1])
+        except (IndexError, ValueError):
+            base, generation = solver.name, -1
+        arrays["lineage"][row] = len(self._lineages)
+        arrays["generation"][row] = generation
+        self._lineages.append(base)
+        self._count += 1
+        return True
+
+    def solverName(self, row):
+        generation = int(self._arrays["generation"][row])
+        base = self._lineages[self._arrays["lineage"][row]]
+        if generation < 0:
+            return base
+        return base + "." + str(generation)
+
+    def solverView(self, row):
+        """Returns SmallSolver copy of the solver stored in row."""
+        arrays = self._arrays
+        view = createSolver("Small", self.solverName(row))
+        for item in SOLVER_PROPERTIES:
+            setattr(view, item, arrays[item][row].item())
+        view._age = int(arrays["age"][row])
+        view._children = int(arrays["children"][row])
+        fitness = float(arrays["fitness"][row])
+        view._fitness = None if fitness != fitness else fitness
+        view._living = bool(arrays["living"][row])
+        view._modules = [geneModule(MODULE_SUBTYPES[arrays["subtypes"][row, pos] - 1],
+                                    float(arrays["coeffs"][row, pos]), view.spread)
+                         for pos in range(0, arrays["module_count"][row])]
+        return view
+
+    # Random module selection
+    def _randomSubtypes(self, total, excluded=None):
+        """Returns array of total random subtype ids, different from excluded ids if provided."""
+        if excluded is None:
+            return self._rng.randint(1, len(MODULE_SUBTYPES) + 1, total).astype(numpy.int8)
+        picks = self._rng.randint(1, len(MODULE_SUBTYPES), total)
+        return (picks + (picks >= excluded)).astype(numpy.int8)
+
+    def _uniqueSubtype(self, present):
+        """Returns random subtype id not among present ids (any subtype if none remain)."""
+        potential = [x for x in range(1, len(MODULE_SUBTYPES) + 1) if x not in present]
+        if len(potential) == 0:
+            potential = range(1, len(MODULE_SUBTYPES) + 1)
+        return potential[self._rng.randint(0, len(potential))]
+
+    def _randomCoeffs(self, total):
+        return self._rng.randint(-100, 100, total)
+
+    # Daily cycle
+    def beginDay(self):
+        """Increment day, reproduce living solvers, evaluate solver fitness, and prune solvers based on fitness rank."""
+        self._current_day += 1
+        timer = self._timer
+        timer.start()
+        clearBasisCache()
+        for item in self._forces:
+            item.beginDay(self.rng)
+        timer.lap("force_begin")
+        previous = self._count
+        self.ageSolvers()
+        timer.count("killed", previous - self._count)
+        timer.lap("solver_begin")
+        previous = self._count
+        self.reproduceSolvers()
+        timer.count("born", self._count - previous)
+        timer.lap("reproduce")
+        self.evaluateSolvers()
+        timer.count("evaluated", self._count)
+        timer.lap("evaluate")
+        scored, withheld = self.scoreSolvers()
+        timer.count("withheld", len(withheld))
+        timer.lap("score")
+        if len(scored) > 0:
+            self._best_fitness = float(self._arrays["fitness"][self.topRows(scored, 1)[0]])
+            self._reporter.printDay("%d\t%.2f" % (self._current_day, self._best_fitness))
+        else:
+            self._best_fitness = None
+            self._reporter.printDay("%d\tAll solvers dead or withheld!" % self._current_day)
+        timer.lap("print_day")
+        self._reporter.reportDay(self, scored, withheld)
+        timer.lap("write_day")
+        self.pruneSolvers(scored)
+        timer.lap("prune")
+        timer.endDay(self._current_day)
+
+    def ageSolvers(self):
+        """Remove dead solvers, age survivors and add or remove modules to match total_modules."""
+        age = self.column("age")
+        living = self.column("living")
+        living &= age < self.column("lifespan")
+        self._compact(living.copy())
+        self.column("age")[:] += 1
+        self.column("fitness")[:] = 0
+
+        counts = self.column("module_count")
+        totals = self.column("total_modules")
+        subtypes = self.column("subtypes")
+        coeffs = self.column("coeffs")
+        slots = numpy.arange(self._width)
+        # Last modules added are the first lost
+        lost = (slots >= totals[:, None]) & (slots < counts[:, None])
+        subtypes[lost] = 0
+        coeffs[lost] = 0
+        unique = self.column("unique")
+        missing = (slots < totals[:, None]) & (slots >= counts[:, None])
+        shared = missing & ~unique[:, None]
+        subtypes[shared] = self._randomSubtypes(int(shared.sum()))
+        coeffs[shared] = self._randomCoeffs(int(shared.sum()))
+        for row in numpy.nonzero(unique & (counts < totals))[0]:
+            for pos in range(counts[row], totals[row]):
+                subtypes[row, pos] = self._uniqueSubtype(subtypes[row, :pos])
+                coeffs[row, pos] = self._randomCoeffs(1)[0]
+        counts[:] = totals
+
+    def reproduceSolvers(self):
+        """Every solver with a fitness score produces one mutated child."""
+        parents = numpy.nonzero(~numpy.isnan(self.column("fitness")))[0]
+        if len(parents) == 0:
+            return
+        start = self._count
+        self._reserve(start + len(parents))
+        arrays = self._arrays
+        children = numpy.arange(start, start + len(parents))
+        for name in arrays:
+            arrays[name][children] = arrays[name][parents]
+        arrays["children"][parents] += 1
+        # Same naming rule as SmallSolver.reproduce
+        generation = arrays["generation"][parents]
+        arrays["generation"][children] = numpy.where(
+            generation < 0, arrays["children"][parents], generation + 1)
+        arrays["children"][children] = 0
+        arrays["fitness"][children] = 0
+        self._count += len(parents)
+        self.mutateSolvers(children)
+        arrays["age"][children] = 1
+
+    def mutateSolvers(self, rows):
+        """Mutate solvers in rows exactly as SmallSolver.mutate would, one round each."""
+        arrays = self._arrays
+        total = len(rows)
+        # Solver properties
+        mutating = self._rng.randint(1, 101, total) <= arrays["property_mutation_chance"][rows]
+        selection = numpy.where(mutating, self._rng.randint(1, 101, total), 0)
+        bounds = numpy.cumsum(SmallSolver._property_chances)
+        spread = arrays["spread"][rows]
+        changed = (selection > 0) & (selection <= bounds[0])
+        spread[changed] = numpy.clip(self._rng.normal(
+            spread[changed], numpy.where(spread[changed] == 0, 1, spread[changed])), 0, 1000)
+        arrays["spread"][rows] = spread
+        changed = (selection > bounds[0]) & (selection <= bounds[1])
+        totals = self._rng.normal(arrays["total_modules"][rows][changed], 1).astype(int)
+        arrays["total_modules"][rows[changed]] = numpy.clip(totals, 1, self._width)
+        for pos, name in [(2, "module_mutation_chance"), (3, "property_mutation_chance")]:
+            changed = (selection > bounds[pos - 1]) & (selection <= bounds[pos])
+            chance = arrays[name][rows][changed]
+            arrays[name][rows[changed]] = numpy.clip(self._rng.normal(
+                chance, spread[changed] * chance / 100), 0, 100)
+
+        # Modules
+        subtypes = arrays["subtypes"][rows]
+        coeffs = arrays["coeffs"][rows]
+        present = numpy.arange(self._width) < arrays["module_count"][rows][:, None]
+        mutating = present & (self._rng.randint(1, 101, subtypes.shape) <=
+                              arrays["module_mutation_chance"][rows][:, None])
+        swapping = mutating & (self._rng.randint(1, 101, subtypes.shape) <=
+                               arrays["swap_module_chance"][rows][:, None])
+        nudging = mutating & ~swapping
+        coeffs[nudging] = numpy.clip(self._rng.normal(
+            coeffs[nudging], numpy.broadcast_to(spread[:, None], subtypes.shape)[nudging]),
+            -100000, 100000)
+        unique = arrays["unique"][rows]
+        shared = swapping & ~unique[:, None]
+        subtypes[shared] = self._randomSubtypes(int(shared.sum()), subtypes[shared])
+        coeffs[shared] = self._randomCoeffs(int(shared.sum()))
+        for row, pos in zip(*numpy.nonzero(swapping & unique[:, None])):
+            subtypes[row, pos] = self._uniqueSubtype(subtypes[row, present[row]])
+            coeffs[row, pos] = self._randomCoeffs(1)[0]
+
+        # Merge first module whose subtype was already seen into the first of that subtype
+        earlier = numpy.triu(numpy.ones((self._width, self._width), dtype=bool), 1)
+        matches = ((subtypes[:, :, None] == subtypes[:, None, :]) &
+                   present[:, :, None] & present[:, None, :] & earlier)
+        repeated = matches.any(axis=1)
+        merging = numpy.nonzero(
+            (self._rng.randint(1, 101, total) <= arrays["merge_module_chance"][rows]) &
+            repeated.any(axis=1))[0]
+        if len(merging) > 0:
+            second = repeated[merging].argmax(axis=1)
+            first = matches[merging, :, second].argmax(axis=1)
+            coeffs[merging, first] = numpy.clip(
+                coeffs[merging, first] + coeffs[merging, second], -100000, 100000)
+            subtypes[merging, second] = self._randomSubtypes(
+                len(merging), subtypes[merging, first])
+            coeffs[merging, second] = self._randomCoeffs(len(merging))
+        arrays["subtypes"][rows] = subtypes
+        arrays["coeffs"][rows] = coeffs
+
+    def evaluateSolvers(self):
+        """Evaluate fitness of every solver in one batched pass.
+
+        Math domain failures are stored as NaN and dock a resilience."""
+        counts = self.column("module_count")
+        fitness = numpy.zeros(self._count)
+        if self._count > 0:
+            for item in self._forces:
+                fitness += self._evaluator.unitFitness(
+                    item, self.column("subtypes"), self.column("coeffs"), counts)
+        self.column("fitness")[:] = fitness
+        failed = numpy.isnan(fitness)
+        resilience = self.column("resilience")
+        self.column("living")[failed & (resilience == 0)] = False
+        resilience[failed & (resilience > 0)] -= 1
+
+    def setEvaluator(self, evaluator_type, processes=None):
+        print("Error: array worlds are always evaluated with the Vectorized evaluator.")
+
+    def setMutation(self, engine_type):
+        print("Error: array worlds always draw mutations for the whole population at once.")
+
+    def setSeed(self, seed):
+        self._random = None if seed is None else random.Random(seed)
+        self._rng = numpy.random.RandomState(self.rng.getrandbits(32))
+
+    def setSelection(self, selection_type, tournament_size=None):
+        if selection_type != "Truncation":
+            print("Error: array worlds only support Truncation selection.")
+
+    def topRows(self, rows, total, name="fitness", ordered=True):
+        """Returns the total rows with the highest value in named array, sorted high to low.
+
+        Uses partial selection (partition), ties keep row order.
+        If ordered is False, rows are returned in row order instead of sorted."""
+        values = self._arrays[name][rows]
+        if total < len(rows):
+            cut = numpy.partition(values, len(values) - total)[len(values) - total]
+            # Everything above the cut-off and the first rows equal to it
+            above = numpy.nonzero(values > cut)[0]
+            equal = numpy.nonzero(values == cut)[0][:total - len(above)]
+            selected = numpy.sort(numpy.concatenate((above, equal)))
+        else:
+            selected = numpy.arange(len(rows))
+        if not ordered:
+            return rows[selected]
+        return rows[selected[numpy.argsort(-values[selected], kind="mergesort")]]
+
+    def scoreSolvers(self):
+        """Returns rows of living scored solvers and rows of withheld solvers."""
+        fitness = self.column("fitness")
+        withheld = numpy.nonzero(numpy.isnan(fitness))[0][:self._max_withheld]
+        scored = numpy.nonzero(~numpy.isnan(fitness) & self.column("living"))[0]
+        return scored, withheld
+
+    def snapshotDay(self, scored, withheld):
+        """Returns dictionary of the day's stats and solver descriptions used for reports.
+
+        Same keys as Terrarium.snapshotDay, views are built for reported solvers only."""
+        snapshot = {"day": self._current_day, "solvers": len(scored),
+                    "avg_fitness": None, "max_fitness": None, "withheld": len(withheld),
+                    "forces": [item.getDescription() for item in self._forces],
+                    "top": [], "oldest": [], "best": None}
+        if len(scored) > 0:
+            top = self.topRows(scored, 4)
+            snapshot["avg_fitness"] = float(self.column("fitness")[scored].mean())
+            snapshot["max_fitness"] = float(self._arrays["fitness"][top[0]])
+            snapshot["top"] = [self.solverView(row).getDescription() for row in top]
+            snapshot["oldest"] = [self.solverView(row).getDescription()
+                                  for row in self.topRows(scored, 2, "age")]
+            snapshot["best"] = self.solverView(top[0]).exportDict()
+        return snapshot
+
+    def pruneSolvers(self, scored):
+        """Flag solvers outside the max population best for death (each with a last chance to survive)."""
+        if len(scored) > self._max_solvers:
+            survivors = numpy.zeros(self._count, dtype=bool)
+            survivors[self.topRows(scored, self._max_solvers, ordered=False)] = True
+            losers = scored[~survivors[scored]]
+            lucky = self._rng.randint(1, 101, len(losers)) <= self._chance_to_survive_prune
+            self._arrays["living"][losers[~lucky]] = False
+        if len(scored) > 0:
+            self.adjustDynamicForces(float(self._arrays["fitness"][self.topRows(scored, 1)[0]]))
+
+    # I/O
+    def printSolvers(self):
+        """Print descriptions of solvers that have survived at least 1 day."""
+        for row in numpy.nonzero((self.column("age") > 0) & self.column("living"))[0]:
+            print (self.solverView(row).getDescription())
+
+    def iterExportDicts(self):
+        """Generator of exported dictionaries of all living solvers that survived at least 1 day.
+
+        Views are built one solver at a time."""
+        for row in numpy.nonzero((self.column("age") > 0) & self.column("living"))[0]:
+            yield self.solverView(row).exportDict()
+
+    def exportTop(self, total):
+        """Returns exported dictionaries of the total fittest living scored solvers, best first."""
+        rows = self.topRows(self.scoreSolvers()[0], total)
+        return [self.solverView(row).exportDict() for row in rows]
+
+    def importSolvers(self, solvers_json):
+        """Imports list of solvers in json string format."""
+        if not isinstance(solvers_json, types.StringTypes):
+            prev = self._count
+            try:
+                for item in solvers_json:
+                    self.storeSolver(importSolver(item, self.rng))
+                print("%d solvers imported to world." % (self._count - prev))
+            except TypeError:
+                print(
+                    "Error: import solvers must recieve iterable list of solver jsons, unable to import.")
+        else:
+            print(
+                "Error: import solvers must recieve iterable list of solver jsons, unable to import.")
+
+    def memoryUsage(self):
+        """Returns bytes held by population arrays."""
+        return sum([values.nbytes for values in self._arrays.values()])
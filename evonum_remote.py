@@ -0,0 +1,438 @@
+from __future__ import print_function
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import traceback
+from multiprocessing.connection import Client, Listener
+from evonum_evaluators import EvaluatorInterface, ForceConditions, evaluateGenomes, genomeSeeds
+
+# Remote evaluation: a world's RemoteEvaluator (the coordinator) splits the
+# population into shards held by worker processes, which may run on other
+# machines (python evonum_remote.py host:port). Messages are pickled objects
+# sent over authenticated multiprocessing connections (TCP), so workers must
+# only listen on trusted networks. Anyone holding the key can run code on a
+# worker, so host:port workers and coordinators refuse to start unless the
+# key is set in EVONUM_AUTHKEY. Localhost workers get a random key instead.
+#
+# Workers keep the genomes of their shards between days. Each day the
+# coordinator sends one message per worker with the day's force conditions
+# and, for each of its shards, the solvers removed and the genomes added or
+# changed since the previous day, then gathers fitness back.
+# While evaluating, workers send a heartbeat every HEARTBEAT seconds. A
+# worker whose connection fails or that is silent for TIMEOUT seconds is
+# dropped and its shards are sent in full to the remaining workers. If no
+# workers remain, shards are evaluated by the coordinator.
+
+HEARTBEAT = 1.0
+TIMEOUT = 10.0
+SHARDS_PER_WORKER = 4
+
+def environmentKey():
+    """Returns key from the EVONUM_AUTHKEY environment variable, None if it is not set."""
+    key = os.environ.get("EVONUM_AUTHKEY", "")
+    return key.encode("utf-8") if key != "" else None
+
+
+def parseAddress(address):
+    """Returns (host, port) of a host:port string. Raises ValueError if address is bad."""
+    host, separator, port = str(address).strip().rpartition(":")
+    if separator == "" or host == "":
+        raise ValueError("Error: worker address %s must be host:port." % address)
+    return host, int(port)
+
+
+class ShardWorker(object):
+    """Worker side genomes of each shard, kept between days."""
+
+    def __init__(self):
+        self._shards = {}  # Shard -> {solver key: genome}
+
+    @property
+    def shards(self):
+        return self._shards
+
+    def update(self, shard, reset, removed, added):
+        """Apply a day's changes to shard. If reset, added holds the whole shard."""
+        if reset:
+            self._shards[shard] = {}
+        genomes = self._shards.setdefault(shard, {})
+        for key in removed:
+            genomes.pop(key, None)
+        genomes.update(added)
+
+    def evaluate(self, fitness_forces, shard, seeds):
+        """Returns list of (solver key, fitness) of shard's genomes in key order.
+
+        Takes {solver key: seed} of genomes that draw random numbers (see genomeSeeds)."""
+        genomes = self._shards.get(shard, {})
+        keys = sorted(genomes)
+        fitness = evaluateGenomes((fitness_forces, [genomes[key] for key in keys],
+                                   [seeds.get(key) for key in keys]))
+        return list(zip(keys, fitness))
+
+
+class Heartbeat(threading.Thread):
+    """Sends ("alive",) on a connection every HEARTBEAT seconds until stopped."""
+
+    def __init__(self, connection, lock):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._connection = connection
+        self._lock = lock
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(HEARTBEAT):
+            with self._lock:
+                try:
+                    self._connection.send(("alive",))
+                except (IOError, EOFError):
+                    return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def serveCoordinator(connection):
+    """Answer one coordinator's messages until it disconnects.
+
+    Returns False if the coordinator asked the worker to shut down."""
+    worker = ShardWorker()
+    lock = threading.Lock()
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except (IOError, EOFError):
+                return True
+            if message[0] == "day":
+                fitness_forces, updates, seeds = message[1:]
+                heartbeat = Heartbeat(connection, lock)
+                heartbeat.start()
+                try:
+                    for item in updates:
+                        worker.update(*item)
+                    reply = ("fitness", dict([(shard, worker.evaluate(fitness_forces, shard, seeds[shard]))
+                                              for shard in seeds]))
+                except Exception:
+                    reply = ("error", traceback.format_exc())
+                finally:
+                    heartbeat.stop()
+                with lock:
+                    connection.send(reply)
+            elif message[0] == "ping":
+                with lock:
+                    connection.send(("pong",))
+            elif message[0] == "close":
+                return True
+            elif message[0] == "shutdown":
+                return False
+    finally:
+        connection.close()
+
+
+def runWorker(address, authkey, ready=None):
+    """Evaluate shards for coordinators connecting to address (host, port) with authkey until told to shut down.
+
+    Coordinators are served one at a time, each starts with no shards.
+    Optional ready connection is sent the address listened on (ex: port 0 picks a free port)."""
+    listener = Listener(address, authkey=authkey)
+    if ready is not None:
+        ready.send(listener.address)
+        ready.close()
+    try:
+        while True:
+            try:
+                connection = listener.accept()
+            except (IOError, EOFError, multiprocessing.AuthenticationError) as e:
+                print("Error: coordinator connection failed: %s" % e)
+                continue
+            if not serveCoordinator(connection):
+                return
+    finally:
+        listener.close()
+
+
+class RemoteEvaluator(EvaluatorInterface):
+    """Evaluates the population in shards on worker processes over TCP.
+
+    Takes int number of localhost workers to start (localhost mode) or list of
+    host:port addresses of running workers. Workers are started or connected
+    on first use and kept until close(). Solvers are given to the smallest
+    shard when born and keep their shard, so only births, deaths and changed
+    genomes are sent each day. Dynamic calculator genomes draw from seeds
+    drawn in population order (see genomeSeeds), so fitness does not depend
+    on the shards or on which worker evaluates them.
+    Optional authkey defaults to a random key for localhost workers and to
+    EVONUM_AUTHKEY for worker addresses, which must then be set.
+
+    Counts genomes sent to workers (genomes_sent), genomes workers already held
+    (genomes_kept) and workers dropped (workers_dropped).
+    """
+
+    def __init__(self, workers=None, authkey=None, timeout=TIMEOUT):
+        self._type_ = "Remote"
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if isinstance(workers, int):
+            if workers < 1:
+                raise ValueError
+            self._local = workers
+            self._addresses = []
+        else:
+            if isinstance(workers, str):
+                workers = [workers]
+            self._local = 0
+            self._addresses = [parseAddress(item) for item in workers]
+            if len(self._addresses) == 0:
+                raise ValueError
+        if authkey is None:
+            authkey = os.urandom(32) if self._local > 0 else environmentKey()
+            if authkey is None:
+                raise ValueError("Error: EVONUM_AUTHKEY must be set to a shared secret key to use remote workers.")
+        self._authkey = authkey
+        self._timeout = timeout
+        self._counters = {"genomes_sent": 0, "genomes_kept": 0, "workers_dropped": 0}
+        self.reset()
+
+    def reset(self):
+        """Forget workers and shards, they are set up again on next evaluate."""
+        self._workers = None  # Connection of each worker, None once dropped
+        self._processes = []  # Localhost worker processes
+        self._owners = []  # Worker position of each shard
+        self._sizes = []  # Number of solvers in each shard
+        self._stale = set()  # Shards to send in full (moved from a dropped worker)
+        self._tracked = {}  # id(solver) -> [solver, key, shard, genome]
+        self._next_key = 0
+
+    @property
+    def counters(self):
+        return dict(self._counters)
+
+    @property
+    def workers(self):
+        """Number of workers still in use"""
+        return len([item for item in self._workers or [] if item is not None])
+
+    def connect(self, address):
+        """Returns connection to worker at address, None if it can not be reached.
+
+        Refused connections are retried for a while (ex: worker still starting)."""
+        try:
+            return Client(address, authkey=self._authkey)
+        except (IOError, EOFError, multiprocessing.AuthenticationError) as e:
+            print("Error: unable to connect to worker %s:%d: %s" % (address[0], address[1], e))
+            return None
+
+    def start(self):
+        """Start localhost workers or connect to remote workers and lay out shards."""
+        workers = []
+        if self._local > 0:
+            if multiprocessing.current_process().daemon:
+                print("Error: localhost workers can not be started inside a worker process, evaluating locally.")
+            else:
+                for x in range(0, self._local):
+                    receiver, sender = multiprocessing.Pipe(False)
+                    process = multiprocessing.Process(target=runWorker,
+                                                      args=(("127.0.0.1", 0), self._authkey, sender))
+                    process.daemon = True
+                    process.start()
+                    sender.close()
+                    self._processes.append(process)
+                    workers.append(self.connect(receiver.recv()))
+                    receiver.close()
+        else:
+            workers = [self.connect(address) for address in self._addresses]
+        self._workers = [item for item in workers if item is not None]
+        if len(self._workers) == 0:
+            print("Error: no remote workers available, evaluating locally.")
+        total_shards = SHARDS_PER_WORKER * max(len(self._workers), 1)
+        self._owners = [pos % len(self._workers) if len(self._workers) > 0 else None
+                        for pos in range(0, total_shards)]
+        self._sizes = [0] * total_shards
+
+    def track(self, solvers):
+        """Record population changes since the last evaluation.
+
+        Returns {shard: (removed keys, {key: added or changed genome})} and {key: solver}."""
+        tracked = self._tracked
+        current = {}
+        changes = {}
+        by_key = {}
+        for solver in solvers:
+            # Tracked solvers are kept referenced, so their ids are never reused
+            entry = tracked.get(id(solver))
+            genome = solver.exportGenome()
+            if entry is None:
+                shard = self._sizes.index(min(self._sizes))
+                self._sizes[shard] += 1
+                entry = [solver, self._next_key, shard, genome]
+                self._next_key += 1
+                changes.setdefault(shard, ([], {}))[1][entry[1]] = genome
+            elif entry[3] != genome:
+                entry[3] = genome
+                changes.setdefault(entry[2], ([], {}))[1][entry[1]] = genome
+            current[id(solver)] = entry
+            by_key[entry[1]] = solver
+        for ident, entry in tracked.items():
+            if ident not in current:
+                self._sizes[entry[2]] -= 1
+                changes.setdefault(entry[2], ([], {}))[0].append(entry[1])
+        self._tracked = current
+        return changes, by_key
+
+    def shardGenomes(self, shards):
+        """Returns {shard: {key: genome}} of every tracked solver in shards."""
+        genomes = dict([(shard, {}) for shard in shards])
+        for solver, key, shard, genome in self._tracked.values():
+            if shard in genomes:
+                genomes[shard][key] = genome
+        return genomes
+
+    def shardUpdates(self, shards, changes):
+        """Returns worker updates (shard, reset, removed, added) for shards and counts genomes sent."""
+        updates = []
+        full = self.shardGenomes([shard for shard in shards if shard in self._stale])
+        for shard in shards:
+            if shard in full:
+                self._stale.discard(shard)
+                update = (shard, True, [], full[shard])
+            else:
+                removed, added = changes.get(shard, ([], {}))
+                update = (shard, False, removed, added)
+            self._counters["genomes_sent"] += len(update[3])
+            self._counters["genomes_kept"] += self._sizes[shard] - len(update[3])
+            updates.append(update)
+        return updates
+
+    def drop(self, worker):
+        """Stop using worker, its shards are sent in full to the remaining workers."""
+        connection = self._workers[worker]
+        self._workers[worker] = None
+        try:
+            connection.close()
+        except (IOError, EOFError):
+            pass
+        self._counters["workers_dropped"] += 1
+        live = [pos for pos, item in enumerate(self._workers) if item is not None]
+        print("Error: lost worker %d, moving its shards to %d remaining worker(s)." %
+              (worker + 1, len(live)))
+        moved = [shard for shard, owner in enumerate(self._owners) if owner == worker]
+        for pos, shard in enumerate(moved):
+            self._owners[shard] = live[pos % len(live)] if len(live) > 0 else None
+            self._stale.add(shard)
+
+    def receive(self, worker):
+        """Returns worker's {shard: [(key, fitness)]}, None if it failed or was silent for timeout seconds.
+
+        Heartbeats received while the worker evaluates restart the timeout."""
+        connection = self._workers[worker]
+        try:
+            while connection.poll(self._timeout):
+                message = connection.recv()
+                if message[0] == "fitness":
+                    return message[1]
+                elif message[0] == "error":
+                    print("Error: worker %d failed:\n%s" % (worker + 1, message[1]))
+                    return None
+        except (IOError, EOFError):
+            pass
+        return None
+
+    def evaluate(self, solvers, fitness_forces, rng=random):
+        """Calculate and store fitness for every solver in provided list."""
+        if len(solvers) == 0:
+            return
+        if self._workers is None:
+            self.start()
+        conditions = [ForceConditions(item) for item in fitness_forces]
+        changes, by_key = self.track(solvers)
+        # Seeds are drawn in population order, so they do not depend on the shards
+        entries = [self._tracked[id(solver)] for solver in solvers]
+        seeds = [{} for shard in self._owners]
+        for entry, seed in zip(entries, genomeSeeds([entry[3] for entry in entries], rng)):
+            if seed is not None:
+                seeds[entry[2]][entry[1]] = seed
+        pending = set(range(0, len(self._owners)))
+        results = {}
+        while len(pending) > 0 and self.workers > 0:
+            assigned = {}
+            for shard in sorted(pending):
+                assigned.setdefault(self._owners[shard], []).append(shard)
+            for worker in sorted(assigned):
+                shards = assigned[worker]
+                try:
+                    self._workers[worker].send(("day", conditions, self.shardUpdates(shards, changes),
+                                                dict([(shard, seeds[shard]) for shard in shards])))
+                except (IOError, EOFError):
+                    self.drop(worker)
+            for worker in sorted(assigned):
+                if self._workers[worker] is None:
+                    continue
+                reply = self.receive(worker)
+                if reply is None:
+                    self.drop(worker)
+                    continue
+                results.update(reply)
+                pending.difference_update(assigned[worker])
+        if len(pending) > 0:
+            # No workers left, the coordinator evaluates what remains
+            for shard, genomes in self.shardGenomes(pending).items():
+                keys = sorted(genomes)
+                results[shard] = list(zip(keys, evaluateGenomes(
+                    (conditions, [genomes[key] for key in keys],
+                     [seeds[shard].get(key) for key in keys]))))
+        for shard in results:
+            for key, fitness in results[shard]:
+                by_key[key].assignFitness(fitness)
+
+    def close(self):
+        """Stop localhost workers and disconnect from remote workers."""
+        if self._workers is not None:
+            message = ("shutdown",) if self._local > 0 else ("close",)
+            for connection in self._workers:
+                if connection is None:
+                    continue
+                try:
+                    connection.send(message)
+                    connection.close()
+                except (IOError, EOFError):
+                    pass
+            for process in self._processes:
+                process.join(self._timeout)
+                if process.is_alive():
+                    process.terminate()
+        self.reset()
+
+    # Connections and processes can not be pickled, workers are set up again after loading.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update({"_workers": None, "_processes": [], "_owners": [], "_sizes": [],
+                      "_stale": set(), "_tracked": {}, "_next_key": 0})
+        return state
+
+
+def main(arguments):
+    """Run a worker from command line arguments. Returns exit code."""
+    if len(arguments) != 1:
+        print("Usage: python evonum_remote.py host:port (key is read from EVONUM_AUTHKEY)")
+        return 2
+    authkey = environmentKey()
+    if authkey is None:
+        print("Error: EVONUM_AUTHKEY must be set to the coordinator's shared secret key.")
+        return 2
+    try:
+        address = parseAddress(arguments[0])
+    except ValueError as e:
+        print(e)
+        return 2
+    print("Evaluating shards for coordinators at %s:%d" % address)
+    runWorker(address, authkey)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
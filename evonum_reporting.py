@@ -0,0 +1,274 @@
+from __future__ import print_function
+import json
+import sys
+import os
+import threading
+import time
+from timeit import default_timer
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+def createReporter(settings=None):
+    """Returns a new reporter from a dictionary of settings.
+
+    Settings (all optional):
+    days = report every N days (default 1, 0 = only by seconds)
+    seconds = also report when T seconds have passed since the last report
+    quiet = True to batch daily stdout lines and print them with each report
+    jsonl = file that every report is appended to as a JSON line
+    background = True to write reports from a background thread
+    Returns None if settings are bad."""
+    if settings is None:
+        settings = {}
+    try:
+        days = int(settings.get("days", 1))
+        seconds = settings.get("seconds")
+        seconds = float(seconds) if seconds is not None else None
+        quiet = str(settings.get("quiet", False)).upper() == "TRUE"
+        background = str(settings.get("background", False)).upper() == "TRUE"
+    except (ValueError, TypeError, AttributeError):
+        print("Error: bad reporter settings %s." % str(settings))
+        return None
+    unknown = [item for item in settings
+               if item not in ["days", "seconds", "quiet", "jsonl", "background"]]
+    if len(unknown) > 0:
+        print("Error: unknown reporter setting(s) %s." % ", ".join(unknown))
+        return None
+    if days < 0 or (days == 0 and seconds is None) or (seconds is not None and seconds <= 0):
+        print("Error: reporter needs days > 0 and/or seconds > 0.")
+        return None
+    return Reporter(days, seconds, quiet, settings.get("jsonl"), background)
+
+
+# Phases of a world's day in the order they run and the solvers counted each day
+DAY_PHASES = ["force_begin", "solver_begin", "reproduce", "evaluate", "score",
+              "print_day", "prune_withheld", "write_day", "prune"]
+SOLVER_COUNTS = ["born", "evaluated", "withheld", "killed"]
+
+
+def writeTimingsRow(filename, day, values):
+    """Append one day of phase times and solver counts to CSV file, writing the header to new files."""
+    new_file = not os.path.exists(filename) or os.path.getsize(filename) == 0
+    outfile = open(filename, "a")
+    if new_file:
+        outfile.write(",".join(["day"] + DAY_PHASES + SOLVER_COUNTS) + "\n")
+    outfile.write(",".join([str(day)] + ["%.6f" % values[item] for item in DAY_PHASES] +
+                           [str(values[item]) for item in SOLVER_COUNTS]) + "\n")
+    outfile.close()
+
+
+def formatTimings(label, timings):
+    """Returns readable summary of PhaseTimer.summary() for label (ex: an action)."""
+    total = sum([timings[item] for item in DAY_PHASES])
+    phases = ["%s %.3fs (%d%%)" % (item, timings[item],
+                                  int(round(100 * timings[item] / total)) if total > 0 else 0)
+              for item in DAY_PHASES]
+    counts = ["%s %d" % (item, timings[item]) for item in SOLVER_COUNTS]
+    return ("%s: %d days in %.3fs\n  %s\n  solvers: %s" %
+            (label, timings["days"], total, ", ".join(phases), ", ".join(counts)))
+
+
+class PhaseTimer(object):
+    """Adds up time spent in each phase of a world's days and counts solvers.
+
+    start() begins a day, lap(phase) adds the time since the previous lap to
+    phase, count(name, total) adds solvers and endDay(day) adds the day to the
+    totals. Totals build up until reset(). If csv is set, every day is
+    appended to it as a row (see writeTimingsRow).
+    """
+
+    def __init__(self, csv=None):
+        self._csv = csv
+        self.reset()
+
+    def reset(self):
+        """Clear totals."""
+        self._days = 0
+        self._totals = dict.fromkeys(DAY_PHASES + SOLVER_COUNTS, 0)
+        self._day = dict(self._totals)
+        self._last = None
+
+    @property
+    def csv(self):
+        """CSV file that each day is appended to (None for no file)"""
+        return self._csv
+
+    @csv.setter
+    def csv(self, filename):
+        self._csv = filename
+
+    def start(self):
+        self._day = dict.fromkeys(DAY_PHASES + SOLVER_COUNTS, 0)
+        self._last = default_timer()
+
+    def lap(self, phase):
+        now = default_timer()
+        self._day[phase] += now - self._last
+        self._last = now
+
+    def count(self, name, total):
+        self._day[name] += total
+
+    def endDay(self, day):
+        self._days += 1
+        for item in self._day:
+            self._totals[item] += self._day[item]
+        if self._csv is not None:
+            writeTimingsRow(self._csv, day, self._day)
+
+    def summary(self):
+        """Returns dictionary of total seconds in each phase, solver counts and days."""
+        summary = dict(self._totals)
+        summary["days"] = self._days
+        return summary
+
+
+def writeDump(snapshot, filename):
+    """Write day snapshot (see Terrarium.snapshotDay) as the human-readable daily dump."""
+    outfile = open(filename, "w")
+    outfile.write("Day " + str(snapshot["day"]))
+    if snapshot["max_fitness"] is not None:
+        outfile.write(" AvgFit: " + str(snapshot["avg_fitness"]) +
+                      " MaxFit: " + str(snapshot["max_fitness"]))
+    else:
+        outfile.write(" All solvers dead or withheld!")
+    outfile.write("\nForces:\n")
+    for item in snapshot["forces"]:
+        outfile.write(item + "\n")
+    outfile.write("Total solvers withheld due to math domain failure: %d\n" %
+                  snapshot["withheld"])
+    if snapshot["max_fitness"] is not None:
+        outfile.write("\n" + "=" * 50 + "\n")
+        outfile.write("Top 5 solvers:\n")
+        for item in snapshot["top"]:
+            outfile.write(item)
+        outfile.write("\nOldest solvers\n")
+        for item in snapshot["oldest"]:
+            outfile.write(item)
+        outfile.write("\n")
+    outfile.close()
+
+
+def snapshotRecord(snapshot):
+    """Returns JSON line for day snapshot: stats and best solver, without description strings."""
+    record = dict([(item, snapshot[item]) for item in snapshot
+                   if item not in ["forces", "top", "oldest", "dump"]])
+    return json.dumps(record, sort_keys=True) + "\n"
+
+
+class Reporter(object):
+    """Decides when a world's day is reported and writes the reports.
+
+    Reports are the daily dump file (rewritten each report) and an optional
+    append-only JSON Lines file. Snapshots are only taken on report days,
+    every N days and/or every T seconds. With background, snapshots are
+    handed to a writer thread so the simulation does not wait on file I/O.
+    With quiet, the per-day stdout line is buffered and printed in one
+    write with each report.
+    The default (every day, not quiet, no background) matches writing the
+    dump every day.
+    """
+
+    def __init__(self, days=1, seconds=None, quiet=False, jsonl=None, background=False):
+        self._days = days
+        self._seconds = seconds
+        self._quiet = quiet
+        self._jsonl = jsonl
+        self._background = background
+        self._last_day = 0
+        self._last_time = time.time()
+        self._lines = []  # Buffered stdout lines in quiet mode
+        self._queue = None
+        self._writer = None
+
+    @property
+    def jsonl(self):
+        return self._jsonl
+
+    @jsonl.setter
+    def jsonl(self, filename):
+        self._jsonl = filename
+
+    def printDay(self, line):
+        """Print the day's summary line, or buffer it in quiet mode."""
+        if self._quiet:
+            self._lines.append(line + "\n")
+        else:
+            print(line)
+
+    def flushLines(self):
+        if len(self._lines) > 0:
+            sys.stdout.write("".join(self._lines))
+            self._lines = []
+
+    def due(self, day):
+        """True if day should be reported."""
+        if self._days > 0 and day - self._last_day >= self._days:
+            return True
+        if self._seconds is not None and time.time() - self._last_time >= self._seconds:
+            return True
+        return False
+
+    def reportDay(self, world, solver_scores, withheld_solvers, force=False):
+        """Report world's current day if due (or force is True)."""
+        if not force and not self.due(world._current_day):
+            return
+        self._last_day = world._current_day
+        self._last_time = time.time()
+        snapshot = world.snapshotDay(solver_scores, withheld_solvers)
+        snapshot["dump"] = world._dump_filename
+        if self._background:
+            if self._writer is None:
+                self._queue = queue.Queue(maxsize=4)
+                self._writer = threading.Thread(target=self._writeLoop)
+                self._writer.daemon = True
+                self._writer.start()
+            self._queue.put(snapshot)
+        else:
+            self.write(snapshot)
+        self.flushLines()
+
+    def write(self, snapshot):
+        writeDump(snapshot, snapshot["dump"])
+        if self._jsonl is not None:
+            outfile = open(self._jsonl, "a")
+            outfile.write(snapshotRecord(snapshot))
+            outfile.close()
+
+    def _writeLoop(self):
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                return
+            self.write(snapshot)
+
+    def close(self):
+        """Print buffered lines and wait for all queued reports to be written."""
+        self.flushLines()
+        self.stopWriter()
+
+    def stopWriter(self):
+        """Wait for queued reports to be written and stop the writer thread (ex: before forking).
+
+        A new writer is started with the next background report."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+
+    @property
+    def last_day(self):
+        """Last day that was reported"""
+        return self._last_day
+
+    # Writer threads can not be pickled, a new writer is started after loading.
+    # Reports already queued are still written by this reporter.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_queue"] = None
+        state["_writer"] = None
+        return state
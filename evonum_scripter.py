@@ -1,10 +1,418 @@
 from evonum_terrarium import *
+from evonum_population import createTerrarium
+from evonum_checkpoint import Checkpointer, loadCheckpoint, readCheckpoint, writeManifest
+from evonum_reporting import formatTimings
+from evonum_migration import createMigration
+import collections
 import json
+import multiprocessing
+import random
+import sys
+import time
+import traceback
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 # Takes script from command line and interprets with extremely limited
 # functionality.
 
 
+# Export file formats: legacy json array or json lines (optionally compressed)
+EXPORT_FORMATS = ["json", "jsonl", "jsonl.gz", "jsonl.xz"]
+
+
+def untilSettings(action):
+    """Returns (max days, target, window, epsilon) of a RunUntil action, unset rules are None."""
+    sets = action.split("_")[1:]
+    return (int(sets[0]), None if sets[1] == "None" else float(sets[1]),
+            None if sets[2] == "None" else int(sets[2]), float(sets[3]))
+
+
+class ConvergenceMonitor(object):
+    """Stopping rules of a Run until action, checked against each day's best fitness.
+
+    target: stop once the day's best fitness reaches target.
+    window: stop once the best fitness of the last window days improves on the
+    best fitness before them by no more than epsilon times its size
+    (epsilon 0 = no improvement at all).
+    Keeps the last window days and a queue of their decreasing maxima, so each
+    day costs the same however long the window is.
+    """
+
+    def __init__(self, target=None, window=None, epsilon=0.0):
+        self._target = target
+        self._window = window
+        self._epsilon = epsilon
+        self._days = 0  # Days with a best fitness
+        self._recent = collections.deque()  # Best fitness of the last window days
+        self._maxima = collections.deque()  # [day, fitness] of decreasing maxima of recent
+        self._best_before = None  # Best fitness before the last window days
+        self._reason = None  # Why the run should stop, None while it continues
+
+    @property
+    def reason(self):
+        return self._reason
+
+    @property
+    def state(self):
+        """JSON compatible state, see fromState"""
+        return {"target": self._target, "window": self._window, "epsilon": self._epsilon,
+                "days": self._days, "recent": list(self._recent),
+                "maxima": [list(item) for item in self._maxima],
+                "best_before": self._best_before, "reason": self._reason}
+
+    @staticmethod
+    def fromState(state):
+        """Returns monitor continuing from state."""
+        monitor = ConvergenceMonitor(state["target"], state["window"], state["epsilon"])
+        monitor._days = state["days"]
+        monitor._recent.extend(state["recent"])
+        monitor._maxima.extend(state["maxima"])
+        monitor._best_before = state["best_before"]
+        monitor._reason = state["reason"]
+        return monitor
+
+    def update(self, fitness):
+        """Add a day's best fitness (None if no solver was scored). Returns True if the run should stop."""
+        if fitness is not None and self._target is not None and fitness >= self._target:
+            self._reason = "target fitness %g reached" % self._target
+            return True
+        if self._window is None or fitness is None:
+            return False
+        self._days += 1
+        self._recent.append(fitness)
+        while len(self._maxima) > 0 and self._maxima[-1][1] <= fitness:
+            self._maxima.pop()
+        self._maxima.append([self._days, fitness])
+        if len(self._recent) > self._window:
+            dropped = self._recent.popleft()
+            if self._best_before is None or dropped > self._best_before:
+                self._best_before = dropped
+            if self._maxima[0][0] <= self._days - len(self._recent):
+                self._maxima.popleft()
+        if self._best_before is None:
+            return False
+        improvement = self._maxima[0][1] - self._best_before
+        if improvement <= self._epsilon * abs(self._best_before):
+            self._reason = "best fitness improved by %g over the last %d days" % (
+                max(improvement, 0), self._window)
+            return True
+        return False
+
+
+def budgetSeconds(text):
+    """Returns seconds of a time budget such as 90s, 45m or 1.5h. Raises ValueError if text is bad."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    text = text.strip().lower()
+    if text[-1:] not in units:
+        raise ValueError("Error: time budget %s must end in s, m or h." % text)
+    seconds = float(text[:-1]) * units[text[-1]]
+    if not seconds > 0:
+        raise ValueError("Error: time budget %s must be greater than 0." % text)
+    return seconds
+
+
+class TimeBudget(object):
+    """Wall-clock budget of a Run: 45m action.
+
+    Seconds per day are measured over the last RATE_DAYS days of wall time,
+    so the time of other worlds stepped in the same process is included.
+    Optional spent is time already used (ex: before a checkpoint).
+    """
+    RATE_DAYS = 20
+
+    def __init__(self, seconds, spent=0.0):
+        self._seconds = seconds
+        self._start = time.time() - spent
+        self._stamps = collections.deque([time.time()])  # Wall time at the end of recent days
+
+    @property
+    def seconds(self):
+        return self._seconds
+
+    @property
+    def spent(self):
+        return time.time() - self._start
+
+    @property
+    def remaining(self):
+        return self._seconds - self.spent
+
+    @property
+    def seconds_per_day(self):
+        """Recent wall time per day, None until a day has been measured"""
+        if len(self._stamps) < 2:
+            return None
+        return (self._stamps[-1] - self._stamps[0]) / (len(self._stamps) - 1)
+
+    def dayDone(self):
+        self._stamps.append(time.time())
+        if len(self._stamps) > self.RATE_DAYS + 1:
+            self._stamps.popleft()
+
+    def daysLeft(self, reserved=0.0):
+        """Returns number of days that fit in the remaining time after reserved days, None until measured."""
+        if self.seconds_per_day is None:
+            return None
+        return self.remaining / max(self.seconds_per_day, 1e-9) - reserved
+
+
+class WorldSchedule(object):
+    """Runs one world through the scripter's actions one day at a time.
+
+    Keeps track of position in the schedule so worlds can be stepped together
+    or run to completion on their own (ex: in a worker process).
+    """
+
+    def __init__(self, world, actions, refresh_rate):
+        self._world = world
+        self._actions = actions
+        self._refresh_rate = refresh_rate
+        self._action = 0  # Position in actions
+        self._day = 0  # Days completed in current action
+        self._end_ramp = None  # Max population for each day of current End
+        self._monitor = None  # Stopping rules of current Run until
+        self._budget = None  # Time budget of current timed Run
+        self._end_days = None  # Days of the next End when shortened to fit a time budget
+
+    @property
+    def world(self):
+        return self._world
+
+    @property
+    def finished(self):
+        return self._action >= len(self._actions)
+
+    def step(self):
+        """Run one day of the current action. Returns False once schedule is finished."""
+        while not self.finished:
+            item = self._actions[self._action]
+            if item.startswith("RunFor"):
+                if self._budget is None:
+                    self._budget = TimeBudget(float(item.split("_")[1]))
+                days_left = self._budget.daysLeft(self.endCost())
+                if days_left is None or days_left >= 1:
+                    # Fresh solvers are only added if a full refresh block still fits
+                    self.runDay(days_left is None or days_left - 1 >= self._refresh_rate[1])
+                    self._budget.dayDone()
+                    return True
+                if self._day > 0:
+                    print ("Stopping %s after %d days at %.2f seconds per day." %
+                           (item, self._day, self._budget.seconds_per_day))
+                self.fitEnd()
+            elif item.startswith("RunUntil"):
+                days, target, window, epsilon = untilSettings(item)
+                if self._monitor is None:
+                    self._monitor = ConvergenceMonitor(target, window, epsilon)
+                if self._day < days and self._monitor.reason is None:
+                    self.runDay()
+                    if self._monitor.update(self._world.best_fitness):
+                        print ("Stopping %s after %d days: %s." %
+                               (item, self._day, self._monitor.reason))
+                    return True
+            elif item.startswith("Run"):
+                if self._day < int(item.split("_")[1]):
+                    self.runDay()
+                    return True
+            elif item.startswith("End"):
+                if self._end_ramp is None:
+                    days = int(item.split("_")[1])
+                    if self._end_days is not None:
+                        days = self._end_days
+                        self._end_days = None
+                    self._end_ramp = self._world.endWorldRamp(days, int(item.split("_")[2])) \
+                        if days > 0 else []
+                if self._day < len(self._end_ramp):
+                    self._world._max_solvers = self._end_ramp[self._day]
+                    self._world.runDays(1)
+                    self._day += 1
+                    return True
+            if self._day > 0:
+                self.summarizeAction(item)
+            self._action += 1
+            self._day = 0
+            self._end_ramp = None
+            self._monitor = None
+            self._budget = None
+        return False
+
+    def runDay(self, refresh=True):
+        """Run one day of a Run action, adding fresh solvers after every full refresh block (if refresh)."""
+        self._world.runDays(1)
+        self._day += 1
+        if refresh and self._refresh_rate[1] > 0 and self._day % self._refresh_rate[1] == 0:
+            print ("Adding %d new solvers." %
+                   self._refresh_rate[0])
+            for adding_solvers in range(0, self._refresh_rate[0]):
+                self._world.addSolver()
+
+    def nextEnd(self):
+        """Returns (days, destination) of the End right after the current action, None if there is none."""
+        if self._action + 1 < len(self._actions) and self._actions[self._action + 1].startswith("End"):
+            sets = self._actions[self._action + 1].split("_")
+            return int(sets[1]), int(sets[2])
+        return None
+
+    def endCost(self, days=None):
+        """Returns cost of the next End (or of its first days) in days at the current max population.
+
+        Each End day costs its max population relative to the current one."""
+        end = self.nextEnd()
+        if end is None:
+            return 0.0
+        if days is None:
+            days = end[0]
+        if days < 2:  # Ramps need at least 2 days
+            return 0.0
+        return sum(self._world.endWorldRamp(days, end[1])) / float(max(self._world._max_solvers, 1))
+
+    def fitEnd(self):
+        """Shorten the next End if it does not fit in the rest of the time budget."""
+        end = self.nextEnd()
+        days_left = self._budget.daysLeft()
+        if end is None or days_left is None or self.endCost() <= days_left:
+            return
+        # Ramps cost more with more days, find the longest that fits
+        low, high = 0, end[0]
+        while low < high:
+            middle = (low + high + 1) // 2
+            if middle >= 2 and self.endCost(middle) > days_left:
+                high = middle - 1
+            else:
+                low = middle
+        self._end_days = low if low >= 2 else 0
+        print ("Shortening End_%d_%d to %d days to fit the remaining %.0f seconds." %
+               (end[0], end[1], self._end_days, max(self._budget.remaining, 0)))
+
+    def summarizeAction(self, action):
+        """Print where the world's time went during action and start new totals."""
+        print (formatTimings("Timings for " + action, self._world.timings))
+        self._world.resetTimings()
+
+    @property
+    def position(self):
+        """Position in schedule: current action, days completed in it, End ramp and Run until monitor (if any)."""
+        position = {"action": self._action, "day": self._day, "end_ramp": self._end_ramp}
+        if self._monitor is not None:
+            position["monitor"] = self._monitor.state
+        if self._budget is not None:
+            position["budget_spent"] = self._budget.spent
+        if self._end_days is not None:
+            position["end_days"] = self._end_days
+        return position
+
+    def setPosition(self, position):
+        self._action = position["action"]
+        self._day = position["day"]
+        self._end_ramp = position["end_ramp"]
+        if position.get("monitor") is not None:
+            self._monitor = ConvergenceMonitor.fromState(position["monitor"])
+        if position.get("budget_spent") is not None:
+            self._budget = TimeBudget(float(self._actions[self._action].split("_")[1]),
+                                      position["budget_spent"])
+        self._end_days = position.get("end_days")
+
+    def runAll(self):
+        """Run the rest of the schedule."""
+        while self.step():
+            pass
+
+
+def runSchedules(schedules, checkpointer=None, migration=None):
+    """Step schedules together one day at a time until all are finished.
+
+    Optional checkpointer is given every day stepped. Optional migration
+    moves solvers between the schedules' worlds when due, before checkpoints."""
+    rounds = 0 if checkpointer is None else checkpointer.rounds
+    running = True
+    while running:
+        running = False
+        for each_schedule in schedules:
+            if each_schedule.step():
+                running = True
+        if not running:
+            break
+        rounds += 1
+        if migration is not None and migration.due(rounds):
+            migration.migrate([None if item.finished else item.world for item in schedules])
+        if checkpointer is not None:
+            checkpointer.tick(schedules)
+    if checkpointer is not None:
+        checkpointer.close()
+
+
+def runScheduleInWorker(arguments):
+    """Run a world's whole schedule in a worker process.
+
+    Takes (world, actions, refresh_rate, seed, checkpoint). seed is an int or a
+    random state to continue from. checkpoint is None or a dictionary with
+    prefix, days, rounds and position (None to start at the beginning).
+    Returns the world and everything it printed."""
+    world, actions, refresh_rate, seed, checkpoint = arguments
+    if isinstance(seed, tuple):
+        random.setstate(seed)
+    else:
+        random.seed(seed)
+    output = StringIO()
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+        schedule = WorldSchedule(world, actions, refresh_rate)
+        checkpointer = None
+        if checkpoint is not None:
+            if checkpoint["position"] is not None:
+                schedule.setPosition(checkpoint["position"])
+            checkpointer = Checkpointer(checkpoint["prefix"], checkpoint["days"],
+                                        rounds=checkpoint["rounds"])
+        runSchedules([schedule], checkpointer)
+        world.closeReporter()
+    finally:
+        sys.stdout = stdout
+    return world, output.getvalue()
+
+
+def runIslandsInWorker(connection, worlds, actions, refresh_rate, seed, migration):
+    """Run the schedules of a group of island worlds in a worker process.
+
+    When migration is due the group's emigrants are sent through connection
+    and the migrants arriving at each world are received and imported.
+    Finishes by sending ("done", worlds, everything printed), or ("error", traceback)."""
+    random.seed(seed)
+    output = StringIO()
+    stdout = sys.stdout
+    sys.stdout = output
+    try:
+        try:
+            schedules = [WorldSchedule(world, actions, refresh_rate) for world in worlds]
+            rounds = 0
+            while True:
+                running = False
+                for each_schedule in schedules:
+                    if each_schedule.step():
+                        running = True
+                if not running:
+                    break
+                rounds += 1
+                if migration.due(rounds):
+                    # Finished worlds (ex: stopped early) neither send nor receive migrants
+                    connection.send(("migrants", [[] if item.finished else migration.emigrants(item.world)
+                                                  for item in schedules]))
+                    for item, migrants in zip(schedules, connection.recv()):
+                        if not item.finished:
+                            migration.settle(item.world, migrants)
+            for world in worlds:
+                world.closeReporter()
+        finally:
+            sys.stdout = stdout
+        connection.send(("done", worlds, output.getvalue()))
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+    finally:
+        connection.close()
+
+
 class SimpleScripter(object):
     """Simple script file interpreter for setting up simulation and running."""
 
@@ -20,13 +428,17 @@ class SimpleScripter(object):
         self._refresh_rate = [0, 0]
         self._export = None
         self._solver_settings = {}
+        self._processes = 1
+        self._export_format = "json"
+        self._checkpoint = None  # [days between checkpoints, file prefix]
+        self._migration = None
+        self._resumed = None  # Position, days stepped and random state of each world after resume
 
         for line in script:
             line = line.strip()
             if "#" in line:
                 line = line.split("#")[0]
             if line.startswith("World"):
-                self._worlds.append(Terrarium())
                 try:
                     sets = [item.strip() for item in line.split(":")[1].split(",")]
                     settings = {"_max_solvers": int(sets[0]), "_max_forces": int(
@@ -37,6 +449,12 @@ class SimpleScripter(object):
                 except ValueError:
                     raise TypeError(
                         "Error: Bad type given for world setting(s).")
+                # Optional population backend (Object, Array or Array32)
+                new_world = createTerrarium(sets[3]) if len(sets) > 3 else Terrarium()
+                if new_world is None:
+                    print("Error: unable to create %s world, using Object world." % sets[3])
+                    new_world = Terrarium()
+                self._worlds.append(new_world)
                 # TODO: Complete ability to have multiple worlds running with
                 # different solver conditions.
                 self._worlds[-1].importSettings(settings)
@@ -61,15 +479,25 @@ class SimpleScripter(object):
                     total = int(sets[0])
                     force_type = sets[1]
                     force_subtype = sets[2]
-                    force_conditions = ','.join(sets[3:])
+                    # Optional force settings of form variable = value follow the conditions
+                    force_conditions = ','.join(
+                        [item for item in sets[3:] if "=" not in item])
+                    force_settings = self.parseSolverSettings(
+                        ','.join([item for item in sets[3:] if "=" in item]))
+                    batch_size = int(force_settings.pop("batch", 1))
+                    scoring = force_settings.pop("scoring", "Random")
+                    strata = force_settings.pop("strata", None)
                 except (IndexError, ValueError):
                     print(
                         "Error: Force: must be followed with number, type, subtype, conditions. Force skipped.")
                     continue
+                for item in force_settings:
+                    print("Error: unknown force setting %s ignored." % item)
                 for x in range(0, int(sets[0])):
                     initial = len(self._worlds[-1]._forces)
                     self._worlds[-1].addForce(force_type,
-                                              force_subtype, force_conditions)
+                                              force_subtype, force_conditions, batch_size,
+                                              scoring, strata)
                     if len(self._worlds[-1]._forces) > initial:
                         print ("%d fitness forces added to world of type %s and subtype %s" % (
                             total, force_type, force_subtype))
@@ -102,10 +530,112 @@ class SimpleScripter(object):
                         "Error: world initialization must be first line of script!")
                 filename = line.split(":")[1].strip()
                 print("Importing solvers from %s" % filename)
-                solver_json = open(filename)
-                solvers = json.load(solver_json)
+                # Solvers are streamed from the file separately for each world
                 for world in self._worlds:
-                    world.importSolvers(solvers)
+                    world.importSolversFrom(filename)
+
+            elif line.startswith("Evaluator"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    sets = [item.strip()
+                            for item in line.split(":", 1)[1].split(",")]
+                    evaluator_type = sets[0]
+                    if len(sets) > 1 and ":" in sets[1]:
+                        processes = sets[1:]  # Remote worker host:port addresses
+                    else:
+                        processes = int(sets[1]) if len(sets) > 1 else None
+                except (IndexError, ValueError):
+                    print("Error: Evaluator: must be followed with evaluator type and optional # of processes (or Remote worker addresses). Evaluator skipped.")
+                    continue
+                for pos, item in enumerate(self._worlds):
+                    item.setEvaluator(evaluator_type, processes)
+                    print("World%d solvers will be evaluated with %s evaluator." %
+                          (pos + 1, item._evaluator.type_))
+
+            elif line.startswith("Selection"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    sets = [item.strip()
+                            for item in line.split(":")[1].split(",")]
+                    selection_type = sets[0]
+                    tournament_size = int(sets[1]) if len(sets) > 1 else None
+                except (IndexError, ValueError):
+                    print("Error: Selection: must be followed with selection type and optional tournament size. Selection skipped.")
+                    continue
+                for pos, item in enumerate(self._worlds):
+                    item.setSelection(selection_type, tournament_size)
+                    print("World%d solvers will be pruned with %s selection." %
+                          (pos + 1, item._selection.type_))
+
+            elif line.startswith("Mutation"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    engine_type = line.split(":")[1].strip()
+                except IndexError:
+                    print("Error: Mutation: must be followed with mutation engine type. Mutation skipped.")
+                    continue
+                for pos, item in enumerate(self._worlds):
+                    item.setMutation(engine_type)
+                    print("World%d children will be mutated with %s mutation." %
+                          (pos + 1, item._mutation.type_))
+
+            elif line.startswith("Seed"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    seed = int(line.split(":")[1].strip())
+                except (IndexError, ValueError):
+                    print("Error: Seed: must be followed with int seed. Seed skipped.")
+                    continue
+                # Each world gets its own stream, seeded from a stream of world seeds
+                world_seeds = random.Random(seed)
+                for pos, item in enumerate(self._worlds):
+                    item.setSeed(world_seeds.getrandbits(64))
+                    print("World%d draws from its own random stream (seed %d)." %
+                          (pos + 1, seed))
+
+            elif line.startswith("Report"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    report_settings = self.parseSolverSettings(line.split(":")[1])
+                except IndexError:
+                    print("Error: Report: must be followed with settings of form variable = value. Report skipped.")
+                    continue
+                for pos, item in enumerate(self._worlds):
+                    settings = dict(report_settings)
+                    # Each world appends to its own JSON lines file
+                    if "jsonl" in settings and len(self._worlds) > 1:
+                        settings["jsonl"] = "world%d_%s" % (pos + 1, settings["jsonl"])
+                    item.setReporter(settings)
+                print("Reports set: " + str(report_settings))
+
+            elif line.startswith("Timings"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    filename = line.split(":")[1].strip()
+                except IndexError:
+                    filename = ""
+                if filename == "":
+                    print("Error: Timings: must be followed by CSV filename. Timings file skipped.")
+                    continue
+                for pos, item in enumerate(self._worlds):
+                    # Each world appends to its own CSV file
+                    if len(self._worlds) > 1:
+                        item.setTimingsFile("world%d_%s" % (pos + 1, filename))
+                    else:
+                        item.setTimingsFile(filename)
+                print("Daily timings will be written to %s." % filename)
 
             elif line.startswith("Refresh Solvers"):
                 if len(self._worlds) == 0:
@@ -130,16 +660,43 @@ class SimpleScripter(object):
                     print ("%d fresh solvers will be added every %d days." %
                            (self._refresh_rate[0], self._refresh_rate[1]))
 
+            elif line.startswith("Run until"):
+                if len(self._worlds) == 0:
+                    raise ValueError(
+                        "Error: world initialization must be first line of script!")
+                try:
+                    sets = [item.strip() for item in line.split(":")[1].split(",")]
+                    duration = int(sets[0])
+                    rules = {}
+                    for item in sets[1:]:
+                        name, value = [part.strip() for part in item.split("=")]
+                        rules[name] = value
+                    target = float(rules.pop("target")) if "target" in rules else None
+                    window = int(rules.pop("window")) if "window" in rules else None
+                    epsilon = float(rules.pop("epsilon", 0))
+                except (IndexError, ValueError):
+                    raise ValueError(
+                        "Error: Run until: must be followed by int max days and target = F, window = W and/or epsilon = E.")
+                if len(rules) > 0 or (target is None and window is None) or (window is None and epsilon != 0):
+                    raise ValueError(
+                        "Error: Run until: needs target = F and/or window = W (with optional epsilon = E) stopping rules.")
+                if window is not None and window < 1:
+                    raise ValueError("Error: Run until: window must be at least 1 day.")
+                self._actions.append("RunUntil_%d_%r_%r_%r" % (duration, target, window, epsilon))
             elif line.startswith("Run"):
                 if len(self._worlds) == 0:
                     raise ValueError(
                         "Error: world initialization must be first line of script!")
                 try:
-                    duration = int(line.split(":")[1].strip())
+                    duration = line.split(":")[1].strip()
+                    if duration[-1:].isdigit():
+                        self._actions.append("Run_" + str(int(duration)))
+                    else:
+                        # Time budget, the Run and the End after it are fit into it
+                        self._actions.append("RunFor_%r" % budgetSeconds(duration))
                 except (IndexError, ValueError):
                     raise ValueError(
-                        "Error: Run: must be followed by int number of days to run.")
-                self._actions.append("Run_" + str(duration))
+                        "Error: Run: must be followed by int number of days to run or a time budget (ex: 45m).")
             elif line.startswith("End"):
                 try:
                     sets = [item.strip()
@@ -153,16 +710,63 @@ class SimpleScripter(object):
                     self._actions.append(
                         "End_" + str(target) + "_" + str(duration))
 
+            elif line.startswith("Parallel"):
+                try:
+                    self._processes = int(line.split(":")[1].strip())
+                except (IndexError, ValueError):
+                    print(
+                        "Error: Parallel: must be followed by int number of worker processes. Worlds will run serially.")
+                    self._processes = 1
+                if self._processes < 1:
+                    self._processes = 1
+                if self._processes > 1:
+                    print ("Worlds will run in parallel on up to %d worker processes." %
+                           self._processes)
+
+            elif line.startswith("Migrate"):
+                try:
+                    sets = [item.strip() for item in line.split(":")[1].split(",")]
+                    migration = createMigration(sets[0], sets[1], sets[2] if len(sets) > 2 else "Ring")
+                except IndexError:
+                    print ("Error: Migrate: must be followed with # of days, # of migrants and optional topology (Ring or Full). Worlds will not migrate.")
+                    continue
+                if migration is None:
+                    print ("Error: failed to create migration. Worlds will not migrate.")
+                    continue
+                self._migration = migration
+                print ("Every %d days each world will send its top %d solvers to its %s neighbours." %
+                       (migration.days, migration.total, migration.topology))
+
             elif line.startswith("Export"):
                 if len(self._worlds) == 0:
                     raise ValueError(
                         "Error: world initialization must be first line of script!")
                 try:
-                    self._export = line.split(":")[1].strip()
+                    sets = [item.strip() for item in line.split(":")[1].split(",")]
                 except IndexError:
-                    self._export = ""
+                    sets = [""]
+                self._export = sets[0]
+                if len(sets) > 1:
+                    if sets[1] not in EXPORT_FORMATS:
+                        print("Error: unknown export format %s, using json." % sets[1])
+                    else:
+                        self._export_format = sets[1]
                 print("Solvers will be exported at run completion")
 
+            elif line.startswith("Checkpoint"):
+                try:
+                    sets = [item.strip() for item in line.split(":")[1].split(",")]
+                    days = int(sets[0])
+                    prefix = sets[1] if len(sets) > 1 and sets[1] != "" else "checkpoint"
+                except (IndexError, ValueError):
+                    print("Error: Checkpoint: must be followed by int number of days and optional file prefix. Checkpoints will not be written.")
+                    continue
+                if days < 1:
+                    print("Error: Checkpoint: days must be at least 1. Checkpoints will not be written.")
+                    continue
+                self._checkpoint = [days, prefix]
+                print("Checkpoint will be written to %s.json every %d days." % (prefix, days))
+
     # Run the schedule defined by the scripter after loading forces and
     # solvers into world.
     def run(self):
@@ -170,51 +774,179 @@ class SimpleScripter(object):
         print ("Running Schedule:")
         for item in self._actions:
             print (item)
-        for item in self._actions:
-            if item.startswith("Run"):
-                lifespan = int(item.split("_")[1])
-                if self._refresh_rate[1] > 0:
-                    blocks = int(lifespan / self._refresh_rate[1])
-                    block_size = self._refresh_rate[1]
-                    remainder = lifespan % self._refresh_rate[1]
-                else:
-                    blocks = 1
-                    block_size = lifespan
-                    remainder = 0
-                for x in range(0, blocks):
-                    for y in range(0, block_size):
-                        for each_world in self._worlds:
-                            each_world.runDays(1)
-                    if self._refresh_rate[1] > 0:
-                        print ("Adding %d new solvers." %
-                               self._refresh_rate[0])
-                        for each_world in self._worlds:
-                            for adding_solvers in range(0, self._refresh_rate[0]):
-                                each_world.addSolver()
-                for x in range(0, remainder):
-                    for each_world in self._worlds:
-                        each_world.runDays(1)
-
-            elif item.startswith("End"):
-                for all_worlds in self._worlds:
-                    all_worlds.endWorld(
-                        int(item.split("_")[1]), int(item.split("_")[2]))
+        parallel = self._processes > 1 and len(self._worlds) > 1
+        if parallel and self._migration is not None and self._checkpoint is not None:
+            print ("Checkpointed islands run serially, worlds will run in one process.")
+            parallel = False
+        if parallel and self._migration is not None:
+            self.runIslands()
+        elif parallel:
+            self.runParallel()
+        else:
+            schedules = [WorldSchedule(world, self._actions, self._refresh_rate)
+                         for world in self._worlds]
+            checkpointer = None
+            if self._checkpoint is not None:
+                rounds = 0
+                if self._resumed is not None:
+                    for pos, item in enumerate(self._resumed):
+                        schedules[pos].setPosition(item["position"])
+                    rounds = self._resumed[0]["rounds"]
+                checkpointer = Checkpointer(self._checkpoint[1], self._checkpoint[0],
+                                            self.checkpointSettings(), rounds)
+            runSchedules(schedules, checkpointer, self._migration)
 
         for pos, world in enumerate(self._worlds):
+            world.closeReporter()
+            world.closeEvaluator()
             world.printSolvers()
-            solvers = world.exportSolvers()
             if self._export is not None:
-                if len(solvers) > 0:
-                    outfile = open(self._export + "world" +
-                                   str(pos + 1) + "_solvers.json", "w")
-                    outfile.write("[\n")
-                    for item in solvers[:-1]:
-                        outfile.write(item + ",\n")
-                    outfile.write(solvers[-1] + "\n]\n")
-                    outfile.close()
-                else:
+                filename = self._export + "world" + str(pos + 1) + "_solvers." + self._export_format
+                # Solvers are streamed to file one at a time
+                exported = world.exportSolversTo(filename, self._export_format == "json")
+                if exported == 0:
                     print("No solvers to export from world%d" % (pos + 1))
 
+    def runParallel(self):
+        """Run each world's schedule in its own worker process.
+
+        Each world is sent with its own random seed and returned to the scripter
+        when finished, so exports work the same as a serial run. Daily output is
+        printed world by world once all worlds have finished."""
+        for pos, world in enumerate(self._worlds):
+            world.setDumpFile("world%d_daily_dump.txt" % (pos + 1))
+        arguments = [[world, self._actions, self._refresh_rate, random.getrandbits(32), None]
+                     for world in self._worlds]
+        if self._checkpoint is not None:
+            # Each world is checkpointed on its own with its own random state
+            settings = self.checkpointSettings()
+            settings["parallel"] = len(self._worlds)
+            writeManifest(self._checkpoint[1], {"round": 0, "worlds": [], "settings": settings})
+            for pos, item in enumerate(arguments):
+                item[4] = {"prefix": "%s_world%d" % (self._checkpoint[1], pos + 1),
+                           "days": self._checkpoint[0], "rounds": 0, "position": None}
+                if self._resumed is not None:
+                    item[3] = self._resumed[pos]["random"]
+                    item[4]["rounds"] = self._resumed[pos]["rounds"]
+                    item[4]["position"] = self._resumed[pos]["position"]
+        arguments = [tuple(item) for item in arguments]
+        pool = multiprocessing.Pool(min(self._processes, len(self._worlds)))
+        try:
+            results = pool.map(runScheduleInWorker, arguments)
+        finally:
+            pool.close()
+            pool.join()
+        for pos, result in enumerate(results):
+            self._worlds[pos], output = result
+            print ("=" * 20 + " World%d " % (pos + 1) + "=" * 20)
+            sys.stdout.write(output)
+
+    def runIslands(self):
+        """Run worlds as islands on worker processes, moving migrants between them.
+
+        Worlds are split across up to Parallel: workers that step their worlds
+        together. When migration is due every worker sends its worlds'
+        emigrants here and waits for the migrants routed to its worlds.
+        Daily output is printed worker by worker once all worlds have finished."""
+        for pos, world in enumerate(self._worlds):
+            world.setDumpFile("world%d_daily_dump.txt" % (pos + 1))
+        total_groups = min(self._processes, len(self._worlds))
+        groups = [list(range(pos, len(self._worlds), total_groups)) for pos in range(0, total_groups)]
+        connections = []
+        workers = []
+        try:
+            for members in groups:
+                connection, worker_connection = multiprocessing.Pipe()
+                worker = multiprocessing.Process(
+                    target=runIslandsInWorker,
+                    args=(worker_connection, [self._worlds[x] for x in members], self._actions,
+                          self._refresh_rate, random.getrandbits(32), self._migration))
+                worker.daemon = True
+                worker.start()
+                worker_connection.close()
+                connections.append(connection)
+                workers.append(worker)
+            outputs = [""] * len(groups)
+            active = list(range(0, len(groups)))
+            while len(active) > 0:
+                emigrants = [[] for world in self._worlds]
+                migrating = []
+                for pos in active:
+                    message = connections[pos].recv()
+                    if message[0] == "migrants":
+                        for world_pos, item in zip(groups[pos], message[1]):
+                            emigrants[world_pos] = item
+                        migrating.append(pos)
+                    elif message[0] == "done":
+                        for world_pos, world in zip(groups[pos], message[1]):
+                            self._worlds[world_pos] = world
+                        outputs[pos] = message[2]
+                    else:
+                        raise RuntimeError("Error: island worker failed.\n" + message[1])
+                incoming = self._migration.route(emigrants)
+                for pos in migrating:
+                    connections[pos].send([incoming[x] for x in groups[pos]])
+                active = migrating
+        except Exception:
+            for worker in workers:
+                worker.terminate()
+            raise
+        finally:
+            for worker in workers:
+                worker.join()
+        for pos, members in enumerate(groups):
+            print ("=" * 20 + " %s " % ", ".join(["World%d" % (x + 1) for x in members]) + "=" * 20)
+            sys.stdout.write(outputs[pos])
+
+    def checkpointSettings(self):
+        """Returns scripter settings needed to resume from a checkpoint."""
+        return {"actions": self._actions, "refresh_rate": self._refresh_rate,
+                "export": self._export, "export_format": self._export_format,
+                "processes": self._processes,
+                "migration": None if self._migration is None else self._migration.settings}
+
+    def resume(self):
+        """Replace worlds and settings with the latest checkpoint so run() continues from it.
+
+        Returns False if there is no checkpoint to resume from."""
+        if self._checkpoint is None:
+            print("Error: script has no Checkpoint: directive, nothing to resume.")
+            return False
+        manifest = readCheckpoint(self._checkpoint[1])
+        if manifest is None:
+            print("Error: no checkpoint found at %s.json." % self._checkpoint[1])
+            return False
+        settings = manifest["settings"]
+        worlds = []
+        self._resumed = []
+        if "parallel" in settings:
+            for pos in range(0, settings["parallel"]):
+                loaded = loadCheckpoint("%s_world%d" % (self._checkpoint[1], pos + 1))
+                if loaded is None:
+                    return False
+                worlds += loaded[1]
+                self._resumed.append({"position": loaded[0]["worlds"][0]["schedule"],
+                                      "rounds": loaded[0]["round"],
+                                      "random": random.getstate()})
+        else:
+            loaded = loadCheckpoint(self._checkpoint[1])
+            if loaded is None:
+                return False
+            worlds = loaded[1]
+            self._resumed = [{"position": item["schedule"], "rounds": loaded[0]["round"]}
+                             for item in loaded[0]["worlds"]]
+        self._worlds = worlds
+        self._actions = settings["actions"]
+        self._refresh_rate = settings["refresh_rate"]
+        self._export = settings["export"]
+        self._export_format = settings["export_format"]
+        self._processes = settings["processes"]
+        if settings.get("migration") is not None:
+            self._migration = createMigration(*settings["migration"])
+        print("Resuming %d world(s) from checkpoint %s.json" %
+              (len(self._worlds), self._checkpoint[1]))
+        return True
+
     def parseSolverSettings(self, settings):
         parsed_settings = {}
         if settings is None or settings == "":
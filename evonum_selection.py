@@ -0,0 +1,109 @@
+from __future__ import print_function
+import heapq
+import inspect
+import random
+
+
+def error():
+    raise NotImplementedError("%s not implemented" %
+                              inspect.stack()[1][3])  # Used for interface
+
+
+SELECTION_TYPES = ["Truncation", "Tournament"]
+HEAP_FRACTION = 10  # Heaps only beat a full sort when picking under 1/HEAP_FRACTION of the entries
+
+
+def createSelection(selection_type="Truncation", tournament_size=None):
+    """Returns a new survivor selection strategy of provided type.
+
+    Optional tournament_size sets number of solvers in each Tournament (default 2).
+    Returns None if selection creation failed."""
+    selection_type = str(selection_type)
+    if selection_type == "Truncation":
+        return TruncationSelection()
+    elif selection_type == "Tournament":
+        try:
+            return TournamentSelection(tournament_size)
+        except ValueError:
+            print("Error: tournament size must be int greater than 1.")
+            return None
+    else:
+        print("Error: unknown selection type %s." % selection_type)
+        return None
+
+
+def topSolvers(solver_scores, total, position=1):
+    """Returns the total entries of solver_scores with the highest value at position.
+
+    solver_scores entries are [solver, fitness, age] (position 1 = fitness, 2 = age).
+    Small totals (ex: reporting the top solvers) use partial selection with a
+    heap, larger ones a full sort. Either way the result is sorted high to
+    low and ties keep population order."""
+    if total * HEAP_FRACTION < len(solver_scores):
+        return heapq.nlargest(total, solver_scores, key=lambda x: x[position])
+    return sorted(solver_scores, key=lambda x: x[position], reverse=True)[:total]
+
+
+class SelectionInterface(object):
+
+    def selectLosers(self, solver_scores, total_survivors, rng=random):
+        """Returns entries of solver_scores that do not survive the day.
+
+        Selections that draw random numbers draw them from rng."""
+        error()
+
+    @property
+    def type_(self):
+        return self._type_
+
+
+class TruncationSelection(SelectionInterface):
+    """Everything outside the total_survivors best fitness scores loses."""
+
+    def __init__(self):
+        self._type_ = "Truncation"
+
+    def selectLosers(self, solver_scores, total_survivors, rng=random):
+        if len(solver_scores) <= total_survivors:
+            return []
+        survivors = set([id(item) for item in topSolvers(solver_scores, total_survivors)])
+        return [item for item in solver_scores if id(item) not in survivors]
+
+
+class TournamentSelection(SelectionInterface):
+    """Solvers are removed by repeated tournaments until total_survivors remain.
+
+    Each tournament draws tournament_size random remaining solvers and the one
+    with the lowest fitness loses. Weak solvers can survive by avoiding strong
+    opponents, which keeps more diversity than truncation. No sorting is needed.
+    """
+
+    def __init__(self, tournament_size=None):
+        self._type_ = "Tournament"
+        if tournament_size is None:
+            tournament_size = 2
+        self._tournament_size = int(tournament_size)
+        if self._tournament_size < 2:
+            raise ValueError
+
+    @property
+    def tournament_size(self):
+        return self._tournament_size
+
+    def selectLosers(self, solver_scores, total_survivors, rng=random):
+        remaining = list(solver_scores)
+        losers = []
+        while len(remaining) > total_survivors:
+            # Partial Fisher-Yates: swap random contenders to the end of
+            # remaining, so each tournament is O(tournament size)
+            total = len(remaining)
+            size = min(self._tournament_size, total)
+            for pos in range(total - 1, total - size - 1, -1):
+                pick = rng.randint(0, pos)
+                remaining[pick], remaining[pos] = remaining[pos], remaining[pick]
+            loser = min(range(total - size, total), key=lambda x: remaining[x][1])
+            losers.append(remaining[loser])
+            # Swap loser with last remaining solver so removal is O(1)
+            remaining[loser] = remaining[-1]
+            remaining.pop()
+        return losers
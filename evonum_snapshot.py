@@ -0,0 +1,251 @@
+from __future__ import print_function
+import json
+import random
+import struct
+from evonum_population import *
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    import numpy
+except ImportError:  # Snapshots are optional
+    numpy = None
+
+# Snapshot file layout:
+#   MAGIC, header length (little endian uint64), JSON header,
+#   pickled world state (everything except the population), then raw arrays.
+# The header lists the world class, where the pickled state is and the
+# name, dtype, shape and offset of every array. Arrays are aligned to
+# ALIGNMENT bytes so they can be memory-mapped on load.
+
+MAGIC = b"EVONUMSS"
+VERSION = 1
+ALIGNMENT = 64
+WORLD_CLASSES = {"Terrarium": Terrarium, "ArrayTerrarium": ArrayTerrarium}
+
+# Solver properties that may hold an int or a float. Each solver has a bit
+# flag per property marking ints so values are restored with the same type.
+NUMBER_PROPERTIES = ["_fitness", "_spread", "_module_mutation_chance",
+                     "_property_mutation_chance", "_swap_module_chance", "_merge_module_chance"]
+COEFF_INT = 1  # Module flag bits
+SPREAD_INT = 2
+
+
+def packSolvers(solvers):
+    """Pack list of SmallSolvers into arrays.
+
+    Returns dictionary of arrays and lists of names and fitness calculator types."""
+    width = SmallSolver._max_modules
+    subtype_ids = dict([(subtype, pos + 1) for pos, subtype in enumerate(MODULE_SUBTYPES)])
+    columns = dict([(item, []) for item in ["age", "children", "resilience", "living", "unique",
+                                            "total_modules", "module_count", "int_flags"] +
+                    NUMBER_PROPERTIES])
+    padding = [0] * width
+    subtypes = []
+    coeffs = []
+    spreads = []
+    module_flags = []
+    names = []
+    calculators = []
+    for solver in solvers:
+        names.append(solver._name)
+        calculators.append(solver._fitness_calculator.type_)
+        columns["age"].append(solver._age)
+        columns["children"].append(solver._children)
+        columns["resilience"].append(solver._resilience)
+        columns["living"].append(solver._living)
+        columns["unique"].append(solver._unique)
+        columns["total_modules"].append(solver._total_modules)
+        flags = 0
+        for bit, item in enumerate(NUMBER_PROPERTIES):
+            value = getattr(solver, item)
+            columns[item].append(float("nan") if value is None else value)
+            if isinstance(value, int):
+                flags |= 1 << bit
+        columns["int_flags"].append(flags)
+        modules = solver._modules
+        columns["module_count"].append(len(modules))
+        missing = padding[len(modules):]
+        subtypes.extend([subtype_ids[module.subtype] for module in modules] + missing)
+        coeffs.extend([module._coeff for module in modules] + missing)
+        spreads.extend([module._spread for module in modules] + missing)
+        module_flags.extend([(COEFF_INT if isinstance(module._coeff, int) else 0) |
+                             (SPREAD_INT if isinstance(module._spread, int) else 0)
+                             for module in modules] + missing)
+    shape = (len(names), width)
+    arrays = {"age": numpy.array(columns["age"], dtype=numpy.int32),
+              "children": numpy.array(columns["children"], dtype=numpy.int32),
+              "resilience": numpy.array(columns["resilience"], dtype=numpy.int32),
+              "living": numpy.array(columns["living"], dtype=bool),
+              "unique": numpy.array(columns["unique"], dtype=bool),
+              "total_modules": numpy.array(columns["total_modules"], dtype=numpy.int8),
+              "module_count": numpy.array(columns["module_count"], dtype=numpy.int8),
+              "int_flags": numpy.array(columns["int_flags"], dtype=numpy.uint8),
+              "subtypes": numpy.array(subtypes, dtype=numpy.int8).reshape(shape),
+              "coeffs": numpy.array(coeffs, dtype=numpy.float64).reshape(shape),
+              "module_spreads": numpy.array(spreads, dtype=numpy.float64).reshape(shape),
+              "module_flags": numpy.array(module_flags, dtype=numpy.uint8).reshape(shape)}
+    for item in NUMBER_PROPERTIES:
+        arrays[item] = numpy.array(columns[item], dtype=numpy.float64)
+    return arrays, names, calculators
+
+
+def unpackSolvers(arrays, names, calculators):
+    """Rebuild list of SmallSolvers from packSolvers arrays, names and calculator types."""
+    solvers = []
+    columns = dict([(item, arrays[item].tolist()) for item in arrays
+                    if arrays[item].ndim == 1])
+    subtypes = arrays["subtypes"].tolist()
+    coeffs = arrays["coeffs"].tolist()
+    spreads = arrays["module_spreads"].tolist()
+    module_flags = arrays["module_flags"].tolist()
+    shared_calculators = {"Linear": LinearFitness(), "Dynamic": DynamicFitness()}
+    # Modules are copied from one prototype per subtype instead of parsing subtype strings
+    prototypes = [None] + [geneModule(subtype, 0) for subtype in MODULE_SUBTYPES]
+    for row in range(0, len(names)):
+        solver = SmallSolver.__new__(SmallSolver)
+        solver._name = names[row]
+        # Linear and Dynamic calculators hold no state and are shared
+        if calculators[row] in shared_calculators:
+            solver._fitness_calculator = shared_calculators[calculators[row]]
+        else:
+            solver._fitness_calculator = createFitnessCalculator(calculators[row])
+        solver._age = columns["age"][row]
+        solver._children = columns["children"][row]
+        solver._resilience = columns["resilience"][row]
+        solver._living = columns["living"][row]
+        solver._unique = columns["unique"][row]
+        solver._total_modules = columns["total_modules"][row]
+        flags = columns["int_flags"][row]
+        for bit, item in enumerate(NUMBER_PROPERTIES):
+            value = columns[item][row]
+            if value != value:
+                value = None
+            elif flags & (1 << bit):
+                value = int(value)
+            setattr(solver, item, value)
+        modules = []
+        for pos in range(0, columns["module_count"][row]):
+            coeff = coeffs[row][pos]
+            spread = spreads[row][pos]
+            if module_flags[row][pos] & COEFF_INT:
+                coeff = int(coeff)
+            if module_flags[row][pos] & SPREAD_INT:
+                spread = int(spread)
+            module = prototypes[subtypes[row][pos]].copy()
+            module._coeff = coeff
+            module._spread = spread
+            modules.append(module)
+        solver._modules = modules
+        solver._responses = None
+        solver._dirty = None
+        solvers.append(solver)
+    return solvers
+
+
+def saveSnapshot(world, filename):
+    """Save whole world (population, forces, settings, day and random state) to binary snapshot file.
+
+    Returns True if snapshot was saved."""
+    if numpy is None:
+        print("Error: numpy is required to save snapshots.")
+        return False
+    kind = world.__class__.__name__
+    if kind not in WORLD_CLASSES:
+        print("Error: unable to snapshot world of type %s." % kind)
+        return False
+    state = dict(world.__dict__)
+    if kind == "ArrayTerrarium":
+        arrays = dict([(name, world.column(name)) for name in state.pop("_arrays")])
+    else:
+        arrays, state["_solver_names"], state["_solver_calculators"] = packSolvers(
+            state["_solvers"])
+        state["_solvers"] = []
+    state["_random_state"] = random.getstate()
+    state_bytes = pickle.dumps(state, 2)
+
+    # Lay out header, state and aligned arrays. Array offsets depend on the
+    # header length, so space is reserved for the header and grown until it fits.
+    for name in arrays:
+        arrays[name] = numpy.ascontiguousarray(arrays[name])
+    reserve = 1024
+    while True:
+        layout = []
+        offset = len(MAGIC) + 8 + reserve + len(state_bytes)
+        for name in sorted(arrays):
+            offset += (-offset) % ALIGNMENT
+            layout.append({"name": name, "dtype": arrays[name].dtype.str,
+                           "shape": list(arrays[name].shape), "offset": offset})
+            offset += arrays[name].nbytes
+        header = {"version": VERSION, "kind": kind,
+                  "state_length": len(state_bytes), "arrays": layout}
+        header_bytes = json.dumps(header).encode("utf-8")
+        if len(header_bytes) <= reserve:
+            break
+        reserve = len(header_bytes) + 256
+    header_bytes += b" " * (reserve - len(header_bytes))
+
+    outfile = open(filename, "wb")
+    try:
+        outfile.write(MAGIC)
+        outfile.write(struct.pack("<Q", reserve))
+        outfile.write(header_bytes)
+        outfile.write(state_bytes)
+        for item in layout:
+            outfile.write(b"\0" * (item["offset"] - outfile.tell()))
+            arrays[item["name"]].tofile(outfile)
+    finally:
+        outfile.close()
+    return True
+
+
+def readSnapshotHeader(infile):
+    """Returns JSON header of open snapshot file, leaving file at start of pickled state."""
+    if infile.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Error: %s is not an evonum snapshot." % infile.name)
+    length = struct.unpack("<Q", infile.read(8))[0]
+    header = json.loads(infile.read(length).decode("utf-8"))
+    if header["version"] != VERSION:
+        raise ValueError("Error: unsupported snapshot version %s." % header["version"])
+    return header
+
+
+def loadSnapshot(filename, restore_random=True):
+    """Returns world loaded from binary snapshot file.
+
+    Arrays are memory-mapped copy-on-write, so loading does not read the
+    population until it is used and changes are never written back to the file.
+    Object worlds rebuild their solvers from the mapped arrays.
+    If restore_random is True, the random module state is restored so a
+    resumed run continues exactly as the saved run would have.
+    Returns None if numpy is not available."""
+    if numpy is None:
+        print("Error: numpy is required to load snapshots.")
+        return None
+    infile = open(filename, "rb")
+    try:
+        header = readSnapshotHeader(infile)
+        state = pickle.loads(infile.read(header["state_length"]))
+    finally:
+        infile.close()
+    arrays = {}
+    for item in header["arrays"]:
+        shape = tuple(item["shape"])
+        if 0 in shape:
+            arrays[item["name"]] = numpy.zeros(shape, dtype=item["dtype"])
+        else:
+            arrays[item["name"]] = numpy.memmap(filename, dtype=item["dtype"], mode="c",
+                                                offset=item["offset"], shape=shape)
+    random_state = state.pop("_random_state")
+    if restore_random:
+        random.setstate(random_state)
+    world_class = WORLD_CLASSES[header["kind"]]
+    world = world_class.__new__(world_class)
+    if header["kind"] == "ArrayTerrarium":
+        state["_arrays"] = arrays
+    else:
+        state["_solvers"] = unpackSolvers(arrays, state.pop("_solver_names"),
+                                          state.pop("_solver_calculators"))
+    world.__dict__.update(state)
+    return world
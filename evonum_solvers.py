@@ -3,7 +3,6 @@ import inspect
 import random
 import math
 import types
-from copy import deepcopy
 from evonum_mutations import *
 from evonum_modules import *
 
@@ -33,8 +32,8 @@ def createSolver(solver_type="Small", name=None, conditions=None):
     return new_solver
 
 
-def importSolver(solver_dict):
-    """Import serialized solver"""
+def importSolver(solver_dict, rng=random):
+    """Import serialized solver, drawing any random numbers module creation needs from rng"""
     if "_type_" not in solver_dict:
         print("Error: solver type must be provided for import, no solver imported.")
         return None
@@ -45,23 +44,59 @@ def importSolver(solver_dict):
         solver_dict["name"] = "NoName"
     new_solver = createSolver(solver_dict["_type_"], solver_dict["name"])
     if new_solver:
-        new_solver.importAttributes(solver_dict)
+        new_solver.importAttributes(solver_dict, rng)
     return new_solver
 
 
+def createFitnessCalculator(calculator_type):
+    """Returns new fitness calculator from its type string (ex: Linear, Teired_5_Add_5_Add).
+
+    Returns None if type is unrecognized."""
+    calculator_type = str(calculator_type)
+    if calculator_type == "Linear":
+        return LinearFitness()
+    elif calculator_type == "Dynamic":
+        return DynamicFitness()
+    elif calculator_type.startswith("Teired"):
+        calculator_type = calculator_type.split("_")
+        if len(calculator_type) == 1:
+            return TeiredFitness()
+        else:
+            return TeiredFitness("_".join(calculator_type[1:]))
+    else:
+        return None
+
+
 class FitnessCalculator(object):
     # Overall fitness is the sum of fitness scores for each type of fitness
-    
-    def mutate(self):
+    __slots__ = ()
+
+    def copy(self):
+        """Return an independent copy of the fitness calculator.
+
+        Standard fitness calculators hold no mutable state so a shallow copy is enough."""
+        clone = self.__class__.__new__(self.__class__)
+        for item in slotNames(self.__class__):
+            setattr(clone, item, getattr(self, item))
+        return clone
+
+    def __getstate__(self):
+        return slotState(self)
+
+    def __setstate__(self, state):
+        setSlotState(self, state)
+
+    def mutate(self, rng=random):
         """Specialized fitness calculators have parameters than can mutate.
         
         Standard fitness calculators do not mutate and mutate calls pass."""
         pass
         
-    def calculateFitness(self, fitness_forces, modules):
+    def calculateFitness(self, fitness_forces, modules, rng=random):
         """Calculate overall solver fitness.
 
         Takes list of fitness force objects and list of module objects.
+        Calculators that draw random numbers (Dynamic) draw them from rng.
         Returns fitness value.
         Fitness is a sum of individual fitness force scores.
         If solver failed to respond to a fitness force due to math domain error,
@@ -69,35 +104,56 @@ class FitnessCalculator(object):
         """
         fitness = 0
         for item in fitness_forces:
-            response = self.calculateUnitFitness(item, modules)
+            if item.batch_size > 1:
+                response = self.calculateBatchFitness(item, modules, rng)
+            else:
+                response = self.calculateUnitFitness(item, modules, rng=rng)
             if response is None:
                 return None
             else:
                 fitness += response
         return fitness
 
+    def calculateBatchFitness(self, force, modules, rng=random):
+        """Calculate mean fitness across all of a force's conditions for the day.
+
+        Returns None if any condition failed due to math domain error."""
+        total = 0
+        batch = force.batch
+        for conditions in batch:
+            response = self.calculateUnitFitness(force, modules, conditions, rng)
+            if response is None:
+                return None
+            total += response
+        return total / float(len(batch))
+
     # Different depending on what kind of fitness calculator the solver uses
-    def calculateUnitFitness(self, force, modules):
+    # Conditions default to the force's current conditions.
+    def calculateUnitFitness(self, force, modules, conditions=None, rng=random):
         error()
 
 
 class LinearFitness(FitnessCalculator):
     """Sums all module responses before calculating fitness."""
+    __slots__ = ()
+
     @property
     def type_(self):
         return "Linear"
 
-    def calculateUnitFitness(self, force, modules):
+    def calculateUnitFitness(self, force, modules, conditions=None, rng=random):
         if force.type_ == "Simple" or force.type_ == "Dynamic":
             running_total = 0
             responded = False
-            variable, expected = force.conditions
+            variable, expected = force.conditions if conditions is None else conditions
+            # Each response is coeff * the subtype's cached response (same as getResponse)
+            responses = basisRow(variable)
             for item in modules:
-                response = item.getResponse(variable)
-                if response is None:
+                basis = responses[item.subtype]
+                if basis is None:
                     return None
                 else:
-                    running_total += response
+                    running_total += item.coeff * basis
                 responded = True
         else:  # If it is an unrecognizable fitness force
             return force.penalty
@@ -107,24 +163,48 @@ class LinearFitness(FitnessCalculator):
         else:  # If it has no modules capable of dealing with the recognized force
             return force.penalty
 
+    def calculateBatchFitness(self, force, modules, rng=random):
+        """Sum responses for every condition in the batch in one pass over modules."""
+        if force.type_ != "Simple" and force.type_ != "Dynamic" or len(modules) == 0:
+            return force.penalty
+        if force.basis is not None:
+            return force.basis.moduleFitness(modules)
+        batch = force.batch
+        running_totals = [0] * len(batch)
+        rows = [basisRow(conditions[0]) for conditions in batch]
+        for item in modules:
+            subtype = item.subtype
+            coeff = item.coeff
+            for pos, responses in enumerate(rows):
+                basis = responses[subtype]
+                if basis is None:
+                    return None
+                running_totals[pos] += coeff * basis
+        total = 0
+        for pos, conditions in enumerate(batch):
+            total += -abs(conditions[1] - running_totals[pos])
+        return total / float(len(batch))
+
 
 class DynamicFitness(FitnessCalculator):
     """Randomly select modules to calculate fitness and sum responses."""
+    __slots__ = ()
+
     @property
     def type_(self):
         return "Dynamic"
 
-    def calculateUnitFitness(self, force, modules):
+    def calculateUnitFitness(self, force, modules, conditions=None, rng=random):
         if force.type_ == "Simple" or force.type_ == "Dynamic":
             running_total = 0
             responded = False
-            variable, expected = force.conditions
+            variable, expected = force.conditions if conditions is None else conditions
             # Randomly determine the number of modules used between 1/2 total
             # modules to 1.5 * total modules (at least 1 module)
-            num_modules_used = random.randint(
+            num_modules_used = rng.randint(
                 max(1, int(len(modules) / 2)), int(1.5 * len(modules) + .5))
             for x in range(0, num_modules_used):
-                response = random.choice(modules).getResponse(variable)
+                response = rng.choice(modules).getResponse(variable)
                 if response is None:
                     return None
                 else:
@@ -149,6 +229,11 @@ class TeiredFitness(FitnessCalculator):
     Last stack operation is always ignored.
     Teir range is enforced at 1 - 10.
     """
+    __slots__ = ("_module_stack", "_plasticity", "_plan")
+    _operations = ("Add", "Subtract", "Multiply", "Divide")
+    _max_stack_length = 100
+    _mutate_operation_chance = 50
+    _mutate_teir_chance = 50
 
     def __init__(self, settings=None):
         self._module_stack = [[5, "Add"]]*5
@@ -159,11 +244,9 @@ class TeiredFitness(FitnessCalculator):
                 print("Error: bad settings for Stack Fitness calculator. Returning unchanged.")
                 stack_settings = self._module_stack
             self._module_stack = stack_settings
-        self._operations = ["Add", "Subtract", "Multiply", "Divide"]
         self._plasticity = 1
-        self._max_stack_length = 100
-        self._mutate_operation_chance = 50
-        self._mutate_teir_chance = 50
+        # Compiled module stack, see compileStack
+        self._plan = None
           
     @property
     def type_(self):     
@@ -204,6 +287,7 @@ class TeiredFitness(FitnessCalculator):
             print("Error: bad type sent to module_stack, returning unchanged.")
             return
         self._module_stack = holder
+        self._plan = None
     
     def check_stack_value(self, stack):
         """Checks individual stack values during assignment for recognizable values.
@@ -241,68 +325,119 @@ class TeiredFitness(FitnessCalculator):
             stack_list.append([int(raw_list[x]), raw_list[x+1]])
         return stack_list
 
-    def calculateUnitFitness(self, force, modules): #TODO: Write
+    def compileStack(self, total_modules):
+        """Returns module stack compiled into a reusable evaluation plan.
+
+        The plan is cached and only rebuilt after module_stack changes.
+        Each plan step reduces the values at the listed slots with the listed
+        operations, in normal arithmetic precedence, into a new slot, exactly as
+        each teir is collapsed when the stack is written out as an equation.
+        Slots 0 to total_modules-1 hold module responses.
+        Returns list of (input slots, operations, output slot) and final slot.
+        """
+        if self._plan is not None and self._plan[0] == total_modules:
+            return self._plan[1], self._plan[2]
+        self.adjust_module_stack(total_modules)
+        current_teir = []
+        for pos in range(0, total_modules):
+            operation = self._module_stack[pos][1]
+            if operation == "Add" or operation == "+":
+                operation = "+"
+            elif operation == "Subtract" or operation == "-":
+                operation = "-"
+            elif operation == "Multiply" or operation == "*":
+                operation = "*"
+            else:
+                operation = "/"
+            current_teir.append([self._module_stack[pos][0], operation, pos])
+        steps = []
+        final_slot = None
+        next_slot = total_modules
+        for teir in range(10, 0, -1):
+            next_teir = list()
+            slots = list()
+            operations = list()
+            insert_pos = None
+            for pos, response in enumerate(current_teir):
+                if response[0] < teir:
+                    next_teir.append(response)
+                else:
+                    if insert_pos is None:
+                        insert_pos = pos
+                    slots.append(response[2])
+                    operations.append(response[1])
+            if len(slots) == 0:
+                continue
+            steps.append((tuple(slots), tuple(operations[:-1]), next_slot))
+            next_teir.insert(insert_pos, [teir - 1, operations[-1], next_slot])
+            final_slot = next_slot
+            next_slot += 1
+            current_teir = next_teir
+        self._plan = (total_modules, steps, final_slot)
+        return steps, final_slot
+
+    @staticmethod
+    def reduceTeir(operands, operations):
+        """Combine operands with operations using normal arithmetic precedence."""
+        total = None
+        sign = None
+        term = operands[0]
+        for operation, value in zip(operations, operands[1:]):
+            if operation == "*":
+                term = term * value
+            elif operation == "/":
+                term = term / value
+            else:
+                if total is not None:
+                    term = total + term if sign == "+" else total - term
+                total = term
+                sign = operation
+                term = value
+        if total is None:
+            return term
+        return total + term if sign == "+" else total - term
+
+    def calculateUnitFitness(self, force, modules, conditions=None, rng=random):
         if force.type_ == "Simple" or force.type_ == "Dynamic":
-            module_list = []
+            steps, final_slot = self.compileStack(len(modules))
+            values = []
+            variable, expected = force.conditions if conditions is None else conditions
             for item in modules:
-                if item.type_ == "Fitness":
-                    module_list.append(item)
-            self.adjust_module_stack(len(module_list))
-            response_stack = []
-            responded = False
-            variable, expected = force.conditions
-            for pos, item in enumerate(modules):
                 response = item.getResponse(variable)
                 if response is None:
                     return None
                 else:
-                    response_stack.append([self._module_stack[pos][0], self._module_stack[pos][1], response])
-                responded = True
+                    values.append(response)
         else:  # If it is an unrecognizable fitness force
             return force.penalty
-        if responded:
-            current_teir = response_stack[:]
-            for teir in range(10, 0, -1):
-                next_teir = list()
-                current_solution = list()
-                insert_pos = None
-                for pos, response in enumerate(current_teir):
-                    if response[0] < teir:
-                        next_teir.append(response)
-                    else:
-                        if insert_pos is None:
-                            insert_pos = pos
-                        current_solution.append(str(response[2]))
-                        if response[1] == "Add" or response[1] == "+":
-                            current_solution.append("+")
-                        elif response[1] == "Subtract" or response[1] == "-":
-                            current_solution.append("-")
-                        elif response[1] == "Multiply" or response[1] == "*":
-                            current_solution.append("*")
-                        else:
-                            current_solution.append("/")
-                current_equation = "".join(current_solution[:-1])
-                if current_equation == "":
-                    continue
-                else:
-                    try:                
-                        solution = eval(current_equation)
-                    except (ValueError, ZeroDivisionError):
-                        return None
-                    next_teir.insert(insert_pos,[teir-1, current_solution[-1], solution])
-                current_teir = next_teir
-            final_solution = solution
-            return -abs(expected - final_solution)
+        if len(values) > 0 and final_slot is not None:
+            for slots, operations, output in steps:
+                # Teir values are rounded to str() precision as they were
+                # when each teir was evaluated as an equation string.
+                operands = [float(str(values[x])) for x in slots]
+                try:
+                    values.append(self.reduceTeir(operands, operations))
+                except (ValueError, ZeroDivisionError):
+                    return None
+            return -abs(expected - values[final_slot])
         else:  # If it has no modules capable of dealing with the recognized force
-            return force.penalty        
+            return force.penalty
+
+    def copy(self):
+        """Return an independent copy of the teired fitness calculator.
 
-    def mutate(self):
+        Module stack wrappers are copied, the operations list and compiled plan are shared."""
+        clone = FitnessCalculator.copy(self)
+        clone._module_stack = [x[:] for x in self._module_stack]
+        return clone
+
+    def mutate(self, rng=random):
         """Mutating teired fitness changes 1 or more module teir and/or operation.
         
         Number of modules that can be mutated in one pass is defined by plasticity attribute.
         """
         stack_order = [x for x in range(0, len(self._module_stack))]
-        random.shuffle(stack_order)
+        rng.shuffle(stack_order)
         mutated_stacks = [x[:] for x in self.module_stack]
         mutations = 0
         # Randomly attempt to mutate teir and/or operation for each stack (in random order)
@@ -311,14 +446,14 @@ class TeiredFitness(FitnessCalculator):
         for position in stack_order:
             if mutations == self._plasticity:
                 break
-            mutation_chances = [Mutations.HardMutation(1,100)]*2
+            mutation_chances = [Mutations.HardMutation(1,100,rng)]*2
             mutated = False
             if mutation_chances[0] < self._mutate_teir_chance:
                 mutated = True                
-                mutated_stacks[position][0] = Mutations.GaussianMutation(mutated_stacks[position][0], 1)
+                mutated_stacks[position][0] = Mutations.GaussianMutation(mutated_stacks[position][0], 1, rng=rng)
             if mutation_chances[1] < self._mutate_operation_chance:
                 mutated = True
-                mutated_stacks[position][1] = random.choice(self._operations)
+                mutated_stacks[position][1] = rng.choice(self._operations)
             if mutated:
                 mutations += 1
         self.module_stack = mutated_stacks
@@ -333,17 +468,25 @@ class TeiredFitness(FitnessCalculator):
         else:
             for x in range(0, (len(self.module_stack) - target)):
                 self._module_stack.pop()
+        self._plan = None
            
             
 class SolverInterface(object):
+    __slots__ = ()
 
-    def mutate(self):
+    def mutate(self, rng=random):
         error()
 
+    def __getstate__(self):
+        return slotState(self)
+
+    def __setstate__(self, state):
+        setSlotState(self, state)
+
     def clone(self):
         error()
 
-    def reproduce(self):
+    def reproduce(self, rng=random):
         error()
 
     def getDescription(self):
@@ -352,10 +495,10 @@ class SolverInterface(object):
     def softReset(self, new_name):
         error()
 
-    def beginDay(self):
+    def beginDay(self, rng=random):
         error()
 
-    def calculateFitness(self, fitness_forces):
+    def calculateFitness(self, fitness_forces, rng=random):
         error()
 
     def death(self):
@@ -364,7 +507,7 @@ class SolverInterface(object):
     def exportDict(self):
         error()
 
-    def importAttributes(self, attribute_dictionary):
+    def importAttributes(self, attribute_dictionary, rng=random):
         error()
 
     # Property management
@@ -426,28 +569,43 @@ class SolverInterface(object):
 class SmallSolver(SolverInterface):
     """Small solvers calculate fitness based on collection of modules
 
-    Reproduction invokes deepcopy clone and 1 round of mutations.
-    Modules may be combined as linear or dynamic."""
+    Reproduction invokes clone and 1 round of mutations.
+    Modules may be combined as linear or dynamic.
+
+    The Incremental evaluator caches module responses per condition in
+    _responses ({variable: array of responses followed by their total}), shared with
+    children until they change. Module positions changed since the responses
+    were cached are listed in _dirty (None when nothing changed), and adding
+    or removing modules drops the cache (see markDirty)."""
+    __slots__ = ("_name", "_fitness", "_living", "_age", "_children", "_modules",
+                 "_resilience", "_unique", "_fitness_calculator", "_spread",
+                 "_total_modules", "_module_mutation_chance", "_property_mutation_chance",
+                 "_swap_module_chance", "_merge_module_chance", "_responses", "_dirty")
+    # Static properties shared by every small solver
+    _type_ = "Small"
+    _lifespan = 100
+    _max_modules = 15
+    # Index correlations: 0 = spread, 1 = total_modules,
+    # 2 = module_mutation_chance, 3 = property_mutation_chance; These are
+    # hard-coded for individual and cannot mutate.
+    _property_chances = (1, 1, 60, 30)
+    _permitted = ("_age", "_children", "unique", "fitness_calculator", "spread", "total_modules",
+                  "module_mutation_chance", "property_mutation_chance", "swap_module_chance",
+                  "merge_module_chance", "resilience")
 
     def __init__(self, name=None, conditions=None):
         # Static properties
         if name is None:
             name = "Unnamed Solver"
         self._name = name
-        self._type_ = "Small"
         self._fitness = 0
-        self._lifespan = 100
         self._living = True
-        self._max_modules = 15
         self._age = 0
         self._children = 0
         self._modules = []
         self._resilience = 2
-
-        # Index correlations: 0 = spread, 1 = total_modules,
-        # 2 = module_mutation_chance, 3 = property_mutation_chance; These are
-        # hard-coded for individual and cannot mutate.
-        self._property_chances = [1, 1, 60, 30]
+        self._responses = None
+        self._dirty = None
 
         # Each solver has a 50% chance of being a unique-module solver
 #        self._unique = True if random.randint(1, 2) == 1 else False
@@ -464,8 +622,6 @@ class SmallSolver(SolverInterface):
         self._property_mutation_chance = 10
         self._swap_module_chance = 15
         self._merge_module_chance = 50
-        self._permitted = ["_age", "_children", "unique", "fitness_calculator", "spread", "total_modules",
-                           "module_mutation_chance", "property_mutation_chance", "swap_module_chance", "merge_module_chance", "resilience"]
         if conditions:
             self.importAttributes(conditions)
     # Property management
@@ -595,6 +751,11 @@ class SmallSolver(SolverInterface):
         """False = flagged for removal at start of next day"""
         return self._living
 
+    @property
+    def modules(self):
+        """List of modules used to calculate response"""
+        return self._modules
+
     @property
     def fitness_calculator(self):
         """Method that modules are combined to calculate fitness"""
@@ -602,30 +763,47 @@ class SmallSolver(SolverInterface):
 
     @fitness_calculator.setter
     def fitness_calculator(self, value):
-        value = str(value)
-        if value == "Linear":
-            self._fitness_calculator = LinearFitness()
-        elif value == "Dynamic":
-            self._fitness_calculator = DynamicFitness()
-        elif value.startswith("Teired"):
-            value = value.split("_")
-            if len(value) == 1:
-                self._fitness_calculator = TeiredFitness()
-            else:
-                value = "_".join(value[1:])
-                self._fitness_calculator = TeiredFitness(value)
-        else:
+        new_calculator = createFitnessCalculator(value)
+        if new_calculator is None:
             badAttribute("fitness_calculator", value, self._name)
             return
+        self._fitness_calculator = new_calculator
 
     # Reproductive actions
     def clone(self):
-        """Return a deepcopy of self"""
-        return deepcopy(self)
+        """Return an independent copy of self.
+
+        Equivalent to deepcopy(self): modules and fitness calculator are copied
+        with their own copy methods."""
+        clone = self.__class__.__new__(self.__class__)
+        for item in slotNames(self.__class__):
+            setattr(clone, item, getattr(self, item))
+        clone._modules = [item.copy() for item in self._modules]
+        clone._fitness_calculator = self._fitness_calculator.copy()
+        # Cached responses are shared, the list of changed modules is not
+        if self._dirty is not None:
+            clone._dirty = list(self._dirty)
+        return clone
+
+    # Cached responses are not saved, they are calculated again after loading.
+    def __getstate__(self):
+        state = slotState(self)
+        state["_responses"] = None
+        state["_dirty"] = None
+        return state
 
     # Make a clone, reset name, age, and children, and mutate.
-    def reproduce(self):
-        """Return a deepcopy of self with fresh name, age, # children and a single mutation. self._children is incremented by 1"""
+    def reproduce(self, rng=random):
+        """Return a clone of self with fresh name, age, # children and a single mutation drawn from rng. self._children is incremented by 1"""
+        clone = self.spawn()
+        if clone is not None:
+            clone.mutate(rng)
+        return clone
+
+    def spawn(self):
+        """Return an unmutated clone of self with fresh name, age and # children, None if self has no fitness.
+
+        self._children is incremented by 1. Used by reproduce and cohort mutation engines."""
         if self._fitness is not None:
             clone = self.clone()
             self._children += 1
@@ -635,7 +813,6 @@ class SmallSolver(SolverInterface):
             except IndexError:
                 child_name = self._name + "." + str(self._children)
             clone.softReset(child_name)
-            clone.mutate()
             clone._age = 1
             return clone
         else:
@@ -650,70 +827,116 @@ class SmallSolver(SolverInterface):
         # TODO: More testing with unique vs non-unique
         #self._unique = True if random.randint(1, 2) == 1 else False
 
-    def mutate(self):
-        """Randomly mutate solver property and/or module."""
+    def mutate(self, rng=random):
+        """Randomly mutate solver property and/or module, drawing from rng."""
         # chances[0] = chance to mutate property
-        chances = [random.randint(1, 100), random.randint(1, 100)]
+        chances = [rng.randint(1, 100), rng.randint(1, 100)]
         for x in range(0, len(self._modules)):
             # chances[2-N] = chance to mutate each module for N modules
-            chances.append(random.randint(1, 100))
+            chances.append(rng.randint(1, 100))
 
         # chances[N+1] = chance to merge two properties of same type
-        chances.append(random.randint(1, 100))
+        chances.append(rng.randint(1, 100))
 
         # Mutate Solver properties with set chance
         if chances[0] <= self.property_mutation_chance:
-            self.mutateProperty()
+            self.mutateProperty(rng=rng)
 
         # Mutate each module with a set chance to mutate
         for x in range(0, len(self._modules)):
             if chances[x + 1] <= self.module_mutation_chance:
-                if random.randint(1, 100) <= self.swap_module_chance:
-                    if not self.unique:
-                        self._modules[x] = createUniqueModule(
-                            "Fitness", [self._modules[x].subtype])
-                    else:
-                        present_subtypes = [y.subtype
-                                            for y in self._modules]
-                        self._modules[x] = createUniqueModule(
-                            "Fitness", present_subtypes)
+                if rng.randint(1, 100) <= self.swap_module_chance:
+                    self.swapModule(x, rng)
                 else:
-                    self._modules[x].mutate()
+                    self._modules[x].mutate(rng=rng)
+                    self.markDirty(x)
 
         if chances[-1] <= self._merge_module_chance:
-            self.mergeModules()
+            self.mergeModules(rng)
         
         # Currently, all solvers have a 100% chance of calling their fitness_calculator mutate
         # Most fitness calculator mutates do nothing, those that did should have their own internal probabilities.
-        self._fitness_calculator.mutate()
+        self._fitness_calculator.mutate(rng)
         
-    def mutateProperty(self):
-        """Mutate a single mutatable property"""
-        selection = random.randint(1, 100)
+    def mutateFrom(self, draws, rng=random):
+        """Mutate exactly like mutate, using values drawn in advance (see evonum_mutations.CohortMutation).
+
+        draws is (property roll, property selection, property deviation, module rolls,
+        swap rolls, module deviations, merge roll) with one module value per module.
+        New modules and fitness calculator mutations draw from rng."""
+        property_roll, selection, deviation, module_rolls, swap_rolls, module_deviations, merge_roll = draws
+        if property_roll <= self.property_mutation_chance:
+            self.mutateProperty(selection, deviation)
+        for x in range(0, len(self._modules)):
+            if module_rolls[x] <= self.module_mutation_chance:
+                if swap_rolls[x] <= self.swap_module_chance:
+                    self.swapModule(x, rng)
+                else:
+                    self._modules[x].mutate(module_deviations[x])
+                    self.markDirty(x)
+        if merge_roll <= self._merge_module_chance:
+            self.mergeModules(rng)
+        self._fitness_calculator.mutate(rng)
+
+    def swapModule(self, position, rng=random):
+        """Replace module at position with a new random module (of a subtype not present if unique)."""
+        if not self.unique:
+            self._modules[position] = createUniqueModule(
+                "Fitness", [self._modules[position].subtype], rng)
+        else:
+            present_subtypes = [y.subtype
+                                for y in self._modules]
+            self._modules[position] = createUniqueModule(
+                "Fitness", present_subtypes, rng)
+        self.markDirty(position)
+
+    def markDirty(self, position=None):
+        """Mark module at position as changed since its responses were cached.
+
+        Without position (modules added or removed), cached responses are dropped."""
+        if self._responses is None:
+            return
+        if position is None:
+            self._responses = None
+            self._dirty = None
+        elif self._dirty is None:
+            self._dirty = [position]
+        else:
+            self._dirty.append(position)
+
+    def mutateProperty(self, selection=None, deviation=None, rng=random):
+        """Mutate a single mutatable property
+
+        Optional selection (1-100) and deviation (standard normal) are values
+        drawn in advance, used instead of drawing them from rng."""
+        if selection is None:
+            selection = rng.randint(1, 100)
         # Mutate spread
         if selection <= self._property_chances[0]:
             # Make sure that there is always a chance for some degree of
             # mutation
             self.spread = Mutations.GaussianMutation(
-                self.spread, 1 if self.spread == 0 else self.spread)
+                self.spread, 1 if self.spread == 0 else self.spread, deviation, rng)
             for item in self._modules:
                 item.spread = self._spread
         # Mutate total modules
         elif selection <= sum(self._property_chances[0:2]):
             self.total_modules = int(Mutations.GaussianMutation(
-                self._total_modules, 1))  # hardcode spread to 1 module
+                self._total_modules, 1, deviation, rng))  # hardcode spread to 1 module
         # Mutate module mutation chance
         elif selection <= sum(self._property_chances[0:3]):
             self.module_mutation_chance = Mutations.GaussianMutation(
-                self._module_mutation_chance, self._spread * self._module_mutation_chance / 100)
+                self._module_mutation_chance, self._spread * self._module_mutation_chance / 100,
+                deviation, rng)
         # Mutate property mutation chance
         elif selection <= sum(self._property_chances):
             self.property_mutation_chance = Mutations.GaussianMutation(
-                self._property_mutation_chance, self._spread * self._property_mutation_chance / 100)
+                self._property_mutation_chance, self._spread * self._property_mutation_chance / 100,
+                deviation, rng)
 
     # Survival functions
-    def beginDay(self):
-        """Return false if no longer living for removal. Increment age. Add or remove modules as needed."""
+    def beginDay(self, rng=random):
+        """Return false if no longer living for removal. Increment age. Add or remove modules (drawn from rng) as needed."""
         if self._age >= self._lifespan:
             self.death()
 
@@ -725,11 +948,12 @@ class SmallSolver(SolverInterface):
             # total_modules has been mutated or when no-parent solver is born)
             if len(self._modules) < self._total_modules:
                 for x in range(0, self._total_modules - len(self._modules)):
-                    self.addModule()
+                    self.addModule(rng)
             elif len(self._modules) > self._total_modules:
                 for x in range(0, len(self._modules) - self._total_modules):
                     # Last module added is most susceptible to loss.
                     self._modules.pop()
+                self.markDirty()
 
             for item in self._modules:
                 item.spread = self._spread
@@ -738,21 +962,30 @@ class SmallSolver(SolverInterface):
         else:
             return False
 
-    def addModule(self):
-        """Add random module to solver"""
+    def addModule(self, rng=random):
+        """Add random module drawn from rng to solver"""
         if not self.unique:
-            self._modules.append(createModule("Fitness", "Random"))
+            self._modules.append(createModule("Fitness", "Random", rng))
         else:
             present_subtypes = [x.subtype for x in self._modules]
             self._modules.append(createUniqueModule(
-                "Fitness", present_subtypes))
+                "Fitness", present_subtypes, rng))
+        self.markDirty()
 
-    def calculateFitness(self, fitness_forces):
+    def calculateFitness(self, fitness_forces, rng=random):
         """store sum fitness score of each fitness_force in provided list.
 
+        Calculators that draw random numbers draw them from rng.
         Math domain errors return None and dock a resilient."""
-        self._fitness = self._fitness_calculator.calculateFitness(
-            fitness_forces, self._modules)
+        self.assignFitness(self._fitness_calculator.calculateFitness(
+            fitness_forces, self._modules, rng))
+
+    def assignFitness(self, fitness):
+        """Store a fitness score calculated for this solver.
+
+        Used by calculateFitness and by population-wide evaluators.
+        A fitness of None is a math domain failure and docks a resilience."""
+        self._fitness = fitness
         if self._fitness is None:
             #            print("Solver %s failed the math domain and lost resilience." % self.name)
             if self._resilience == 0:
@@ -765,16 +998,18 @@ class SmallSolver(SolverInterface):
         """Flags solver for death at start of next day"""
         self._living = False
 
-    def mergeModules(self):
+    def mergeModules(self, rng=random):
         """Merge the first two modules found that have the same subtype and add a unique module in the second one's place."""
         module_subtypes = {}
         for i, item in enumerate(self._modules):
             if item.subtype in module_subtypes:
                 new_modules = mergeFitnessModules(self._modules[i], self._modules[
-                                                  module_subtypes[item.subtype]])
+                                                  module_subtypes[item.subtype]], rng)
                 self._modules[module_subtypes[item.subtype]] = new_modules[
                     0]
                 self._modules[i] = new_modules[1]
+                self.markDirty(module_subtypes[item.subtype])
+                self.markDirty(i)
                 break
             else:
                 module_subtypes[item.subtype] = i
@@ -816,8 +1051,15 @@ class SmallSolver(SolverInterface):
         out_dict["name"] = self._name
         return out_dict
 
-    def importAttributes(self, attributes):
-        """Import pre-defined properties for solver."""
+    def exportGenome(self):
+        """Compact export of what is needed to calculate fitness.
+
+        Returns tuple of fitness calculator type and tuple of (subtype, coeff) for each module."""
+        return (self._fitness_calculator.type_,
+                tuple([(item.subtype, item.coeff) for item in self._modules]))
+
+    def importAttributes(self, attributes, rng=random):
+        """Import pre-defined properties for solver, drawing any random numbers module creation needs from rng."""
         try:
             for item in self._permitted:
                 # Type-check the ~private variables since they have no setter.
@@ -839,7 +1081,8 @@ class SmallSolver(SolverInterface):
             if "_modules" in attributes:
                 imported_modules = []
                 for mod in attributes["_modules"]:
-                    imported_modules.append(importModule(mod))
+                    imported_modules.append(importModule(mod, rng))
                 self._modules = imported_modules
+                self.markDirty()
         except TypeError:
             print("Error: unable to import conditions, unrecognized type sent.")
@@ -1,7 +1,13 @@
 from __future__ import print_function
+import random
 import types
 from evonum_fitness import *
 from evonum_solvers import *
+from evonum_evaluators import createEvaluator
+from evonum_selection import createSelection, topSolvers
+from evonum_mutations import createMutationEngine
+from evonum_reporting import PhaseTimer, Reporter, createReporter, writeDump
+from evonum_io import readSolvers, writeSolverArray, writeSolvers
 import json
 
 
@@ -10,6 +16,9 @@ def json_out(o):
 
 
 class Terrarium(object):
+    _random = None  # Own random stream, None draws from the random module
+    _evaluation_random = None  # Own stream of seeded worlds used while evaluating
+    _best_fitness = None  # Best fitness of the latest day
 
     def __init__(self):
         self._current_day = 0
@@ -20,9 +29,19 @@ class Terrarium(object):
         self._chance_to_survive_prune = 1
         self._solver_settings = {}
         self._max_withheld = 100
+        self._evaluator = createEvaluator("Serial")
+        self._selection = createSelection("Truncation")
+        self._mutation = createMutationEngine("Scalar")
+        self._dump_filename = "daily_dump.txt"
+        self._reporter = Reporter()
+        self._timer = PhaseTimer()
 
-    def addForce(self, force_type, force_subtype, conditions):
-        """Add new fitness force to terrarium with provided type, subtype, and conditions."""
+    def addForce(self, force_type, force_subtype, conditions, batch_size=1, scoring="Random", strata=None):
+        """Add new fitness force to terrarium with provided type, subtype, and conditions.
+
+        Optional batch_size sets the number of conditions drawn by the force each day.
+        Optional scoring (Full or Stratified with strata positions) scores
+        solvers on a fixed set of positions each day (Position forces only)."""
         if len(self._forces) >= self._max_forces:
             print ("Already at max forces. No force added.")
             return
@@ -30,6 +49,14 @@ class Terrarium(object):
             new_force = createFitnessForce(
                 force_type, force_subtype, conditions)
         if new_force:
+            new_force.batch_size = batch_size
+            if scoring != "Random":
+                if not hasattr(new_force, "setScoring"):
+                    print("Error: only Position forces support %s scoring, no force added." % scoring)
+                    return
+                if not new_force.setScoring(scoring, strata):
+                    print("Error: unable to set %s scoring, no force added." % scoring)
+                    return
             self._forces.append(new_force)
         else:
             print("Error: failed to create force, no force added.")
@@ -57,48 +84,152 @@ class Terrarium(object):
     def beginDay(self):
         """Increment day, reproduce living solvers, evaluate solver fitness, and prune solvers based on fitness rank."""
         self._current_day += 1
+        timer = self._timer
+        timer.start()
+        clearBasisCache()
 #        print("-"*20+"Beginning Day "+str(self._current_day)+"-"*20)
-        dead_solvers = []
+        rng = self.rng
         for item in self._forces:
-            item.beginDay()
-        for pos, item in enumerate(self._solvers):
-            still_living = item.beginDay()
-            if not still_living:
-                dead_solvers.append(pos)
-        surviving = [sol for pos, sol in enumerate(
-            self._solvers) if pos not in dead_solvers]  # Remove dead solvers
-        self._solvers = surviving
+            item.beginDay(rng)
+        timer.lap("force_begin")
+        # Remove dead solvers, compacting the population list in place
+        living = 0
+        for item in self._solvers:
+            if item.beginDay(rng):
+                self._solvers[living] = item
+                living += 1
+        timer.count("killed", len(self._solvers) - living)
+        del self._solvers[living:]
+        timer.lap("solver_begin")
         self.reproduceSolvers()  # Every surviving solver reproduces once at start of day
+        timer.count("born", len(self._solvers) - living)
+        timer.lap("reproduce")
         self.evaluateSolvers()  # Every solver and new progeny gets evaluated
+        timer.count("evaluated", len(self._solvers))
+        timer.lap("evaluate")
         # For printing to screen or other logging
         solver_scores, withheld_solvers = self.scoreSolvers()
+        timer.count("withheld", len(withheld_solvers))
+        timer.lap("score")
         if len(solver_scores) > 0:
-            print ("%d\t%.2f" % (self._current_day, solver_scores[0][1]))
+            self._best_fitness = topSolvers(solver_scores, 1)[0][1]
+            self._reporter.printDay("%d\t%.2f" % (self._current_day, self._best_fitness))
         else:
-            print("%d\tAll solvers dead or withheld!" % self._current_day)
+            self._best_fitness = None
+            self._reporter.printDay("%d\tAll solvers dead or withheld!" % self._current_day)
+        timer.lap("print_day")
         self.pruneWithheld(withheld_solvers)
-        self.writeDay(solver_scores, withheld_solvers)  # TODO: Will be changed
+        timer.lap("prune_withheld")
+        # Daily dump and other reports are written at the reporter's cadence
+        self._reporter.reportDay(self, solver_scores, withheld_solvers)
+        timer.lap("write_day")
         # If more solvers than max for environment, assess solvers based on
         # fitness and flag the failures for death.
         self.pruneSolvers(solver_scores)
+        timer.lap("prune")
+        timer.endDay(self._current_day)
 
     def reproduceSolvers(self):
         """Reproduce all living solvers."""
-        babies = []
-        for solver in self._solvers:
-            if solver.fitness is not None:
-                babies.append(solver.reproduce())
-        self._solvers += babies
+        parents = [solver for solver in self._solvers if solver.fitness is not None]
+        self._solvers += self._mutation.reproduce(parents, self.rng)
 
     def evaluateSolvers(self):
-        """Evaluate solver fitness."""
-        for solver in self._solvers:
-            solver.calculateFitness(self._forces)
+        """Evaluate solver fitness, drawing from the evaluation stream of seeded worlds."""
+        rng = random if self._evaluation_random is None else self._evaluation_random
+        self._evaluator.evaluate(self._solvers, self._forces, rng)
+
+    @property
+    def timings(self):
+        """Seconds spent in each phase of the days run since the last resetTimings,
+        number of solvers born, evaluated, withheld and killed, and number of days.
+
+        Phases: force_begin, solver_begin, reproduce, evaluate, score,
+        print_day (screen output), prune_withheld, write_day (reports) and prune."""
+        return self._timer.summary()
+
+    def resetTimings(self):
+        self._timer.reset()
+
+    def setTimingsFile(self, filename):
+        """Append each day's phase times and solver counts to CSV file (None to stop)."""
+        self._timer.csv = None if filename is None else str(filename)
+
+    @property
+    def counters(self):
+        """Work counted by the evaluator (ex: Incremental counts module_calls and module_calls_avoided)"""
+        return self._evaluator.counters
+
+    def setEvaluator(self, evaluator_type, processes=None):
+        """Set method used to evaluate solver fitness (Serial, Incremental, Vectorized, Pool or Remote).
+
+        Optional processes sets number of worker processes for Pool evaluator,
+        or number of localhost workers or list of host:port worker addresses for Remote."""
+        new_evaluator = createEvaluator(evaluator_type, processes)
+        if new_evaluator:
+            self._evaluator.close()
+            self._evaluator = new_evaluator
+        else:
+            print("Error: failed to create evaluator, keeping %s evaluator." %
+                  self._evaluator.type_)
+
+    def setSelection(self, selection_type, tournament_size=None):
+        """Set strategy used to choose which solvers are pruned (Truncation or Tournament).
+
+        Optional tournament_size sets number of solvers in each Tournament."""
+        new_selection = createSelection(selection_type, tournament_size)
+        if new_selection:
+            self._selection = new_selection
+        else:
+            print("Error: failed to create selection, keeping %s selection." %
+                  self._selection.type_)
+
+    def setMutation(self, engine_type):
+        """Set how children's mutations are drawn (Scalar or Cohort).
+
+        Scalar draws each child's mutations one number at a time, Cohort draws
+        every child's mutations for the day in one vectorized draw (requires numpy)."""
+        new_engine = createMutationEngine(engine_type, self.rng)
+        if new_engine:
+            self._mutation = new_engine
+        else:
+            print("Error: failed to create mutation engine, keeping %s mutation." %
+                  self._mutation.type_)
+
+    def setSeed(self, seed):
+        """Give world its own random stream seeded with seed, None to draw from the random module.
+
+        Every draw of the world (new solvers and modules, mutations, force
+        conditions and pruning) then comes from its stream, so a seeded world
+        runs the same alone, alongside other worlds or in a worker process.
+        Evaluation draws from a second stream seeded from seed, so it never
+        advances the world stream and any evaluator runs the same days."""
+        self._random = None if seed is None else random.Random(seed)
+        self._evaluation_random = None if seed is None else random.Random("evaluation %r" % (seed,))
+        # Engines seed their own generators from the stream when created
+        self.setMutation(self._mutation.type_)
+
+    @property
+    def best_fitness(self):
+        """Best fitness of living scored solvers on the latest day, None if there were none"""
+        return self._best_fitness
+
+    @property
+    def seeded(self):
+        """True if world draws from its own random stream"""
+        return self._random is not None
+
+    @property
+    def rng(self):
+        """Random stream passed to everything the world draws with, the random module if not seeded"""
+        return random if self._random is None else self._random
 
     def scoreSolvers(self):
-        """Returns non-withheld living solvers sorted by fitness as a 
-        list with each position [solver object, solver fitness (float), solver age (int)], 
-        withheld solvers unsorted."""
+        """Returns non-withheld living solvers in population order as a
+        list with each position [solver object, solver fitness (float), solver age (int)],
+        and withheld solvers.
+
+        Scores are not sorted, use topSolvers for the best solvers."""
         solver_scores = []
         withheld_solvers = []
         fit = 0
@@ -110,66 +241,67 @@ class Terrarium(object):
                     continue
             elif solver.living:
                 solver_scores.append([solver, solver.fitness, solver.age])
-        if len(solver_scores) > 0:
-            solver_scores.sort(key=lambda x: x[1], reverse=True)
         return solver_scores, withheld_solvers
 
-    def writeDay(self, solver_scores, withheld_solvers):
-        """Write daily stats and top solvers for current day into daily_dump.txt"""
-        avg = 0
-        outfile = open("daily_dump.txt", "w")
-        outfile.write("Day " + str(self._current_day))
+    def snapshotDay(self, solver_scores, withheld_solvers):
+        """Returns dictionary of the day's stats and solver descriptions used for reports.
+
+        Keys: day, solvers, avg_fitness, max_fitness, withheld, forces (descriptions),
+        top (descriptions of top 4 solvers), oldest (descriptions of 2 oldest solvers)
+        and best (exported best solver)."""
+        snapshot = {"day": self._current_day, "solvers": len(solver_scores),
+                    "avg_fitness": None, "max_fitness": None,
+                    "withheld": len(withheld_solvers),
+                    "forces": [item.getDescription() for item in self._forces],
+                    "top": [], "oldest": [], "best": None}
         if len(solver_scores) > 0:
+            avg = 0
             for item in solver_scores:
                 avg += item[1]
-            avg = avg / len(solver_scores)
-            outfile.write(" AvgFit: " + str(avg) +
-                          " MaxFit: " + str(solver_scores[0][1]))
-        else:
-            outfile.write(" All solvers dead or withheld!")
-        outfile.write("\nForces:\n")
-        for item in self._forces:
-            outfile.write(item.getDescription() + "\n")
-        outfile.write("Total solvers withheld due to math domain failure: %d\n" % len(
-            withheld_solvers))
-        if len(solver_scores) > 0:
-            outfile.write("\n" + "=" * 50 + "\n")
-            outfile.write("Top 5 solvers:\n")
-            for item in solver_scores[:4]:
-                outfile.write(item[0].getDescription())
-            outfile.write("\nOldest solvers\n")
-            solver_scores.sort(key=lambda x: x[2], reverse=True)
-            for item in solver_scores[:2]:
-                outfile.write(item[0].getDescription())
-            outfile.write("\n")
-        outfile.close()
+            top = topSolvers(solver_scores, 4)
+            snapshot["avg_fitness"] = avg / len(solver_scores)
+            snapshot["max_fitness"] = top[0][1]
+            snapshot["top"] = [item[0].getDescription() for item in top]
+            snapshot["oldest"] = [item[0].getDescription()
+                                  for item in topSolvers(solver_scores, 2, 2)]
+            snapshot["best"] = top[0][0].exportDict()
+        return snapshot
+
+    def writeDay(self, solver_scores, withheld_solvers):
+        """Write daily stats and top solvers for current day into daily dump file (daily_dump.txt by default)"""
+        writeDump(self.snapshotDay(solver_scores, withheld_solvers), self._dump_filename)
 
     def pruneSolvers(self, solver_scores):
-        """Remove solvers with lowest fitness score."""
+        """Flag solvers that lose selection (lowest fitness with Truncation) for death."""
         if len(solver_scores) < self._max_solvers:
             #			print ("No pruning necessary")
             pass
         else:
             #			print ("Population: %s\tMax Population: %s\tNeed to kill: %s" % (len(self._solvers), self._max_solvers, len(self._solvers)-self._max_solvers))
-            #            solver_scores = [[x] for x in self._solvers]
-            for item in solver_scores[self._max_solvers:]:
+            rng = self.rng
+            for item in self._selection.selectLosers(solver_scores, self._max_solvers, rng):
                 # Each solver failing the fitness check has a last chance to
                 # survive
-                luckyday = True if random.randint(
+                luckyday = True if rng.randint(
                     1, 100) <= self._chance_to_survive_prune else False
                 if not luckyday:
                     item[0].death()
+        if len(solver_scores) > 0:
+            self.adjustDynamicForces(topSolvers(solver_scores, 1)[0][1])
+
+    def adjustDynamicForces(self, best_fitness):
+        """Update dynamic fitness forces with the day's best fitness score."""
         for item in self._forces:
             # Dynamic fitness forces adjust the chance of each random variable
             # based on past performance of solvers. Give solvers a 100 days to
             # adapt first.
-            if item.type_ == "Dynamic" and self._current_day > 100 and len(solver_scores) > 0:
+            if item.type_ == "Dynamic" and self._current_day > 100:
                 avg = item.avg_fitness
-                if solver_scores[0][1] >= avg[0]:
+                if best_fitness >= avg[0]:
                     increase = False
                 else:
                     increase = True
-                avg[0] = (avg[0] * avg[1] + solver_scores[0][1]) / (avg[1] + 1)
+                avg[0] = (avg[0] * avg[1] + best_fitness) / (avg[1] + 1)
                 avg[1] += 1
                 item.avg_fitness = avg
                 condition, temp = item.conditions
@@ -204,12 +336,31 @@ class Terrarium(object):
 
     def exportSolvers(self):
         """Exports array of all living solvers as json strings"""
-        solver_jsons = []
+        return [json.dumps(item, indent=2, sort_keys=True) for item in self.iterExportDicts()]
+
+    def iterExportDicts(self):
+        """Generator of exported dictionaries of all living solvers that survived at least 1 day."""
         for item in self._solvers:
             if item.age > 0 and item.living:
-                solver_jsons.append(json.dumps(
-                    item, default=json_out, indent=2, sort_keys=True))
-        return solver_jsons
+                yield item.exportDict()
+
+    def exportTop(self, total):
+        """Returns exported dictionaries of the total fittest living scored solvers, best first."""
+        solver_scores = self.scoreSolvers()[0]
+        return [item[0].exportDict() for item in topSolvers(solver_scores, total)]
+
+    def exportSolversTo(self, filename, legacy=False):
+        """Stream all living solvers into solver file one at a time.
+
+        Writes JSON Lines (compressed if filename ends in .gz or .xz) or,
+        if legacy is True, an indented JSON array. Returns number of solvers written."""
+        if legacy:
+            return writeSolverArray(filename, self.iterExportDicts())
+        return writeSolvers(filename, self.iterExportDicts())
+
+    def importSolversFrom(self, filename):
+        """Import solvers streamed from JSON Lines or legacy JSON array solver file."""
+        self.importSolvers(readSolvers(filename))
 
     def importSolvers(self, solvers_json):
         """Imports list of solvers in json string format."""
@@ -217,7 +368,7 @@ class Terrarium(object):
             prev = len(self._solvers)
             try:
                 for item in solvers_json:
-                    self._solvers.append(importSolver(item))
+                    self._solvers.append(importSolver(item, self.rng))
                 print("%d solvers imported to world." %
                       (len(self._solvers) - prev))
             except TypeError:
@@ -232,19 +383,57 @@ class Terrarium(object):
 
         Takes days, destination where days = number of days to ramp down and destination = target population.
         """
+        for max_solvers in self.endWorldRamp(days, destination):
+            self._max_solvers = max_solvers
+            self.runDays(1)
+
+    def endWorldRamp(self, days, destination):
+        """Returns list of max population for each day of an end of world ramp down.
+
+        Takes days, destination where days = number of days to ramp down and destination = target population.
+        Returns empty list if days or destination are bad.
+        """
         try:
             days = int(days)
             destination = int(destination)
         except ValueError:
             print("Bad # of days or destination population provided. WorldEnd skipped.")
-            return
+            return []
         if destination > self._max_solvers:
             destination = self._max_solvers
         m = (self._max_solvers - destination) * days / (days - 1)
         b = self._max_solvers - m
-        for x in range(1, days + 1):
-            self._max_solvers = int(m / x + b + .5)
-            self.runDays(1)
+        return [int(m / x + b + .5) for x in range(1, days + 1)]
+
+    def setReporter(self, settings):
+        """Set how often and where days are reported from dictionary of reporter settings.
+
+        See evonum_reporting.createReporter for settings."""
+        new_reporter = createReporter(settings)
+        if new_reporter:
+            self._reporter.close()
+            self._reporter = new_reporter
+        else:
+            print("Error: failed to create reporter, keeping current reporter.")
+
+    def closeReporter(self):
+        """Report the final day if it was not reported and finish writing reports."""
+        if self._current_day > self._reporter.last_day:
+            solver_scores, withheld_solvers = self.scoreSolvers()
+            self._reporter.reportDay(self, solver_scores, withheld_solvers, force=True)
+        self._reporter.close()
+
+    def stopReportWriter(self):
+        """Finish writing queued reports and stop the reporter's writer thread until the next report."""
+        self._reporter.stopWriter()
+
+    def closeEvaluator(self):
+        """Release evaluator resources (ex: worker pool) at end of run."""
+        self._evaluator.close()
+
+    def setDumpFile(self, filename):
+        """Set file that daily stats and top solvers are written to."""
+        self._dump_filename = str(filename)
 
     def importSolverSettings(self, conditions):
         self._solver_settings.update(conditions)
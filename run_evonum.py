@@ -7,7 +7,13 @@ random.seed()
 try:
     filename = sys.argv[1]
 except:
-    sys.exit("Command line: python run_evonum.py scriptfile.txt")
+    sys.exit("Command line: python run_evonum.py scriptfile.txt [--resume]")
 script = open(filename).readlines()
-runner = SimpleScripter(script)
+if "--resume" in sys.argv[2:]:
+    # Only the Checkpoint: directive is needed, everything else comes from the checkpoint
+    runner = SimpleScripter([line for line in script if line.strip().startswith("Checkpoint")])
+    if not runner.resume():
+        sys.exit("Unable to resume from checkpoint.")
+else:
+    runner = SimpleScripter(script)
 runner.run()
@@ -0,0 +1,45 @@
+from evonum_basis import *
+from evonum_modules import createModule
+from evonum_solvers import FitnessCalculator, LinearFitness
+from evonum_fitness import createFitnessForce
+import random
+
+
+class TestBasisMatrix:
+
+    def test_matrix_matches_module_basis(self):
+        matrix = buildBasisMatrix(20)
+        assert matrix.shape == (20, len(MODULE_SUBTYPES))
+        for row in [0, 7, 19]:
+            for column, subtype in enumerate(MODULE_SUBTYPES):
+                assert matrix[row, column] == moduleBasis(subtype, float(row + 1))
+
+    def test_matrix_is_cached_and_memory_mapped(self, tmpdir):
+        matrix = loadBasisMatrix(50, str(tmpdir))
+        assert isinstance(matrix, numpy.memmap)
+        assert tmpdir.join(basisFilename(50, str(tmpdir)).split("/")[-1]).check()
+        assert (numpy.asarray(loadBasisMatrix(50, str(tmpdir))) == buildBasisMatrix(50)).all()
+
+    def test_damaged_cache_is_rebuilt(self, tmpdir):
+        open(basisFilename(30, str(tmpdir)), "w").write("damaged")
+        assert loadBasisMatrix(30, str(tmpdir)).shape == (30, len(MODULE_SUBTYPES))
+
+
+class TestBasisBatch:
+
+    def test_module_fitness_matches_module_responses(self):
+        random.seed(4)
+        force = createFitnessForce("Simple", "Position", "primes_1000.txt")
+        force.setScoring("Stratified", 25)
+        for x in range(0, 20):
+            modules = [createModule("Fitness") for y in range(0, 6)]
+            expected = FitnessCalculator.calculateBatchFitness(LinearFitness(), force, modules)
+            assert force.basis.moduleFitness(modules) == expected
+
+    def test_undefined_subtype_fails(self):
+        matrix = buildBasisMatrix(3)
+        matrix[1, SUBTYPE_INDEX["Log"]] = numpy.nan
+        batch = BasisBatch(matrix, [1, 2, 3], [1.0, 2.0, 3.0])
+        log_module = createModule("Fitness", "Log")
+        assert batch.moduleFitness([createModule("Fitness", "Ln"), log_module]) is None
+        assert batch.moduleFitness([createModule("Fitness", "Ln")]) is not None
@@ -0,0 +1,49 @@
+from evonum_benchmarks import *
+import json
+import pytest
+
+
+def results(**measurements):
+    return {"python": "2.7", "benchmarks": {"day": dict(measurements, days=1)}}
+
+
+class TestBenchmarks:
+
+    def test_day_benchmark(self):
+        measured = benchmarkDay([10, 20])
+        assert sorted(measured) == ["10", "20", "days"]
+        assert measured["10"] > 0
+
+    def test_reproduce_benchmark_is_seeded(self):
+        population = benchmarkPopulation(5)
+        assert [solver.exportDict() for solver in population] == \
+            [solver.exportDict() for solver in benchmarkPopulation(5)]
+        assert benchmarkReproduce(5, repeats=1)["solvers"] == 5
+
+    def test_save_and_load_results(self, tmpdir):
+        filename = str(tmpdir.join("results.json"))
+        saveResults(results(**{"100": 0.5}), filename)
+        assert loadResults(filename)["benchmarks"]["day"]["100"] == 0.5
+
+
+class TestCompareResults:
+
+    def test_flags_slower_measurements(self):
+        rows, regressions = compareResults(results(**{"100": 1.0, "1000": 10.0}),
+                                           results(**{"100": 1.05, "1000": 12.0}))
+        assert regressions == ["day.1000"]
+        assert [row[0] for row in rows] == ["day.100", "day.1000"]
+
+    def test_lower_speedup_is_regression(self):
+        baseline = {"benchmarks": {"clone": {"speedup": 10.0, "clone": 1.0}}}
+        current = {"benchmarks": {"clone": {"speedup": 5.0, "clone": 0.5}}}
+        assert compareResults(baseline, current)[1] == ["clone.speedup"]
+
+    def test_compare_command_exit_code(self, tmpdir):
+        baseline = str(tmpdir.join("baseline.json"))
+        current = str(tmpdir.join("current.json"))
+        saveResults(results(**{"100": 1.0}), baseline)
+        saveResults(results(**{"100": 2.0}), current)
+        assert main(["compare", baseline, current]) == 1
+        assert main(["compare", baseline, current, "1.5"]) == 0
+        assert main(["compare", baseline]) == 2
@@ -0,0 +1,75 @@
+from evonum_checkpoint import *
+from evonum_scripter import WorldSchedule
+from evonum_terrarium import Terrarium
+import os
+import random
+
+
+def checkpointSchedule():
+    random.seed(2)
+    world = Terrarium()
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    for x in range(0, 5):
+        world.addSolver()
+    return WorldSchedule(world, ["Run_10"], [0, 0])
+
+
+class TestCheckpoint:
+
+    def test_only_latest_checkpoint_is_kept(self, tmpdir):
+        prefix = str(tmpdir.join("check"))
+        schedule = checkpointSchedule()
+        checkpointer = Checkpointer(prefix, 2, {"actions": ["Run_10"]})
+        for day in range(0, 5):
+            schedule.step()
+            checkpointer.tick([schedule])
+        checkpointer.close()
+        manifest = readCheckpoint(prefix)
+        assert manifest["round"] == 4
+        assert manifest["settings"] == {"actions": ["Run_10"]}
+        assert manifest["worlds"][0]["schedule"] == {"action": 0, "day": 4, "end_ramp": None}
+        assert sorted(os.listdir(str(tmpdir))) == ["check.json", "check_round4_world1.snapshot"]
+
+    def test_load_checkpoint_restores_random_state(self, tmpdir):
+        prefix = str(tmpdir.join("check"))
+        schedule = checkpointSchedule()
+        schedule.step()
+        state = random.getstate()
+        writeCheckpoint(prefix, 1, [schedule])
+        random.seed(5)
+        manifest, worlds = loadCheckpoint(prefix)
+        assert random.getstate() == state
+        assert worlds[0]._current_day == 1
+        assert worlds[0].exportSolvers() == schedule.world.exportSolvers()
+
+    def test_background_checkpoint_with_background_reports(self, tmpdir, monkeypatch):
+        prefix = str(tmpdir.join("check"))
+        schedule = checkpointSchedule()
+        schedule.world.setReporter({"background": "True", "jsonl": str(tmpdir.join("report.jsonl"))})
+        schedule.world.setDumpFile(str(tmpdir.join("dump.txt")))
+        fork = os.fork
+        writers = []
+
+        def checkedFork():
+            writers.append(schedule.world._reporter._writer)
+            return fork()
+        monkeypatch.setattr(os, "fork", checkedFork)
+        checkpointer = Checkpointer(prefix, 2)
+        for day in range(0, 6):
+            schedule.step()
+            checkpointer.tick([schedule])
+        checkpointer.close()
+        schedule.world.closeReporter()
+        assert writers == [None, None, None]  # No writer thread is alive when forking
+        assert readCheckpoint(prefix)["round"] == 6
+        assert len(tmpdir.join("report.jsonl").read().splitlines()) == 6
+
+    def test_foreground_checkpoint(self, tmpdir):
+        prefix = str(tmpdir.join("check"))
+        checkpointer = Checkpointer(prefix, 1, background=False)
+        checkpointer.tick([checkpointSchedule()])
+        assert readCheckpoint(prefix)["round"] == 1
+
+    def test_missing_checkpoint(self, tmpdir):
+        assert readCheckpoint(str(tmpdir.join("missing"))) is None
+        assert loadCheckpoint(str(tmpdir.join("missing"))) is None
@@ -0,0 +1,229 @@
+from evonum_evaluators import *
+from evonum_terrarium import *
+import pytest
+import random
+
+
+def populatedWorld(total, conditions=None):
+    random.seed(1)
+    world = Terrarium()
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    world.addForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")
+    if conditions is not None:
+        world.importSolverSettings(conditions)
+    for x in range(0, total):
+        world.addSolver()
+    for item in world._forces:
+        item.beginDay()
+    for solver in world._solvers:
+        solver.beginDay()
+    return world
+
+
+class TestEvaluatorCreation:
+
+    def test_create_serial_evaluator(self):
+        assert isinstance(createEvaluator("Serial"), SerialEvaluator)
+
+    def test_create_vectorized_evaluator(self):
+        assert isinstance(createEvaluator("Vectorized"), VectorizedEvaluator)
+
+    def test_create_unknown_evaluator(self):
+        assert createEvaluator("???") is None
+
+    def test_set_unknown_evaluator_keeps_current(self):
+        world = Terrarium()
+        world.setEvaluator("???")
+        assert world._evaluator.type_ == "Serial"
+
+
+class TestIncrementalEvaluator:
+
+    def test_matches_serial_fitness(self):
+        world = populatedWorld(200)
+        createEvaluator("Serial").evaluate(world._solvers, world._forces)
+        serial = [solver.fitness for solver in world._solvers]
+        evaluator = createEvaluator("Incremental")
+        evaluator.evaluate(world._solvers, world._forces)
+        assert [solver.fitness for solver in world._solvers] == serial
+        # Second pass reuses every response
+        evaluator.evaluate(world._solvers, world._forces)
+        assert [solver.fitness for solver in world._solvers] == serial
+        counters = evaluator.counters
+        assert counters["module_calls_avoided"] == counters["module_calls"]
+
+    def test_child_only_calculates_mutated_modules(self):
+        world = populatedWorld(1)
+        parent = world._solvers[0]
+        evaluator = createEvaluator("Incremental")
+        evaluator.evaluate([parent], world._forces)
+        child = parent.clone()
+        child.modules[0].mutate()
+        child.markDirty(0)
+        assert parent._dirty is None
+        before = evaluator.counters
+        evaluator.evaluate([child], world._forces)
+        after = evaluator.counters
+        assert after["module_calls"] - before["module_calls"] == len(world._forces)
+        assert (after["module_calls_avoided"] - before["module_calls_avoided"] ==
+                len(world._forces) * (len(child.modules) - 1))
+        assert child.fitness == child._fitness_calculator.calculateFitness(world._forces, child.modules)
+        assert child._responses is not parent._responses and child._dirty is None
+
+    def test_seeded_run_matches_serial(self):
+        exports = []
+        for evaluator_type in ["Serial", "Incremental"]:
+            world = Terrarium()
+            world.setSeed(7)
+            world.addForce("Simple", "Position", "primes_1000.txt")
+            world.addForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")
+            for x in range(0, 30):
+                world.addSolver()
+            world.setEvaluator(evaluator_type)
+            world.runDays(20)
+            exports.append(world.exportSolvers())
+        assert exports[1] == exports[0]
+        assert world.counters["module_calls_avoided"] > 0
+
+    def test_domain_failure_withholds_solver(self):
+        world = Terrarium()
+        world.addForce("Simple", "Equation", "x, -5, -1")
+        world.importSolvers([{"_modules": [{"_subtype": "Ln", "_type_": "Fitness", "coeff": 2}],
+                              "name": "Solver1", "_type_": "Small", "fitness_calculator": "Linear"}])
+        world._forces[0].beginDay()
+        createEvaluator("Incremental").evaluate(world._solvers, world._forces)
+        assert world._solvers[0].fitness is None
+        assert world._solvers[0].resilience == 1
+
+    def test_world_counters(self):
+        world = populatedWorld(20)
+        assert world.counters == {}
+        world.setEvaluator("Incremental")
+        world.evaluateSolvers()
+        assert world.counters["module_calls"] > 0
+
+
+class TestVectorizedEvaluator:
+
+    def test_matches_serial_fitness(self):
+        world = populatedWorld(200)
+        createEvaluator("Serial").evaluate(world._solvers, world._forces)
+        serial = [solver.fitness for solver in world._solvers]
+        createEvaluator("Vectorized").evaluate(world._solvers, world._forces)
+        vectorized = [solver.fitness for solver in world._solvers]
+        assert serial == vectorized
+
+    def test_domain_failure_withholds_solver(self):
+        world = Terrarium()
+        world.addForce("Simple", "Equation", "x, -5, -1")
+        world.importSolvers([{"_modules": [{"_subtype": "Ln", "_type_": "Fitness", "coeff": 2}],
+                              "name": "Solver1", "_type_": "Small", "fitness_calculator": "Linear"}])
+        world._forces[0].beginDay()
+        createEvaluator("Vectorized").evaluate(world._solvers, world._forces)
+        assert world._solvers[0].fitness is None
+        assert world._solvers[0].resilience == 1
+
+    def test_solver_without_modules_gets_penalty(self):
+        world = Terrarium()
+        world.addForce("Simple", "Position", "primes_1000.txt")
+        world.addSolver()
+        world._forces[0].beginDay()
+        createEvaluator("Vectorized").evaluate(world._solvers, world._forces)
+        assert world._solvers[0].fitness == world._forces[0].penalty
+
+    def test_other_calculators_evaluated_serially(self):
+        world = populatedWorld(20, {"fitness_calculator": "Teired"})
+        createEvaluator("Serial").evaluate(world._solvers, world._forces)
+        serial = [solver.fitness for solver in world._solvers]
+        createEvaluator("Vectorized").evaluate(world._solvers, world._forces)
+        assert [solver.fitness for solver in world._solvers] == serial
+
+    def test_batch_matches_serial_fitness(self):
+        world = populatedWorld(100)
+        for item in world._forces:
+            item.batch_size = 7
+            item.beginDay()
+        createEvaluator("Serial").evaluate(world._solvers, world._forces)
+        serial = [solver.fitness for solver in world._solvers]
+        createEvaluator("Vectorized").evaluate(world._solvers, world._forces)
+        assert [solver.fitness for solver in world._solvers] == serial
+
+
+class TestPoolEvaluator:
+
+    def test_genome_fitness_matches_solver(self):
+        world = populatedWorld(30, {"fitness_calculator": "Teired"})
+        for solver in world._solvers:
+            solver.calculateFitness(world._forces)
+            assert genomeFitness(solver.exportGenome(), world._forces) == solver.fitness
+
+    def test_balance_chunks(self):
+        genomes = [("Linear", (("Log", 1),) * size) for size in [5, 5, 1, 1, 1, 1, 1, 1, 1, 1, 5]]
+        chunks = balanceChunks(genomes, 3)
+        assert len(chunks) == 3
+        assert chunks[0][0] == 0 and chunks[-1][1] == len(genomes)
+        for pos in range(1, len(chunks)):
+            assert chunks[pos][0] == chunks[pos - 1][1]
+
+    def test_pool_matches_serial_fitness(self):
+        world = populatedWorld(60)
+        createEvaluator("Serial").evaluate(world._solvers, world._forces)
+        serial = [solver.fitness for solver in world._solvers]
+        for solver in world._solvers:
+            solver._fitness = 0
+        pool_evaluator = createEvaluator("Pool", 2)
+        try:
+            pool_evaluator.evaluate(world._solvers, world._forces)
+            pool_evaluator.evaluate(world._solvers, world._forces)
+        finally:
+            pool_evaluator.close()
+        assert [solver.fitness for solver in world._solvers] == serial
+
+    def test_dynamic_chunk_draws_from_seeded_stream(self):
+        world = populatedWorld(20, {"fitness_calculator": "Dynamic"})
+        chunk = ([ForceConditions(item) for item in world._forces],
+                 [solver.exportGenome() for solver in world._solvers], list(range(11, 31)))
+        state = random.getstate()
+        first = evaluateGenomes(chunk)
+        assert random.getstate() == state
+        assert evaluateGenomes(chunk) == first
+
+    def seededRun(self, evaluator_type, processes=None, conditions=None):
+        """Returns exported solvers of a seeded world run for 15 days with evaluator."""
+        world = Terrarium()
+        world.setSeed(123)
+        world.addForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")
+        if conditions is not None:
+            world.importSolverSettings(conditions)
+        for x in range(0, 20):
+            world.addSolver()
+        world.setEvaluator(evaluator_type, processes)
+        try:
+            world.runDays(15)
+        finally:
+            world._evaluator.close()
+        return world.exportSolvers()
+
+    def test_seeded_run_same_for_any_processes(self):
+        serial = self.seededRun("Serial")
+        assert self.seededRun("Pool", 2) == serial
+        assert self.seededRun("Pool", 3) == serial
+
+    def test_seeded_dynamic_run_same_for_any_processes(self):
+        settings = {"fitness_calculator": "Dynamic"}
+        assert self.seededRun("Pool", 2, settings) == self.seededRun("Pool", 3, settings)
+
+    def test_create_pool_with_bad_processes(self):
+        assert createEvaluator("Pool", 0) is None
+
+    def test_full_scoring_matches_serial_fitness(self):
+        world = populatedWorld(100)
+        world._forces[0].setScoring("Stratified", 40)
+        createEvaluator("Serial").evaluate(world._solvers, world._forces)
+        serial = [solver.fitness for solver in world._solvers]
+        createEvaluator("Vectorized").evaluate(world._solvers, world._forces)
+        assert [solver.fitness for solver in world._solvers] == serial
+        # Same as scoring each module's response to every position
+        expected = FitnessCalculator.calculateBatchFitness(
+            LinearFitness(), world._forces[0], world._solvers[0].modules)
+        assert world._forces[0].basis.moduleFitness(world._solvers[0].modules) == expected
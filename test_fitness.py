@@ -1,5 +1,6 @@
 from evonum_fitness import *
 import pytest
+import random
 
 
 class TestFitnessForceCreation:
@@ -100,3 +101,116 @@ class TestBeginDay:
             "Dynamic", "Equation", "roietioeo,2,3")
         with pytest.raises(NameError):
             unrecognizable_equation_dynamic.beginDay()
+
+
+class TestCompiledEquations:
+
+    def test_compiled_equation_matches_eval(self):
+        equation_force = createFitnessForce(
+            "Simple", "Equation", "sin(x)+53.4*pow(cos(x),4)-log10(x), 1, 1000")
+        permitted = dict(equation_force._permitted)
+        for variable in [1.5, 20.25, 999.0]:
+            permitted['x'] = variable
+            expected = eval(equation_force._equation_string,
+                            {"__builtins__": None}, permitted)
+            assert equation_force._equation(variable) == expected
+
+    def test_compile_rejects_unpermitted_names(self):
+        equation = compileEquation("__import__('os')", {})
+        with pytest.raises(NameError):
+            equation(1)
+
+    def test_compile_rejects_names_in_nested_code(self):
+        for equation_string in ["(lambda: ().__class__.__bases__)()",
+                                "max(y.__class__ for y in [x])"]:
+            equation = compileEquation(equation_string, {"max": max})
+            with pytest.raises(NameError):
+                equation(1)
+        assert compileEquation("(lambda y: pow(y, 2))(x)", {"pow": pow})(3) == 9
+
+    def test_array_equation(self):
+        equation_force = createFitnessForce(
+            "Simple", "Equation", "log(x) + 2*pow(x,2), -5, 5")
+        expected = equation_force.expectedArray([1.0, 2.0, -1.0])
+        assert round(expected[0], 6) == 2
+        assert round(expected[1], 6) == round(log(2.0) + 8, 6)
+        assert expected[2] != expected[2]  # Undefined solutions are NaN
+
+    def test_pickled_equation_force(self):
+        import pickle
+        dynamic_equation_force = createFitnessForce(
+            "Dynamic", "Equation", "x + 5*pow(x,2), 1, 10")
+        restored = pickle.loads(pickle.dumps(dynamic_equation_force, 2))
+        restored.beginDay()
+        variable, expected = restored.conditions
+        assert expected == variable + 5 * pow(variable, 2)
+
+
+class TestBatchConditions:
+
+    def test_batch_conditions_drawn_each_day(self):
+        position_force = createFitnessForce(
+            "Simple", "Position", "primes_1000.txt")
+        position_force.batch_size = 8
+        position_force.beginDay()
+        assert len(position_force.batch) == 8
+        for condition, expected in position_force.batch:
+            assert expected == position_force._expected[condition - 1]
+
+    def test_batch_size_limits(self):
+        equation_force = createFitnessForce(
+            "Simple", "Equation", "x, 1, 2")
+        equation_force.batch_size = 0
+        assert equation_force.batch_size == 1
+        equation_force.batch_size = 5000
+        assert equation_force.batch_size == 1000
+        equation_force.batch_size = "lots"
+        assert equation_force.batch_size == 1000
+
+    def test_default_batch_is_current_condition(self):
+        equation_force = createFitnessForce(
+            "Simple", "Equation", "x, 1, 2")
+        equation_force.beginDay()
+        assert equation_force.batch == [equation_force.conditions]
+
+
+class TestPositionScoring:
+
+    def test_full_scoring_uses_every_position(self):
+        position_force = createFitnessForce(
+            "Simple", "Position", "primes_1000.txt")
+        assert position_force.setScoring("Full")
+        state = random.getstate()
+        position_force.beginDay()
+        assert random.getstate() == state  # No positions are drawn
+        assert position_force.batch_size == 1000
+        assert position_force.batch[0] == (1, 2.0)
+        assert position_force.batch[-1] == (1000, position_force._expected[-1])
+        assert len(position_force.basis) == 1000
+
+    def test_stratified_scoring_is_fixed_and_spread(self):
+        position_force = createFitnessForce(
+            "Simple", "Position", "primes_1000.txt")
+        assert position_force.setScoring("Stratified", 4)
+        position_force.beginDay()
+        assert [item[0] for item in position_force.batch] == [126, 376, 626, 876]
+        position_force.beginDay()
+        assert [item[0] for item in position_force.batch] == [126, 376, 626, 876]
+
+    def test_bad_scoring(self):
+        position_force = createFitnessForce(
+            "Simple", "Position", "primes_1000.txt")
+        assert not position_force.setScoring("Stratified", 0)
+        assert not position_force.setScoring("Everything")
+        assert position_force.scoring == "Random"
+        assert position_force.basis is None
+
+    def test_pickled_force_keeps_scoring(self):
+        import pickle
+        position_force = createFitnessForce(
+            "Simple", "Position", "primes_1000.txt")
+        position_force.setScoring("Stratified", 10)
+        restored = pickle.loads(pickle.dumps(position_force, 2))
+        assert restored.scoring == "Stratified"
+        assert restored.batch == position_force.batch
+        assert len(restored.basis) == 10
@@ -0,0 +1,65 @@
+from evonum_io import *
+from evonum_terrarium import *
+import evonum_io
+import json
+import pytest
+import random
+
+
+def exportedWorld():
+    random.seed(1)
+    world = Terrarium()
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    for x in range(0, 10):
+        world.addSolver()
+    world.runDays(3)
+    return world
+
+
+class TestSolverFiles:
+
+    def test_json_lines_round_trip(self, tmpdir):
+        world = exportedWorld()
+        expected = list(world.iterExportDicts())
+        for extension in ["jsonl", "jsonl.gz"]:
+            filename = str(tmpdir.join("solvers." + extension))
+            assert world.exportSolversTo(filename) == len(expected)
+            assert list(readSolvers(filename)) == expected
+
+    def test_lzma_round_trip(self, tmpdir):
+        if evonum_io.lzma is None:
+            pytest.skip("lzma not available")
+        filename = str(tmpdir.join("solvers.jsonl.xz"))
+        writeSolvers(filename, [{"name": "Solver1"}, {"name": "Solver2"}])
+        assert list(readSolvers(filename)) == [{"name": "Solver1"}, {"name": "Solver2"}]
+
+    def test_legacy_array_matches_export_strings(self, tmpdir):
+        world = exportedWorld()
+        filename = str(tmpdir.join("solvers.json"))
+        world.exportSolversTo(filename, legacy=True)
+        assert tmpdir.join("solvers.json").read() == "[\n" + ",\n".join(world.exportSolvers()) + "\n]\n"
+        assert list(readSolvers(filename)) == json.load(open(filename))
+
+    def test_read_across_small_chunks(self, tmpdir, monkeypatch):
+        world = exportedWorld()
+        filename = str(tmpdir.join("solvers.json"))
+        world.exportSolversTo(filename, legacy=True)
+        monkeypatch.setattr(evonum_io, "CHUNK_SIZE", 7)
+        assert list(readSolvers(filename)) == list(world.iterExportDicts())
+
+    def test_read_bad_file(self, tmpdir):
+        tmpdir.join("bad.jsonl").write('{"name": "Solver1"}\n{"name": ')
+        with pytest.raises(ValueError):
+            list(readSolvers(str(tmpdir.join("bad.jsonl"))))
+
+    def test_no_legacy_file_without_solvers(self, tmpdir):
+        assert writeSolverArray(str(tmpdir.join("empty.json")), []) == 0
+        assert not tmpdir.join("empty.json").check()
+
+    def test_import_solvers_from_file(self, tmpdir):
+        world = exportedWorld()
+        filename = str(tmpdir.join("solvers.jsonl.gz"))
+        world.exportSolversTo(filename)
+        imported_world = Terrarium()
+        imported_world.importSolversFrom(filename)
+        assert list(imported_world.iterExportDicts()) == list(world.iterExportDicts())
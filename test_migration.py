@@ -0,0 +1,66 @@
+from evonum_migration import *
+from evonum_population import ArrayTerrarium, Terrarium
+import pytest
+import random
+
+
+def island(total, seed):
+    world = Terrarium()
+    world.setSeed(seed)
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    for x in range(0, total):
+        world.addSolver()
+    world.runDays(2)
+    return world
+
+
+class TestMigrationCreation:
+
+    def test_create_ring(self):
+        migration = createMigration(5, 2)
+        assert migration.settings == [5, 2, "Ring"]
+
+    def test_create_full(self):
+        assert createMigration("3", "1", "Full").topology == "Full"
+
+    def test_create_bad_migration(self):
+        assert createMigration(0, 2) is None
+        assert createMigration(5, "two") is None
+        assert createMigration(5, 2, "Star") is None
+
+
+class TestMigration:
+
+    def test_routes(self):
+        assert migrationRoutes("Ring", 3) == [[1], [2], [0]]
+        assert migrationRoutes("Ring", 1) == [[]]
+        assert migrationRoutes("Full", 3) == [[1, 2], [0, 2], [0, 1]]
+
+    def test_route_keeps_world_order(self):
+        incoming = createMigration(1, 1, "Full").route([["a"], ["b"], ["c"]])
+        assert incoming == [["b", "c"], ["a", "c"], ["a", "b"]]
+
+    def test_due(self):
+        migration = createMigration(3, 1)
+        assert [rounds for rounds in range(1, 10) if migration.due(rounds)] == [3, 6, 9]
+
+    def test_migrate_sends_top_solvers(self):
+        worlds = [island(6, 1), island(6, 2)]
+        populations = [len(world._solvers) for world in worlds]
+        emigrants = [world.exportTop(2) for world in worlds]
+        createMigration(1, 2).migrate(worlds)
+        assert [len(world._solvers) for world in worlds] == [item + 2 for item in populations]
+        assert [item.exportDict() for item in worlds[0]._solvers[-2:]] == emigrants[1]
+        assert [item.exportDict() for item in worlds[1]._solvers[-2:]] == emigrants[0]
+
+    def test_array_world_emigrants(self):
+        random.seed(1)
+        world = ArrayTerrarium(capacity=4)
+        world.addForce("Simple", "Position", "primes_1000.txt")
+        for x in range(0, 10):
+            world.addSolver()
+        world.runDays(1)
+        emigrants = world.exportTop(3)
+        assert len(emigrants) == 3
+        assert [item["name"] for item in emigrants] == \
+            [world.solverName(row) for row in world.topRows(world.scoreSolvers()[0], 3)]
@@ -1,4 +1,5 @@
 from evonum_modules import *
+import pickle
 import pytest
 import random
 random.seed(1)
@@ -80,6 +81,14 @@ class TestModuleCreation:
         recieved_dict = imported_module.exportDict()
         assert expected_dict == recieved_dict
 
+    def test_copy_and_pickle_module(self):
+        original = importModule({'coeff': -19, 'spread': 4,
+                                 '_type_': 'Fitness', '_subtype': 'Sine_2'})
+        assert not hasattr(original, "__dict__")
+        for copied in [original.copy(), pickle.loads(pickle.dumps(original))]:
+            assert copied.exportDict() == original.exportDict()
+            assert copied._pow == 2
+
 
 class TestFitnessModuleParameterControl:
 
@@ -279,3 +288,26 @@ class TestLnSubtype:
         ln_module.mutate()
         mutated = ln_module.coeff
         assert round(mutated) == -9
+
+
+class TestBasisCache:
+
+    def test_cached_response_matches_calculator(self):
+        clearBasisCache()
+        for subtype in MODULE_SUBTYPES:
+            module = createModule("Fitness", subtype)
+            for variable in [0.5, 3.0, 250.0]:
+                assert module.getResponse(variable) == module.calculator(variable)
+        assert len(basisRow(3.0)) == len(MODULE_SUBTYPES)
+
+    def test_domain_failure_is_cached(self):
+        clearBasisCache()
+        log_module = importModule({'coeff': 2, 'spread': 10, '_type_': 'Fitness', '_subtype': 'Log'})
+        assert log_module.getResponse(0) is None
+        assert basisRow(0.0)["Log"] is None
+        assert "Log" in basisRow(0)  # Same row for int and float variables
+
+    def test_clear_cache(self):
+        cachedBasis("Power_2", 4.0)
+        clearBasisCache()
+        assert len(basisRow(4.0)) == 0
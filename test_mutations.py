@@ -0,0 +1,78 @@
+from evonum_mutations import *
+from evonum_solvers import createSolver
+from evonum_terrarium import Terrarium
+import pytest
+import random
+
+
+def parents(total, conditions):
+    random.seed(1)
+    solvers = []
+    for x in range(0, total):
+        solver = createSolver("Small", "Solver%d_0.1" % (x + 1), conditions)
+        solver.beginDay()
+        solver.assignFitness(0)
+        solvers.append(solver)
+    return solvers
+
+
+def mutatedModules(engine, solvers):
+    """Returns fraction of modules whose coeff changed in children and the children."""
+    children = engine.reproduce(solvers)
+    changed = 0
+    total = 0
+    for parent, child in zip(solvers, children):
+        for before, after in zip(parent.modules, child.modules):
+            total += 1
+            if before.coeff != after.coeff:
+                changed += 1
+    return changed / float(total), children
+
+
+class TestMutationEngines:
+
+    def test_create_mutation_engines(self):
+        assert createMutationEngine("Scalar").type_ == "Scalar"
+        assert createMutationEngine("Cohort").type_ == "Cohort"
+        assert createMutationEngine("???") is None
+
+    def test_gaussian_mutation_with_deviation(self):
+        random.seed(5)
+        expected = Mutations.GaussianMutation(3.0, 2.0)
+        random.seed(5)
+        deviation = random.gauss(0, 1)
+        assert Mutations.GaussianMutation(3.0, 2.0, deviation) == expected
+
+    def test_cohort_children_are_named_like_scalar(self):
+        solvers = parents(5, {"total_modules": 3})
+        children = createMutationEngine("Cohort").reproduce(solvers)
+        assert [child.name for child in children] == ["Solver%d_0.2" % (x + 1) for x in range(0, 5)]
+        assert [solver._children for solver in solvers] == [1] * 5
+
+    def test_no_mutation_chances_copy_parents(self):
+        conditions = {"total_modules": 3, "module_mutation_chance": 0,
+                      "property_mutation_chance": 0, "merge_module_chance": 0}
+        solvers = parents(20, conditions)
+        assert mutatedModules(createMutationEngine("Cohort"), solvers)[0] == 0
+
+    @pytest.mark.parametrize("engine_type", ["Scalar", "Cohort"])
+    def test_module_mutation_rate(self, engine_type):
+        conditions = {"total_modules": 5, "module_mutation_chance": 30, "swap_module_chance": 0,
+                      "property_mutation_chance": 0, "merge_module_chance": 0}
+        solvers = parents(400, conditions)
+        random.seed(2)
+        rate = mutatedModules(createMutationEngine(engine_type), solvers)[0]
+        assert abs(rate - 0.3) < 0.05
+
+    def test_world_with_cohort_mutation(self):
+        random.seed(1)
+        world = Terrarium()
+        world.addForce("Simple", "Position", "primes_1000.txt")
+        world.setMutation("Cohort")
+        world.setMutation("???")
+        assert world._mutation.type_ == "Cohort"
+        for x in range(0, 10):
+            world.addSolver()
+        world.runDays(3)
+        assert world._current_day == 3
+        assert len(world._solvers) > 10
@@ -0,0 +1,127 @@
+from evonum_population import *
+from evonum_evaluators import createEvaluator
+import pytest
+import random
+
+
+def arrayWorld(total, single_precision=False):
+    random.seed(1)
+    world = ArrayTerrarium(capacity=4, single_precision=single_precision)
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    for x in range(0, total):
+        world.addSolver()
+    return world
+
+
+class TestTerrariumCreation:
+
+    def test_create_object_world(self):
+        assert type(createTerrarium("Object")) is Terrarium
+
+    def test_create_array_worlds(self):
+        assert not createTerrarium("Array").single_precision
+        assert createTerrarium("Array32").single_precision
+
+    def test_create_unknown_world(self):
+        assert createTerrarium("???") is None
+
+
+class TestArrayTerrarium:
+
+    def test_add_solvers_grows_arrays(self):
+        world = arrayWorld(10)
+        assert world.population == 10
+        assert world.solverName(9) == "Solver10_0.1"
+        assert len(world._arrays["age"]) >= 10
+
+    def test_non_linear_solvers_rejected(self):
+        world = ArrayTerrarium()
+        world.importSolverSettings({"fitness_calculator": "Teired", "spread": 5})
+        world.addSolver()
+        assert "fitness_calculator" not in world._solver_settings
+        assert world.storeSolver(createSolver("Small", "S", {"fitness_calculator": "Teired"})) is False
+        assert world.population == 1
+
+    def test_age_solvers_adds_modules(self):
+        world = arrayWorld(5)
+        world.ageSolvers()
+        assert list(world.column("age")) == [1] * 5
+        assert list(world.column("module_count")) == list(world.column("total_modules"))
+        assert (world.column("subtypes")[:, :5] > 0).all()
+        assert (world.column("subtypes")[:, 5:] == 0).all()
+
+    def test_reproduce_names_and_counts(self):
+        world = arrayWorld(3)
+        world.ageSolvers()
+        world.reproduceSolvers()
+        assert world.population == 6
+        assert list(world.column("children")) == [1, 1, 1, 0, 0, 0]
+        assert world.solverName(3) == "Solver1_0.2"
+        assert list(world.column("age")[3:]) == [1, 1, 1]
+
+    def test_fitness_matches_solver_views(self):
+        world = arrayWorld(50)
+        world._forces[0].beginDay()
+        world.ageSolvers()
+        world.reproduceSolvers()
+        world.evaluateSolvers()
+        views = [world.solverView(row) for row in range(0, world.population)]
+        createEvaluator("Serial").evaluate(views, world._forces)
+        assert list(world.column("fitness")) == [view.fitness for view in views]
+
+    def test_full_scoring_matches_solver_views(self):
+        world = arrayWorld(50)
+        world._forces[0].setScoring("Full")
+        world.ageSolvers()
+        world.evaluateSolvers()
+        views = [world.solverView(row) for row in range(0, world.population)]
+        createEvaluator("Serial").evaluate(views, world._forces)
+        assert list(world.column("fitness")) == [view.fitness for view in views]
+
+    def test_run_days_keeps_population_bounded(self):
+        world = arrayWorld(20)
+        world._max_solvers = 30
+        world._chance_to_survive_prune = 0
+        world.runDays(5)
+        assert world.population <= 60
+        assert world.column("living").sum() <= 30
+
+    def test_seeded_worlds_run_the_same(self):
+        coeffs = []
+        for pos in range(0, 2):
+            random.seed(pos)
+            world = ArrayTerrarium(capacity=4)
+            world.setSeed(3)
+            world.addForce("Simple", "Position", "primes_1000.txt")
+            for x in range(0, 10):
+                world.addSolver()
+            world.runDays(3)
+            coeffs.append(world.column("coeffs").tolist())
+        assert coeffs[0] == coeffs[1]
+
+    def test_top_rows_matches_stable_sort(self):
+        world = arrayWorld(100)
+        world.column("fitness")[:] = [x % 7 for x in range(0, 100)]
+        rows = numpy.arange(100)
+        expected = sorted(rows, key=lambda x: world.column("fitness")[x], reverse=True)
+        assert list(world.topRows(rows, 20)) == expected[:20]
+        assert list(world.topRows(rows, 20, ordered=False)) == sorted(expected[:20])
+
+    def test_export_and_import_round_trip(self):
+        world = arrayWorld(10, single_precision=True)
+        world.runDays(2)
+        exported = [json.loads(item) for item in world.exportSolvers()]
+        assert len(exported) > 0
+        other = ArrayTerrarium()
+        other.importSolvers(exported)
+        assert [json.loads(item) for item in other.exportSolvers()] == exported
+
+    def test_domain_failure_docks_resilience(self):
+        world = ArrayTerrarium()
+        world.addForce("Simple", "Equation", "x, -5, -1")
+        world.importSolvers([{"_modules": [{"_subtype": "Ln", "_type_": "Fitness", "coeff": 2}],
+                              "name": "Solver1", "_type_": "Small", "fitness_calculator": "Linear"}])
+        world._forces[0].beginDay()
+        world.evaluateSolvers()
+        assert world.solverView(0).fitness is None
+        assert world.solverView(0).resilience == 1
@@ -0,0 +1,190 @@
+from evonum_remote import *
+from evonum_evaluators import createEvaluator, genomeFitness
+from evonum_terrarium import Terrarium
+import evonum_remote
+import os
+import pickle
+import pytest
+import random
+import signal
+import time
+
+
+def populatedWorld(total):
+    random.seed(1)
+    world = Terrarium()
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    world.addForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")
+    for x in range(0, total):
+        world.addSolver()
+    return world
+
+
+def serialFitness(world):
+    createEvaluator("Serial").evaluate(world._solvers, world._forces)
+    fitness = [solver.fitness for solver in world._solvers]
+    for solver in world._solvers:
+        solver._fitness = 0
+    return fitness
+
+
+class TestRemoteCreation:
+
+    def test_create_localhost_evaluator(self):
+        evaluator = createEvaluator("Remote", 2)
+        assert evaluator.type_ == "Remote"
+        assert evaluator.workers == 0  # Started on first use
+
+    def test_create_with_addresses(self, monkeypatch):
+        monkeypatch.setenv("EVONUM_AUTHKEY", "test key")
+        evaluator = createEvaluator("Remote", ["127.0.0.1:7100", "node2:7101"])
+        assert evaluator._addresses == [("127.0.0.1", 7100), ("node2", 7101)]
+        assert evaluator._authkey == b"test key"
+
+    def test_addresses_need_key(self, monkeypatch, capsys):
+        monkeypatch.delenv("EVONUM_AUTHKEY", raising=False)
+        assert createEvaluator("Remote", ["127.0.0.1:7100"]) is None
+        assert "EVONUM_AUTHKEY must be set" in capsys.readouterr()[0]
+        assert evonum_remote.main(["127.0.0.1:7100"]) == 2
+
+    def test_localhost_workers_get_random_key(self, monkeypatch):
+        monkeypatch.delenv("EVONUM_AUTHKEY", raising=False)
+        first = createEvaluator("Remote", 1)._authkey
+        assert len(first) == 32
+        assert createEvaluator("Remote", 1)._authkey != first
+
+    def test_create_bad_remote(self):
+        assert createEvaluator("Remote", 0) is None
+        assert createEvaluator("Remote", ["node2"]) is None
+
+    def test_parse_address(self):
+        assert parseAddress(" ::1:7100") == ("::1", 7100)
+        with pytest.raises(ValueError):
+            parseAddress("7100")
+
+
+class TestShardWorker:
+
+    def test_update_keeps_genomes(self):
+        worker = ShardWorker()
+        worker.update(0, False, [], {1: "a", 2: "b"})
+        worker.update(0, False, [1], {3: "c"})
+        assert worker.shards[0] == {2: "b", 3: "c"}
+        worker.update(0, True, [], {4: "d"})
+        assert worker.shards[0] == {4: "d"}
+
+    def test_evaluate_in_key_order(self):
+        world = populatedWorld(5)
+        genomes = dict([(5 - pos, solver.exportGenome()) for pos, solver in enumerate(world._solvers)])
+        worker = ShardWorker()
+        worker.update(0, False, [], genomes)
+        fitness = worker.evaluate(world._forces, 0, {})
+        assert [key for key, value in fitness] == [1, 2, 3, 4, 5]
+        assert fitness[0][1] == genomeFitness(genomes[1], world._forces)
+
+    def test_heartbeat(self, monkeypatch):
+        monkeypatch.setattr(evonum_remote, "HEARTBEAT", 0.01)
+        receiver, sender = multiprocessing.Pipe(False)
+        heartbeat = Heartbeat(sender, threading.Lock())
+        heartbeat.start()
+        time.sleep(0.05)
+        heartbeat.stop()
+        assert receiver.poll(1)
+        assert receiver.recv() == ("alive",)
+
+
+class TestRemoteEvaluator:
+
+    def test_matches_serial_and_sends_only_changes(self):
+        world = populatedWorld(40)
+        evaluator = createEvaluator("Remote", 2)
+        try:
+            for day in range(0, 3):
+                world.runDays(1)
+                serial = serialFitness(world)
+                evaluator.evaluate(world._solvers, world._forces)
+                assert [solver.fitness for solver in world._solvers] == serial
+            counters = evaluator.counters
+            assert counters["genomes_kept"] > 0
+            assert counters["genomes_sent"] < 3 * len(world._solvers)
+        finally:
+            evaluator.close()
+
+    def test_seeded_run_matches_serial(self):
+        exports = []
+        for evaluator_type, processes in [("Serial", None), ("Remote", 2), ("Remote", 1)]:
+            world = Terrarium()
+            world.setSeed(123)
+            world.addForce("Simple", "Equation", "3*pow(x,2)+log(x), 1, 100")
+            for x in range(0, 20):
+                world.addSolver()
+            world.setEvaluator(evaluator_type, processes)
+            try:
+                world.runDays(15)
+            finally:
+                world._evaluator.close()
+            exports.append(world.exportSolvers())
+        assert exports[1] == exports[0]
+        assert exports[2] == exports[0]
+
+    def test_lost_worker_shards_reassigned(self):
+        world = populatedWorld(30)
+        evaluator = createEvaluator("Remote", 2)
+        try:
+            world.runDays(1)
+            evaluator.evaluate(world._solvers, world._forces)
+            evaluator._processes[0].terminate()
+            evaluator._processes[0].join()
+            world.runDays(1)
+            serial = serialFitness(world)
+            evaluator.evaluate(world._solvers, world._forces)
+            assert [solver.fitness for solver in world._solvers] == serial
+            assert evaluator.counters["workers_dropped"] == 1
+            assert evaluator.workers == 1
+        finally:
+            evaluator.close()
+
+    def test_silent_worker_times_out(self):
+        world = populatedWorld(20)
+        evaluator = RemoteEvaluator(2, timeout=0.5)
+        try:
+            world.runDays(1)
+            evaluator.evaluate(world._solvers, world._forces)
+            os.kill(evaluator._processes[1].pid, signal.SIGSTOP)
+            serial = serialFitness(world)
+            evaluator.evaluate(world._solvers, world._forces)
+            assert [solver.fitness for solver in world._solvers] == serial
+            assert evaluator.workers == 1
+        finally:
+            os.kill(evaluator._processes[1].pid, signal.SIGCONT)
+            evaluator.close()
+
+    def test_no_workers_left_evaluates_locally(self):
+        world = populatedWorld(10)
+        evaluator = createEvaluator("Remote", 1)
+        try:
+            evaluator.evaluate(world._solvers, world._forces)
+            evaluator._processes[0].terminate()
+            evaluator._processes[0].join()
+            serial = serialFitness(world)
+            evaluator.evaluate(world._solvers, world._forces)
+            assert [solver.fitness for solver in world._solvers] == serial
+            assert evaluator.workers == 0
+        finally:
+            evaluator.close()
+
+    def test_pickled_evaluator_starts_again(self):
+        world = populatedWorld(10)
+        evaluator = createEvaluator("Remote", 1)
+        try:
+            evaluator.evaluate(world._solvers, world._forces)
+            loaded = pickle.loads(pickle.dumps(evaluator, 2))
+        finally:
+            evaluator.close()
+        assert loaded._workers is None and loaded._tracked == {}
+        serial = serialFitness(world)
+        try:
+            loaded.evaluate(world._solvers, world._forces)
+        finally:
+            loaded.close()
+        assert [solver.fitness for solver in world._solvers] == serial
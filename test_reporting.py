@@ -0,0 +1,84 @@
+from evonum_reporting import *
+from evonum_terrarium import *
+import json
+import pytest
+import random
+
+
+def reportingWorld(tmpdir, settings):
+    random.seed(1)
+    world = Terrarium()
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    for x in range(0, 10):
+        world.addSolver()
+    world.setDumpFile(str(tmpdir.join("dump.txt")))
+    if "jsonl" in settings:
+        settings["jsonl"] = str(tmpdir.join(settings["jsonl"]))
+    world.setReporter(settings)
+    return world
+
+
+class TestReporterCreation:
+
+    def test_create_default_reporter(self):
+        assert createReporter().due(1)
+
+    def test_create_reporter_bad_settings(self):
+        assert createReporter({"days": "x"}) is None
+        assert createReporter({"days": 0}) is None
+        assert createReporter({"cadence": 1}) is None
+
+    def test_reporter_seconds_only(self):
+        reporter = createReporter({"days": 0, "seconds": 1000})
+        assert not reporter.due(50)
+
+
+class TestReporting:
+
+    def test_report_every_n_days(self, tmpdir):
+        world = reportingWorld(tmpdir, {"days": "3", "jsonl": "report.jsonl"})
+        world.runDays(7)
+        assert tmpdir.join("dump.txt").read().startswith("Day 6 ")
+        world.closeReporter()
+        assert tmpdir.join("dump.txt").read().startswith("Day 7 ")
+        records = [json.loads(line) for line in tmpdir.join("report.jsonl").readlines()]
+        assert [item["day"] for item in records] == [3, 6, 7]
+        assert records[0]["best"]["_type_"] == "Small"
+        assert "top" not in records[0]
+
+    def test_quiet_batches_day_lines(self, tmpdir, capsys):
+        world = reportingWorld(tmpdir, {"days": "2", "quiet": "True"})
+        world.runDays(1)
+        assert capsys.readouterr()[0] == ""
+        world.runDays(1)
+        assert [line.split("\t")[0] for line in capsys.readouterr()[0].splitlines()] == ["1", "2"]
+
+    def test_background_matches_foreground(self, tmpdir):
+        world = reportingWorld(tmpdir, {"jsonl": "foreground.jsonl"})
+        world.runDays(5)
+        world.closeReporter()
+        foreground = tmpdir.join("dump.txt").read()
+        world = reportingWorld(tmpdir, {"jsonl": "background.jsonl", "background": "True"})
+        world.runDays(5)
+        world.closeReporter()
+        assert tmpdir.join("dump.txt").read() == foreground
+        assert tmpdir.join("background.jsonl").read() == tmpdir.join("foreground.jsonl").read()
+
+
+class TestTimings:
+
+    def test_timings_csv_row_per_day(self, tmpdir):
+        world = reportingWorld(tmpdir, {})
+        world.setTimingsFile(str(tmpdir.join("timings.csv")))
+        world.runDays(3)
+        lines = tmpdir.join("timings.csv").read().splitlines()
+        assert lines[0].split(",") == ["day"] + DAY_PHASES + SOLVER_COUNTS
+        assert [line.split(",")[0] for line in lines[1:]] == ["1", "2", "3"]
+        evaluated = sum([int(line.split(",")[-3]) for line in lines[1:]])
+        assert evaluated == world.timings["evaluated"]
+
+    def test_format_timings(self):
+        timer = PhaseTimer()
+        summary = formatTimings("Run_1", timer.summary())
+        assert summary.startswith("Run_1: 0 days")
+        assert "evaluate 0.000s (0%)" in summary
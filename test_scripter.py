@@ -1,4 +1,5 @@
 from evonum_scripter import *
+import evonum_scripter
 import pytest
 import random
 
@@ -11,6 +12,13 @@ class TestInitializations:
         assert test_world_script._worlds[0]._max_forces == 2
         assert test_world_script._worlds[0]._chance_to_survive_prune == 3
     
+    def test_initialize_array_world(self):
+        test_script = ["World: 1, 2, 3, Array32", "World: 1, 2, 3, ???"]
+        test_array_script = SimpleScripter(test_script)
+        assert test_array_script._worlds[0].single_precision
+        assert test_array_script._worlds[0]._max_solvers == 1
+        assert type(test_array_script._worlds[1]) is Terrarium
+
     def test_initialize_world_bad_settings(self):
         test_script = ["World: a, b, c"]
         with pytest.raises(TypeError):
@@ -26,6 +34,27 @@ class TestInitializations:
         test_import_force = SimpleScripter(test_script)
         assert isinstance(test_import_force._worlds[0]._forces[0], SimplePosition)
     
+    def test_add_force_with_batch(self):
+        test_script = ["World: 1, 2, 3", "Force: 1, Simple, Equation, x + 2, 1, 5, batch = 4"]
+        test_batch_force = SimpleScripter(test_script)
+        assert test_batch_force._worlds[0]._forces[0].batch_size == 4
+        assert test_batch_force._worlds[0]._forces[0].max_ == 5
+
+    def test_add_force_with_scoring(self):
+        test_script = ["World: 1, 2, 3", "Force: 1, Simple, Position, primes_1000.txt, scoring = Stratified, strata = 20",
+                       "Force: 1, Simple, Equation, x + 2, 1, 5, scoring = Full"]
+        test_scoring_force = SimpleScripter(test_script)
+        assert len(test_scoring_force._worlds[0]._forces) == 1
+        assert test_scoring_force._worlds[0]._forces[0].scoring == "Stratified"
+        assert test_scoring_force._worlds[0]._forces[0].batch_size == 20
+
+    def test_set_remote_evaluator_addresses(self, monkeypatch):
+        monkeypatch.setenv("EVONUM_AUTHKEY", "test key")
+        test_script = ["World: 1, 2, 3", "Evaluator: Remote, 127.0.0.1:7100, node2:7101"]
+        test_remote = SimpleScripter(test_script)
+        assert test_remote._worlds[0]._evaluator.type_ == "Remote"
+        assert test_remote._worlds[0]._evaluator._addresses == [("127.0.0.1", 7100), ("node2", 7101)]
+
     def test_add_force_bad_settings(self):
         test_script = ["World: 1, 2, 3", "Force: 1, 2, 3, 4"]
         test_import_bad_force = SimpleScripter(test_script)
@@ -83,6 +112,28 @@ class TestDefineSchedule:
         with pytest.raises(ValueError):
             bad_number_of_days_script = SimpleScripter(test_script)
 
+    def test_add_run_until(self):
+        test_script = ["World: 1, 2, 3", "Run until: 500, target = 0, window = 50, epsilon = 0.01",
+                       "Run until: 100, window = 10"]
+        run_until_script = SimpleScripter(test_script)
+        assert run_until_script._actions == ["RunUntil_500_0.0_50_0.01", "RunUntil_100_None_10_0.0"]
+        assert untilSettings(run_until_script._actions[0]) == (500, 0.0, 50, 0.01)
+
+    def test_add_run_until_bad_rules(self):
+        for rules in ["500", "500, epsilon = 0.1", "500, window = 0", "500, patience = 4", "oops, target = 0"]:
+            with pytest.raises(ValueError):
+                SimpleScripter(["World: 1, 2, 3", "Run until: " + rules])
+
+    def test_add_run_time_budget(self):
+        test_script = ["World: 1, 2, 3", "Run: 45m", "Run: 90s", "Run: 1.5h"]
+        budget_script = SimpleScripter(test_script)
+        assert budget_script._actions == ["RunFor_2700.0", "RunFor_90.0", "RunFor_5400.0"]
+
+    def test_add_run_bad_time_budget(self):
+        for budget in ["45x", "m", "0s", "-5m"]:
+            with pytest.raises(ValueError):
+                SimpleScripter(["World: 1, 2, 3", "Run: " + budget])
+
     def test_add_end_world(self):
         test_script = ["World: 1, 2, 3", "End: 5, 50"]
         end_world_script = SimpleScripter(test_script)
@@ -93,6 +144,54 @@ class TestDefineSchedule:
         end_world_bad_settings = SimpleScripter(test_script)
         assert end_world_bad_settings._actions == []
 
+class TestConvergenceMonitor:
+
+    def test_target(self):
+        monitor = ConvergenceMonitor(target=-1)
+        assert not monitor.update(-5)
+        assert not monitor.update(None)
+        assert monitor.update(-0.5)
+        assert monitor.reason == "target fitness -1 reached"
+
+    def test_window_without_improvement(self):
+        monitor = ConvergenceMonitor(window=3)
+        assert [monitor.update(value) for value in [-10, -5, -4, -6, -3, -7, -8]] == [False] * 7
+        assert monitor.update(-9)
+        assert monitor.reason == "best fitness improved by 0 over the last 3 days"
+
+    def test_window_with_small_relative_improvement(self):
+        monitor = ConvergenceMonitor(window=2, epsilon=0.01)
+        assert [monitor.update(value) for value in [-100, -50, -49.9]] == [False, False, False]
+        assert monitor.update(-49.8)
+
+    def test_state_round_trip(self):
+        monitor = ConvergenceMonitor(window=3)
+        for value in [-10, -5, -4, -6]:
+            monitor.update(value)
+        resumed = ConvergenceMonitor.fromState(json.loads(json.dumps(monitor.state)))
+        assert resumed.state == monitor.state
+        assert [resumed.update(value) for value in [-3, -7, -8, -9]] == [False, False, False, True]
+
+
+class TestTimeBudget:
+
+    def test_rate_over_recent_days(self, monkeypatch):
+        clock = [100.0]
+        monkeypatch.setattr(evonum_scripter.time, "time", lambda: clock[0])
+        budget = TimeBudget(60, spent=10)
+        assert budget.seconds_per_day is None
+        assert budget.daysLeft() is None
+        for day in range(0, TimeBudget.RATE_DAYS):
+            clock[0] += 1
+            budget.dayDone()
+        clock[0] += 5  # Rate follows the last RATE_DAYS days
+        budget.dayDone()
+        assert budget.seconds_per_day == (TimeBudget.RATE_DAYS - 1 + 5) / float(TimeBudget.RATE_DAYS)
+        assert budget.spent == 10 + TimeBudget.RATE_DAYS + 5
+        assert budget.remaining == 60 - budget.spent
+        assert budget.daysLeft(2) == budget.remaining / budget.seconds_per_day - 2
+
+
 class TestRunSchedule:
     """!!!Integration Tests!!!"""
     
@@ -116,3 +215,200 @@ class TestRunSchedule:
             if solver.living:
                 final_living_population += 1
         assert final_living_population == 5       
+
+    def test_refresh_solvers_after_each_block(self):
+        test_script = ["World: 100, 2, 0", "Solver: 1", "Refresh Solvers: 3, 2", "Run: 5"]
+        refresh_script = SimpleScripter(test_script)
+        refresh_script.run()
+        assert refresh_script._worlds[0]._current_day == 5
+        # Refreshed twice (after days 2 and 4), the remainder day adds none.
+        names = [solver.name for solver in refresh_script._worlds[0]._solvers]
+        assert len([name for name in names if name.endswith("_2.1") or name.endswith("_4.1")]) == 6
+
+    def test_timings_summarized_after_each_action(self, tmpdir, capsys):
+        filename = str(tmpdir.join("timings.csv"))
+        test_script = ["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Timings: %s" % filename, "Run: 3", "End: 2, 5"]
+        SimpleScripter(test_script).run()
+        output = capsys.readouterr()[0]
+        assert "Timings for Run_3: 3 days" in output
+        assert "Timings for End_2_5: 2 days" in output
+        assert len(open(filename).readlines()) == 6
+
+    def test_run_until_target_stops_early(self, capsys):
+        test_script = ["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Run until: 50, target = -1000000000", "Run: 2"]
+        until_script = SimpleScripter(test_script)
+        until_script.run()
+        assert until_script._worlds[0]._current_day == 3
+        assert "Stopping RunUntil_50_-1000000000.0_None_0.0 after 1 days: target fitness" in \
+            capsys.readouterr()[0]
+
+    def test_run_until_stops_without_improvement(self):
+        test_script = ["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Run until: 200, window = 3"]
+        random.seed(2)
+        until_script = SimpleScripter(test_script)
+        schedule = WorldSchedule(until_script._worlds[0], until_script._actions, [0, 0])
+        best = []
+        while schedule.step():
+            best.append(until_script._worlds[0].best_fitness)
+        days = len(best)
+        assert days < 200
+        assert max(best[-3:]) <= max(best[:-3])
+        for day in range(4, days):
+            assert max(best[day - 3:day]) > max(best[:day - 3])
+
+    def timedSchedule(self, monkeypatch, actions):
+        """Returns schedule of a 10 solver world whose days take 1 second per 10 max population."""
+        clock = [0.0]
+        monkeypatch.setattr(evonum_scripter.time, "time", lambda: clock[0])
+        world = SimpleScripter(["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                                "Solver: 5"])._worlds[0]
+        run_days = world.runDays
+
+        def timedDays(days):
+            clock[0] += days * world._max_solvers / 10.0
+            run_days(days)
+        monkeypatch.setattr(world, "runDays", timedDays)
+        return WorldSchedule(world, actions, [0, 0]), clock
+
+    def test_run_time_budget_leaves_time_for_end(self, monkeypatch):
+        schedule, clock = self.timedSchedule(monkeypatch, ["RunFor_30.0", "End_5_2"])
+        while schedule.step():
+            pass
+        # Ramp 10, 5, 3, 3, 2 costs 2.3 days at 10 max population
+        assert schedule._world._current_day == int(30 - 2.3) + 5
+        assert 30 - 1 < clock[0] <= 30
+
+    def test_run_time_budget_shortens_end(self, monkeypatch, capsys):
+        schedule, clock = self.timedSchedule(monkeypatch, ["RunFor_6.0", "End_50_2"])
+        while schedule.step():
+            pass
+        assert "Shortening End_50_2 to" in capsys.readouterr()[0]
+        assert clock[0] <= 6 + 1  # The first day is always run
+        assert schedule._world._current_day < 50
+
+    def test_run_time_budget_resumes(self, monkeypatch):
+        schedule, clock = self.timedSchedule(monkeypatch, ["RunFor_10.0"])
+        for day in range(0, 4):
+            schedule.step()
+        position = schedule.position
+        assert position["budget_spent"] == 4
+        resumed = WorldSchedule(schedule._world, ["RunFor_10.0"], [0, 0])
+        resumed.setPosition(position)
+        while resumed.step():
+            pass
+        assert clock[0] == 10
+
+    def test_run_worlds_in_parallel(self):
+        test_script = ["World: 10, 2, 0", "World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Parallel: 2", "Run: 3", "End: 2, 5"]
+        parallel_script = SimpleScripter(test_script)
+        parallel_script.run()
+        for world in parallel_script._worlds:
+            assert world._current_day == 5
+            assert world._max_solvers == 5
+            assert len(world._solvers) > 0
+
+    def test_seeded_parallel_run_matches_serial(self):
+        test_script = ["World: 10, 2, 0", "World: 10, 2, 0", "Seed: 9",
+                       "Force: 1, Simple, Position, primes_1000.txt", "Solver: 5", "Run: 4"]
+        random.seed(1)
+        serial_script = SimpleScripter(test_script)
+        serial_script.run()
+        random.seed(2)
+        parallel_script = SimpleScripter(test_script + ["Parallel: 2"])
+        parallel_script.run()
+        serial = [world.exportSolvers() for world in serial_script._worlds]
+        assert [world.exportSolvers() for world in parallel_script._worlds] == serial
+        assert serial[0] != serial[1]
+
+    def test_island_workers_match_serial_islands(self):
+        test_script = ["World: 10, 2, 0", "World: 10, 2, 0", "World: 10, 2, 0", "Seed: 4",
+                       "Force: 1, Simple, Position, primes_1000.txt", "Solver: 5",
+                       "Migrate: 2, 2, Full", "Run: 5", "End: 2, 5"]
+        serial_script = SimpleScripter(test_script)
+        assert serial_script._migration.settings == [2, 2, "Full"]
+        serial_script.run()
+        island_script = SimpleScripter(test_script + ["Parallel: 2"])
+        island_script.run()
+        serial = [world.exportSolvers() for world in serial_script._worlds]
+        assert [world.exportSolvers() for world in island_script._worlds] == serial
+        for world in island_script._worlds:
+            assert world._current_day == 7
+
+    def test_export_and_import_json_lines(self, tmpdir):
+        prefix = str(tmpdir.join("run_"))
+        test_script = ["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Run: 3", "Export: %s, jsonl.gz" % prefix]
+        export_script = SimpleScripter(test_script)
+        export_script.run()
+        exported = list(export_script._worlds[0].iterExportDicts())
+        import_script = SimpleScripter(["World: 10, 2, 0", "Import: %sworld1_solvers.jsonl.gz" % prefix])
+        assert list(import_script._worlds[0].iterExportDicts()) == exported
+
+    def test_resume_from_checkpoint_mid_end(self, tmpdir, capsys):
+        prefix = str(tmpdir.join("check"))
+        test_script = ["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 8", "Run: 6", "End: 6, 5", "Checkpoint: 5, %s" % prefix]
+        random.seed(3)
+        uninterrupted = SimpleScripter(test_script)
+        uninterrupted.run()
+        expected = uninterrupted._worlds[0].exportSolvers()
+        expected_days = [line for line in capsys.readouterr()[0].splitlines()
+                         if line.startswith("11\t") or line.startswith("12\t")]
+        assert len(expected_days) == 2
+        # Latest checkpoint is after day 10, four days into the End ramp
+        resumed = SimpleScripter(["Checkpoint: 5, %s" % prefix])
+        assert resumed.resume()
+        assert resumed._worlds[0]._current_day == 10
+        assert resumed._resumed[0]["position"]["action"] == 1
+        resumed.run()
+        days = [line for line in capsys.readouterr()[0].splitlines()
+                if line.startswith("1") and "\t" in line]
+        assert days == expected_days
+        assert resumed._worlds[0].exportSolvers() == expected
+        assert resumed._worlds[0]._max_solvers == 5
+
+    def test_checkpoint_with_background_reports(self, tmpdir):
+        prefix = str(tmpdir.join("check"))
+        report = str(tmpdir.join("report.jsonl"))
+        test_script = ["World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt", "Solver: 5",
+                       "Report: days = 1, background = True, jsonl = %s" % report,
+                       "Run: 9", "Checkpoint: 2, %s" % prefix]
+        SimpleScripter(test_script).run()
+        assert readCheckpoint(prefix)["round"] == 8
+        assert len(open(report).read().splitlines()) == 9
+
+    def test_resume_parallel_worlds(self, tmpdir):
+        prefix = str(tmpdir.join("check"))
+        test_script = ["World: 10, 2, 0", "World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Parallel: 2", "Run: 7", "Checkpoint: 3, %s" % prefix]
+        uninterrupted = SimpleScripter(test_script)
+        uninterrupted.run()
+        resumed = SimpleScripter(["Checkpoint: 3, %s" % prefix])
+        assert resumed.resume()
+        assert [world._current_day for world in resumed._worlds] == [6, 6]
+        resumed.run()
+        for pos, world in enumerate(resumed._worlds):
+            assert world._current_day == 7
+            assert world.exportSolvers() == uninterrupted._worlds[pos].exportSolvers()
+
+    def test_resume_migrating_worlds(self, tmpdir):
+        prefix = str(tmpdir.join("check"))
+        test_script = ["World: 10, 2, 0", "World: 10, 2, 0", "Force: 1, Simple, Position, primes_1000.txt",
+                       "Solver: 5", "Migrate: 2, 1", "Run: 7", "Checkpoint: 3, %s" % prefix]
+        random.seed(5)
+        uninterrupted = SimpleScripter(test_script)
+        uninterrupted.run()
+        resumed = SimpleScripter(["Checkpoint: 3, %s" % prefix])
+        assert resumed.resume()
+        assert resumed._migration.settings == [2, 1, "Ring"]
+        resumed.run()
+        for pos, world in enumerate(resumed._worlds):
+            assert world.exportSolvers() == uninterrupted._worlds[pos].exportSolvers()
+
+    def test_resume_without_checkpoint(self, tmpdir):
+        assert not SimpleScripter([]).resume()
+        assert not SimpleScripter(["Checkpoint: 5, %s" % tmpdir.join("missing")]).resume()
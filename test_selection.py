@@ -0,0 +1,55 @@
+from evonum_selection import *
+import pytest
+import random
+
+
+def scores(fitness):
+    return [["Solver%d" % pos, value, pos] for pos, value in enumerate(fitness)]
+
+
+class TestSelectionCreation:
+
+    def test_create_truncation(self):
+        assert isinstance(createSelection("Truncation"), TruncationSelection)
+
+    def test_create_tournament(self):
+        assert createSelection("Tournament", 4).tournament_size == 4
+
+    def test_create_bad_tournament(self):
+        assert createSelection("Tournament", 1) is None
+
+    def test_create_unknown_selection(self):
+        assert createSelection("???") is None
+
+
+class TestSelection:
+
+    def test_top_solvers_matches_stable_sort(self):
+        random.seed(1)
+        solver_scores = scores([random.randint(1, 20) for x in range(0, 200)])
+        expected = sorted(solver_scores, key=lambda x: x[1], reverse=True)
+        assert topSolvers(solver_scores, 10) == expected[:10]
+        assert topSolvers(solver_scores, 150) == expected[:150]
+        assert topSolvers(solver_scores, 2, 2) == solver_scores[::-1][:2]
+
+    def test_truncation_losers(self):
+        random.seed(1)
+        solver_scores = scores([random.randint(1, 20) for x in range(0, 200)])
+        expected = sorted(solver_scores, key=lambda x: x[1], reverse=True)[50:]
+        losers = createSelection("Truncation").selectLosers(solver_scores, 50)
+        assert sorted(losers, key=lambda x: x[2]) == sorted(expected, key=lambda x: x[2])
+        assert createSelection("Truncation").selectLosers(solver_scores, 200) == []
+
+    def test_tournament_losers(self):
+        random.seed(1)
+        solver_scores = scores(range(0, 100))
+        losers = createSelection("Tournament", 100).selectLosers(solver_scores, 60)
+        assert len(losers) == 40
+        # Tournaments the size of the population always remove the weakest
+        assert sorted([item[1] for item in losers]) == list(range(0, 40))
+
+    def test_tournament_contenders_are_distinct(self):
+        random.seed(1)
+        for x in range(0, 20):
+            # A solver never meets itself, so the weaker of two always loses
+            assert createSelection("Tournament").selectLosers(scores([5, 1]), 1) == [["Solver1", 1, 1]]
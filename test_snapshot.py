@@ -0,0 +1,61 @@
+from evonum_snapshot import *
+import pytest
+import random
+
+
+def snapshotWorld(world):
+    random.seed(1)
+    world.addForce("Simple", "Position", "primes_1000.txt")
+    world.addForce("Dynamic", "Equation", "3*x+2, 1, 50")
+    world.importSolverSettings({"total_modules": 3})
+    for x in range(0, 20):
+        world.addSolver()
+    world._max_solvers = 25
+    world.runDays(3)
+    return world
+
+
+class TestSnapshot:
+
+    def test_resume_matches_continued_run(self, tmpdir):
+        for world in [snapshotWorld(Terrarium()), snapshotWorld(ArrayTerrarium())]:
+            filename = str(tmpdir.join("world.snapshot"))
+            assert saveSnapshot(world, filename)
+            world.runDays(3)
+            expected = world.exportSolvers()
+            resumed = loadSnapshot(filename)
+            assert type(resumed) is type(world)
+            assert resumed._current_day == 3
+            resumed.runDays(3)
+            assert resumed.exportSolvers() == expected
+
+    def test_forces_and_settings_restored(self, tmpdir):
+        world = snapshotWorld(Terrarium())
+        world._forces[1]._condition_probabilities[2] = 7
+        world._forces[1].avg_fitness = [-12.5, 4]
+        world.setSelection("Tournament", 3)
+        filename = str(tmpdir.join("world.snapshot"))
+        saveSnapshot(world, filename)
+        resumed = loadSnapshot(filename, restore_random=False)
+        assert resumed._forces[1]._condition_probabilities == world._forces[1]._condition_probabilities
+        assert resumed._forces[1].avg_fitness == [-12.5, 4]
+        assert resumed._forces[1]._equation(4) == 14
+        assert resumed._max_solvers == 25
+        assert resumed._selection.tournament_size == 3
+        assert resumed._solver_settings == {"total_modules": 3}
+        assert [item.exportDict() for item in resumed._solvers] == \
+            [item.exportDict() for item in world._solvers]
+
+    def test_array_world_is_memory_mapped(self, tmpdir):
+        world = snapshotWorld(ArrayTerrarium(single_precision=True))
+        filename = str(tmpdir.join("world.snapshot"))
+        saveSnapshot(world, filename)
+        resumed = loadSnapshot(filename)
+        assert isinstance(resumed._arrays["coeffs"], numpy.memmap)
+        assert resumed.single_precision
+        assert resumed.population == world.population
+
+    def test_load_bad_file(self, tmpdir):
+        tmpdir.join("bad.snapshot").write("not a snapshot")
+        with pytest.raises(ValueError):
+            loadSnapshot(str(tmpdir.join("bad.snapshot")))
@@ -1,4 +1,6 @@
 from evonum_solvers import *
+from evonum_fitness import SimpleEquation
+import pickle
 import pytest
 
 
@@ -144,6 +146,42 @@ class TestBasicSolverFunctions:
         assert parent._children == 1
         assert child.name == "Parent.1"
 
+    def test_clone_is_independent(self):
+        parent = createSolver("Small", "Parent", {"fitness_calculator": "Teired"})
+        parent.beginDay()
+        clone = parent.clone()
+        assert clone.exportDict() == parent.exportDict()
+        clone._modules[0].coeff = 12345
+        clone._fitness_calculator.module_stack[0][0] = 9
+        clone.spread = 1
+        assert parent._modules[0].coeff != 12345
+        assert parent._fitness_calculator.module_stack[0][0] == 5
+        assert parent.spread == 10
+
+    def test_mark_dirty_modules(self):
+        parent = createSolver("Small", "Parent")
+        parent.beginDay()
+        parent.markDirty(0)
+        assert parent._dirty is None  # Nothing cached yet
+        parent._responses = {}
+        child = parent.clone()
+        assert child._responses is parent._responses
+        child.swapModule(1)
+        assert child._dirty == [1] and parent._dirty is None
+        grandchild = child.clone()
+        grandchild.markDirty(2)
+        assert child._dirty == [1] and grandchild._dirty == [1, 2]
+        grandchild.addModule()
+        assert grandchild._responses is None and grandchild._dirty is None
+        assert pickle.loads(pickle.dumps(child))._responses is None
+
+    def test_pickle_solver(self):
+        original = createSolver("Small", "Parent", {"fitness_calculator": "Teired"})
+        original.beginDay()
+        assert not hasattr(original, "__dict__")
+        copied = pickle.loads(pickle.dumps(original))
+        assert copied.exportDict() == original.exportDict()
+
     def test_mutate_property(self):
         random.seed(1)
         mutate_property_solver = createSolver()
@@ -184,3 +222,59 @@ class TestBasicSolverFunctions:
                          'merge_module_chance': 50, 'spread': 10, 'total_modules': 5, '_modules': [], '_age': 0, 'unique': False, 'resilience': 2, 'swap_module_chance': 15, 'name': 'Tester'}
         recieved_dict = export_test_solver.exportDict()
         assert expected_dict == recieved_dict
+
+
+class TestTeiredFitness:
+
+    def teired_setup(self, coeffs):
+        force = SimpleEquation("TestForce")
+        force._current_condition = 1
+        force._current_expected = 0
+        modules = [importModule({"_type_": "Fitness", "_subtype": "Power_1", "coeff": x})
+                   for x in coeffs]
+        return force, modules
+
+    def test_single_teir_precedence(self):
+        force, modules = self.teired_setup([2, 3, 4])
+        calculator = TeiredFitness("5_Add_5_Multiply_5_Add")
+        assert calculator.calculateUnitFitness(force, modules) == -14
+
+    def test_multiple_teirs(self):
+        force, modules = self.teired_setup([2, 3, 4])
+        calculator = TeiredFitness("6_Subtract_6_Add_5_Add")
+        assert calculator.calculateUnitFitness(force, modules) == -3
+
+    def test_zero_division_returns_none(self):
+        force, modules = self.teired_setup([2, 0])
+        calculator = TeiredFitness("5_Divide_5_Add")
+        assert calculator.calculateUnitFitness(force, modules) is None
+
+    def test_compiled_stack_rebuilt_after_stack_change(self):
+        force, modules = self.teired_setup([2, 3, 4])
+        calculator = TeiredFitness("5_Add_5_Multiply_5_Add")
+        calculator.calculateUnitFitness(force, modules)
+        calculator.module_stack = [[5, "Add"], [5, "Add"], [5, "Add"]]
+        assert calculator.calculateUnitFitness(force, modules) == -9
+
+    def test_compiled_stack_adjusts_to_module_count(self):
+        force, modules = self.teired_setup([2, 3, 4])
+        calculator = TeiredFitness("5_Add")
+        assert calculator.calculateUnitFitness(force, modules) == -9
+        assert len(calculator.module_stack) == 3
+
+
+class TestBatchFitness:
+
+    def test_linear_batch_matches_mean_of_conditions(self):
+        force = SimpleEquation("TestForce")
+        force.loadConditions("3*x+1, 1, 10")
+        force.batch_size = 6
+        force.beginDay()
+        modules = [importModule({"_type_": "Fitness", "_subtype": "Power_1", "coeff": 2}),
+                   importModule({"_type_": "Fitness", "_subtype": "Sine_2", "coeff": 5})]
+        calculator = LinearFitness()
+        expected = 0
+        for conditions in force.batch:
+            expected += calculator.calculateUnitFitness(force, modules, conditions)
+        expected = expected / 6.0
+        assert calculator.calculateFitness([force], modules) == expected
@@ -1,4 +1,5 @@
 from evonum_terrarium import *
+import evonum_modules
 import pytest
 import random
 
@@ -59,6 +60,14 @@ class TestRunTerrariumIntegrationTests:
         test_run_world.runDays(1)
         assert len(test_run_world._solvers) == 4
 
+    def test_basis_cache_cleared_each_day(self):
+        cache_world = Terrarium()
+        cache_world.addForce("Simple", "Position", "primes_1000.txt")
+        cache_world.addSolver()
+        cachedBasis("Log", 123456.0)
+        cache_world.runDays(1)
+        assert 123456.0 not in evonum_modules._BASIS_CACHE
+
     def test_export_solvers(self):
         """!!!Integration Test!!!"""
         random.seed(1)
@@ -99,3 +108,76 @@ class TestRunTerrariumIntegrationTests:
         specific_settings_world.importSolverSettings(settings)
         specific_settings_world.addSolver()
         assert specific_settings_world._solvers[0].total_modules == 3
+
+    def test_tournament_selection_prunes_to_max(self):
+        """!!!Integration Test!!!"""
+        random.seed(1)
+        tournament_world = Terrarium()
+        tournament_world.setSelection("Tournament", 3)
+        tournament_world.addForce("Simple", "Position", "primes_1000.txt")
+        for x in range(0, 20):
+            tournament_world.addSolver()
+        tournament_world._max_solvers = 15
+        tournament_world._chance_to_survive_prune = 0
+        tournament_world.runDays(2)
+        assert len([solver for solver in tournament_world._solvers if solver.living]) == 15
+
+    def test_seeded_world_owns_random_stream(self):
+        """!!!Integration Test!!!"""
+        exports = []
+        for pos in range(0, 2):
+            random.seed(pos)
+            seeded_world = Terrarium()
+            seeded_world.setSeed(5)
+            seeded_world.addForce("Simple", "Equation", "3*pow(x,2), 1, 100")
+            for x in range(0, 10):
+                seeded_world.addSolver()
+            state = random.getstate()
+            seeded_world.runDays(3)
+            assert random.getstate() == state
+            exports.append(seeded_world.exportSolvers())
+        assert exports[0] == exports[1]
+        assert seeded_world.seeded
+        assert seeded_world.rng is not random
+        seeded_world.setSeed(None)
+        assert not seeded_world.seeded
+        assert seeded_world.rng is random
+
+    def seededWorld(self, seed):
+        world = Terrarium()
+        world.setSeed(seed)
+        world.setSelection("Tournament", 3)
+        world.addForce("Dynamic", "Equation", "3*pow(x,2), 1, 100")
+        world._max_solvers = 12
+        for x in range(0, 10):
+            world.addSolver()
+        return world
+
+    def test_interleaved_seeded_worlds(self):
+        """!!!Integration Test!!!"""
+        alone = self.seededWorld(5)
+        alone.runDays(4)
+        world = self.seededWorld(5)
+        other = self.seededWorld(6)
+        for day in range(0, 4):
+            world.runDays(1)
+            random.random()
+            other.runDays(1)
+        assert world.exportSolvers() == alone.exportSolvers()
+
+    def test_day_timings(self):
+        """!!!Integration Test!!!"""
+        random.seed(1)
+        timed_world = Terrarium()
+        timed_world.addForce("Simple", "Position", "primes_1000.txt")
+        for x in range(0, 10):
+            timed_world.addSolver()
+        timed_world.runDays(3)
+        timings = timed_world.timings
+        assert timings["days"] == 3
+        assert timings["evaluate"] > 0
+        assert timings["print_day"] > 0
+        assert timings["born"] + 10 - timings["killed"] == len(timed_world._solvers)
+        timed_world.resetTimings()
+        assert timed_world.timings["days"] == 0
+        assert timed_world.timings["evaluated"] == 0